@@ -0,0 +1,27 @@
+"""Shared guard for operator-only features (profiling, reloads, provisioning).
+
+A request is an admin request when it carries ``X-Admin-Token`` matching the
+``ADMIN_TOKEN`` environment variable. With ``ADMIN_TOKEN`` unset nothing is
+admin-accessible.
+"""
+import hmac
+import os
+from functools import wraps
+
+from flask import jsonify, request
+
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+
+
+def is_admin_request():
+    supplied = request.headers.get('X-Admin-Token', '')
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(supplied, ADMIN_TOKEN)
+
+
+def admin_required(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not is_admin_request():
+            return jsonify({'status': 'error', 'error': 'Forbidden'}), 403
+        return view(*args, **kwargs)
+    return wrapper
@@ -3,14 +3,20 @@ import os
 
 # Set Vercel environment flag
 os.environ['VERCEL'] = '1'
+# Recommendations come from the precomputed NumPy tables (recommendation_tables.py),
+# so a cold start imports neither pandas nor sklearn and trains nothing
+os.environ.setdefault('RECOMMENDATION_TABLES', '1')
+# Leave out what a short-lived function cannot use: request profiling (its
+# files would die with the instance) and the bulk user import (long requests
+# and a process pool; use `python user_import.py` instead)
+os.environ.setdefault('APP_OPTIONAL_FEATURES', '')
 
 # Add parent directory to path so we can import app
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app import app, init_db
-
-# Initialize database
-init_db()
+# The sample data is seeded once per database with `python app.py seed`,
+# not on every cold start
+from app import app
 
 # Export for Vercel
 application = app
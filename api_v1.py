@@ -0,0 +1,180 @@
+"""JSON API for crop and fertilizer recommendations.
+
+    POST /api/v1/crop-suggestion
+        {"nitrogen": 90, "phosphorus": 42, "potassium": 43, "temperature": 20.9,
+         "humidity": 82, "ph": 6.5, "rainfall": 202.9}
+    POST /api/v1/fertilizer-advice
+        {"nitrogen": 20, "phosphorus": 30, "potassium": 25, "crop": "rice",
+         "temperature": 28, "humidity": 70, "moisture": 45}
+
+Both need a logged-in session, like their HTML counterparts. Bodies are
+validated strictly: every field is required, numbers must be JSON numbers
+within the ranges the web forms allow, ``crop`` must be one of the supported
+crops, and unknown fields are rejected. The optional ``top_k`` (1-20) sets how
+many recommendations come back (default 6 crops, 5 fertilizers). Errors are
+``{"status": "error", "error": ..., "details": {field: message}}`` with 400
+(401 when not logged in, 503 + Retry-After when the recommender is saturated).
+
+Responses are ``{"recommendations": [...]}`` with numeric fields as numbers
+(``application_rate`` in kg/acre), encoded with orjson when installed and
+compressed with brotli or gzip when the client's ``Accept-Encoding`` allows.
+``X-Model-Version`` names the model version that produced them.
+"""
+import gzip
+
+from flask import Blueprint, Response, request, session
+
+import recommendation_executor
+from fertilizer_rules import CROP_NUTRIENT_MAPPING
+from recommendation_records import dumps
+
+MIN_COMPRESS_BYTES = 256
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # per-response compression; static assets use 11
+
+api_v1_bp = Blueprint('api_v1', __name__, url_prefix='/api/v1')
+
+_brotli = None  # imported by the first response that can use it; False when not installed
+
+# field -> (min, max), matching the web forms
+CROP_FIELDS = {
+    'nitrogen': (0, 140),
+    'phosphorus': (5, 145),
+    'potassium': (5, 205),
+    'temperature': (8, 44),
+    'humidity': (14, 100),
+    'ph': (3.5, 9.9),
+    'rainfall': (20, 300),
+}
+FERTILIZER_FIELDS = {
+    'nitrogen': (0, 140),
+    'phosphorus': (5, 145),
+    'potassium': (5, 205),
+    'temperature': (8, 44),
+    'humidity': (14, 100),
+    'moisture': (20, 100),
+}
+# optional integer field -> (min, max)
+OPTIONAL_FIELDS = {
+    'top_k': (1, 20),
+}
+
+
+def validate(payload, numeric_fields, string_fields=()):
+    """``(values, errors)`` for a decoded JSON body; ``errors`` maps field to message."""
+    if not isinstance(payload, dict):
+        return {}, {'body': 'expected a JSON object'}
+    errors = {}
+    values = {}
+    for field in payload.keys() - numeric_fields.keys() - set(string_fields) - OPTIONAL_FIELDS.keys():
+        errors[field] = 'unknown field'
+    for field, (lo, hi) in numeric_fields.items():
+        value = payload.get(field)
+        if value is None:
+            errors[field] = 'required'
+        elif isinstance(value, bool) or not isinstance(value, (int, float)):
+            errors[field] = 'must be a number'
+        elif not lo <= value <= hi:
+            errors[field] = f'must be between {lo} and {hi}'
+        else:
+            values[field] = float(value)
+    for field, (lo, hi) in OPTIONAL_FIELDS.items():
+        value = payload.get(field)
+        if value is None:
+            continue
+        if isinstance(value, bool) or not isinstance(value, int):
+            errors[field] = 'must be an integer'
+        elif not lo <= value <= hi:
+            errors[field] = f'must be between {lo} and {hi}'
+        else:
+            values[field] = value
+    for field in string_fields:
+        value = payload.get(field)
+        if value is None:
+            errors[field] = 'required'
+        elif not isinstance(value, str) or not value.strip():
+            errors[field] = 'must be a non-empty string'
+        else:
+            values[field] = value.strip()
+    return values, errors
+
+
+def _brotli_module():
+    global _brotli
+    if _brotli is None:
+        try:
+            import brotli
+            _brotli = brotli
+        except ImportError:
+            _brotli = False
+    return _brotli or None
+
+
+def json_response(payload, status=200):
+    """orjson-encoded response, compressed if the client accepts br or gzip."""
+    body = dumps(payload)
+    response = Response(body, status=status, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    if len(body) < MIN_COMPRESS_BYTES:
+        return response
+    accepted = request.accept_encodings
+    brotli = _brotli_module() if accepted['br'] else None
+    if brotli is not None:
+        response.set_data(brotli.compress(body, quality=BROTLI_QUALITY))
+        response.headers['Content-Encoding'] = 'br'
+    elif accepted['gzip']:
+        response.set_data(gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+def error_response(status, error, details=None):
+    payload = {'status': 'error', 'error': error}
+    if details:
+        payload['details'] = details
+    return json_response(payload, status)
+
+
+def _login_required():
+    if 'user_id' not in session:
+        return error_response(401, 'Login required')
+
+
+api_v1_bp.before_request(_login_required)
+
+
+@api_v1_bp.route('/crop-suggestion', methods=['POST'])
+def crop_suggestion():
+    values, errors = validate(request.get_json(silent=True), CROP_FIELDS)
+    if errors:
+        return error_response(400, 'Invalid request', errors)
+    try:
+        recommendations = recommendation_executor.run('crop', **values)
+    except recommendation_executor.Saturated:
+        raise
+    except Exception as e:
+        return error_response(500, str(e))
+    return json_response({'recommendations': recommendations})
+
+
+@api_v1_bp.route('/fertilizer-advice', methods=['POST'])
+def fertilizer_advice():
+    values, errors = validate(request.get_json(silent=True), FERTILIZER_FIELDS, ('crop',))
+    if 'crop' in values:
+        crop = values['crop'].lower().replace(' ', '').replace('_', '')
+        if crop not in CROP_NUTRIENT_MAPPING:
+            errors['crop'] = f"must be one of {', '.join(sorted(CROP_NUTRIENT_MAPPING))}"
+        values['crop'] = crop
+    if errors:
+        return error_response(400, 'Invalid request', errors)
+    try:
+        recommendations = recommendation_executor.run('fertilizer', **values)
+    except recommendation_executor.Saturated:
+        raise
+    except Exception as e:
+        return error_response(500, str(e))
+    return json_response({'recommendations': recommendations})
+
+
+def init_app(app):
+    app.register_blueprint(api_v1_bp)
@@ -1,100 +1,50 @@
 from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
 import os
+import sys
 from datetime import datetime
 from pymongo import MongoClient
-import bcrypt
 from bson.objectid import ObjectId
 from dotenv import load_dotenv
 import random
-import json
 from urllib.parse import quote_plus
+import metrics
+import static_assets
+import template_cache
+import recommendation_executor
+import model_registry
+import api_v1
+import rate_limit
+import session_store
+import storage
+import market_history
+import weather_store
+from response_cache import cached_response
+from add_dashboard_fertilizer import dashboard_fertilizer_bp
+from crop_progress import progress_bp
 
 # Load environment variables
 load_dotenv()
 
+# Optional parts, all registered by default. api/index.py (Vercel) sets
+# APP_OPTIONAL_FEATURES to the ones its functions can serve, and the others
+# are not even imported.
+OPTIONAL_FEATURES = ('profiling', 'user_import')
+FEATURES = set(filter(None, os.getenv('APP_OPTIONAL_FEATURES', ','.join(OPTIONAL_FEATURES)).split(',')))
+
 app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY', 'farming-assistant-secret-key-2024')
+metrics.init_app(app)
+if 'profiling' in FEATURES:
+    import profiling
+    profiling.init_app(app)
+static_assets.init_app(app)
+template_cache.init_app(app)
+recommendation_executor.init_app(app)
+model_registry.init_app(app)
+api_v1.init_app(app)
 
-# Try to import optional modules (may fail on Vercel)
-try:
-    from crop_data import crop_dataset
-except ImportError:
-    crop_dataset = None
-
-try:
-    from fertilizer_data import fertilizer_dataset
-except ImportError:
-    fertilizer_dataset = None
-
-# Skip SQLite-dependent blueprints on Vercel (no file system)
 IS_VERCEL = os.environ.get('VERCEL', False)
 
-# Define SQLite paths and functions (will be disabled on Vercel)
-PROGRESS_DB_PATH = os.path.join(os.path.dirname(__file__), 'progress.db')
-DB_PATH = os.path.join(os.path.dirname(__file__), 'dashboard_fertilizers.db')
-sqlite3 = None
-
-def ensure_progress_table():
-    """Ensure SQLite progress DB and table exist"""
-    if IS_VERCEL or sqlite3 is None:
-        return  # Skip on Vercel
-    try:
-        conn = sqlite3.connect(PROGRESS_DB_PATH)
-        cur = conn.cursor()
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS crop_progress (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT,
-                crop_name TEXT,
-                start_date TEXT,
-                harvest_date TEXT,
-                task_timeline TEXT,
-                status TEXT,
-                recommendation TEXT
-            )
-        """)
-        conn.commit()
-    finally:
-        conn.close()
-
-def ensure_table_exists():
-    """Ensure SQLite fertilizers table exists"""
-    if IS_VERCEL or sqlite3 is None:
-        return  # Skip on Vercel
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS dashboard_fertilizers (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                fertilizer_name TEXT,
-                cost TEXT,
-                yield_increase TEXT,
-                application_time TEXT,
-                date_added TEXT,
-                status TEXT,
-                selected_for TEXT,
-                suitability TEXT,
-                user_id TEXT
-            )
-        """)
-        conn.commit()
-    finally:
-        conn.close()
-
-if not IS_VERCEL:
-    try:
-        import sqlite3 as sqlite3_module
-        sqlite3 = sqlite3_module
-        from add_dashboard_fertilizer import dashboard_fertilizer_bp, DB_PATH as FERT_DB_PATH, ensure_table_exists as fert_ensure_table
-        from crop_progress import progress_bp
-        DB_PATH = FERT_DB_PATH
-        ensure_table_exists = fert_ensure_table
-        app.register_blueprint(dashboard_fertilizer_bp)
-        app.register_blueprint(progress_bp)
-    except Exception as e:
-        print(f"Warning: Could not load SQLite blueprints: {e}")
-
 # ------------------ MongoDB Configuration ------------------ #
 db = None
 users_collection = None
@@ -103,26 +53,37 @@ weather_collection = None
 market_collection = None
 client = None
 
-try:
+MONGO_DB = os.getenv('MONGO_DB', 'farmerdb')
+
+def get_mongo_uri():
+    """Connection string from MONGO_URI, or built for Atlas from MONGO_USER/MONGO_PASSWORD.
+    Returns None when neither is configured."""
+    if os.getenv('MONGO_URI'):
+        return os.getenv('MONGO_URI')
     # Get credentials from environment
     mongo_user = os.getenv('MONGO_USER', '')
     mongo_password = os.getenv('MONGO_PASSWORD', '')
     mongo_cluster = os.getenv('MONGO_CLUSTER', 'cluster0.c3ia7tt.mongodb.net')
-    
     if not mongo_user or not mongo_password:
-        print("⚠️ Warning: MONGO_USER or MONGO_PASSWORD not set")
+        return None
+    # Build connection string with encoded password
+    encoded_password = quote_plus(mongo_password)
+    return f"mongodb+srv://{mongo_user}:{encoded_password}@{mongo_cluster}/farmerdb?retryWrites=true&w=majority&appName=Cluster0"
+
+try:
+    mongo_uri = get_mongo_uri()
+
+    if not mongo_uri:
+        print("⚠️ Warning: MONGO_URI or MONGO_USER/MONGO_PASSWORD not set")
     else:
-        # Build connection string with encoded password
-        encoded_password = quote_plus(mongo_password)
-        mongo_uri = f"mongodb+srv://{mongo_user}:{encoded_password}@{mongo_cluster}/farmerdb?retryWrites=true&w=majority&appName=Cluster0"
-        
         # Connect to MongoDB Atlas
-        client = MongoClient(mongo_uri, serverSelectionTimeoutMS=10000)
+        client = MongoClient(mongo_uri, serverSelectionTimeoutMS=10000,
+                             event_listeners=[metrics.MongoCommandListener()])
         
         # Test the connection
         client.admin.command('ping')
         
-        db = client["farmerdb"]
+        db = client[MONGO_DB]
 
         # Collections
         users_collection = db["users"]
@@ -130,22 +91,64 @@ try:
         weather_collection = db["weather"]
         market_collection = db["market_prices"]
 
-        print("✅ Connected to MongoDB Atlas farmerdb successfully!")
+        print(f"✅ Connected to MongoDB {MONGO_DB} successfully!")
 except Exception as e:
     print(f"❌ MongoDB connection error: {e}")
     # Don't crash - app will show "Database not available" message
 
+session_store.init_app(app, mongo_db=db)
+rate_limit.init_app(app, mongo_db=db)
+# Progress entries and saved fertilizers: SQLite or Mongo (STORAGE_BACKEND); their
+# routes answer "not available" when neither is usable
+storage.init(mongo_db=db)
+app.register_blueprint(dashboard_fertilizer_bp)
+app.register_blueprint(progress_bp)
+market_history.init_app(app, db)
+# POST /admin/users/import: bulk user provisioning from a CSV
+if 'user_import' in FEATURES:
+    import user_import
+    user_import.init_app(app, db)
+if db is not None:
+    weather_store.init(db)
+
 # ------------------ Helper Functions ------------------ #
+@metrics.timed('bcrypt.hash')
 def hash_password(password):
     """Hash password using bcrypt"""
+    import bcrypt  # only the login and register routes need it
     return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
 
+@metrics.timed('bcrypt.check')
 def check_password(password, hashed):
     """Check if password matches hash"""
+    import bcrypt
     return bcrypt.checkpw(password.encode('utf-8'), hashed)
 
+def profile_from_user(user):
+    """The part of a user document profile.html shows, cached in the session."""
+    return {
+        "name": user['name'],
+        "email": user['email'],
+        "created_at": user.get('created_at'),
+        "last_login": user.get('last_login')
+    }
+
+def login_user(user):
+    session['user_id'] = str(user['_id'])
+    session['user_name'] = user['name']
+    session['user_email'] = user['email']
+    session['profile'] = profile_from_user(user)
+
+def update_user(user_id, fields):
+    """Update a user document and drop the profile cached in that user's sessions."""
+    users_collection.update_one({"_id": ObjectId(user_id)}, {"$set": fields})
+    session_store.invalidate_user(app, user_id)
+
 def init_db():
-    """Initialize database with sample data"""
+    """Initialize database with sample data.
+
+    Run once per database (``python app.py seed``), not at start-up.
+    """
     if db is None:
         print("Database not connected, skipping init")
         return
@@ -191,6 +194,7 @@ def init_db():
 
 # ------------------ Routes ------------------ #
 @app.route('/')
+@cached_response(templates=['index.html'], session_dependent=True)
 def index():
     return render_template('index.html')
 
@@ -212,9 +216,9 @@ def login():
         try:
             user = users_collection.find_one({"email": email})
             if user and check_password(password, user['password']):
-                session['user_id'] = str(user['_id'])
-                session['user_name'] = user['name']
-                session['user_email'] = user['email']
+                user['last_login'] = datetime.utcnow()
+                update_user(str(user['_id']), {"last_login": user['last_login']})
+                login_user(user)
                 flash('Login successful!', 'success')
                 return redirect(url_for('dashboard'))
             else:
@@ -258,11 +262,8 @@ def register():
                 "last_login": datetime.utcnow()
             }
 
-            result = users_collection.insert_one(new_user)
-
-            session['user_id'] = str(result.inserted_id)
-            session['user_name'] = name
-            session['user_email'] = email
+            users_collection.insert_one(new_user)
+            login_user(new_user)
 
             flash('Registration successful!', 'success')
             return redirect(url_for('dashboard'))
@@ -273,6 +274,41 @@ def register():
     return render_template('register.html')
 
 # -------- Dashboard -------- #
+DEFAULT_WEATHER = {"temperature": 28, "humidity": 65, "rain_chance": 20}
+
+def fertilizer_row_to_dict(r):
+    return {
+        'id': r['id'], 'name': r['fertilizer_name'], 'cost': r['cost'], 'yield_increase': r['yield_increase'],
+        'application_time': r['application_time'], 'date_added': r['date_added'], 'status': r['status'],
+        'selected_for': r['selected_for'], 'suitability': r['suitability'], 'user_id': r['user_id']
+    }
+
+def user_crop_to_dict(c):
+    return {
+        'id': str(c.get('_id')), 'name': c.get('name'),
+        'season': c.get('season'), 'created_at': c.get('created_at')
+    }
+
+def dashboard_fragment(name, user_id, version, items):
+    """Render a per-user dashboard fragment; ``items`` None means the load failed (rendered empty, not cached)."""
+    key = {'fertilizers': 'sqlite_fertilizers', 'crops': 'user_crops'}[name]
+    return template_cache.render(name, user_id, version, {key: items or []}, cache=items is not None)
+
+def render_dashboard(weather_data, recommended_crop, crops, fertilizers_fragment, crops_fragment):
+    """Render dashboard.html from already-fetched data and fragments (shared with the async entry point)."""
+    crop_recommendation = {
+        "crop": recommended_crop['name'] if recommended_crop else "Rice (Basmati)",
+        "reason": f"Recommended for {recommended_crop['season']} season" if recommended_crop else "Perfect for current season"
+    }
+    market_prices = [{'crop': c['name'].split(' ')[0], 'price': f"₹{c['price']}/quintal"} for c in crops]
+    return render_template('dashboard.html',
+                           user_name=session.get('user_name'),
+                           weather=weather_data or DEFAULT_WEATHER,
+                           crop_rec=crop_recommendation,
+                           prices=market_prices,
+                           fertilizers_fragment=fertilizers_fragment,
+                           crops_fragment=crops_fragment)
+
 @app.route('/dashboard')
 def dashboard():
     if 'user_id' not in session:
@@ -280,60 +316,36 @@ def dashboard():
         return redirect(url_for('login'))
 
     try:
-        weather_data = weather_collection.find_one({}, sort=[("updated_at", -1)]) or {"temperature": 28, "humidity": 65, "rain_chance": 20}
+        weather_data = weather_store.get(session.get('weather_location', weather_store.DEFAULT_LOCATION))
         recommended_crop = crops_collection.find_one({"recommended": True})
-
-        crop_recommendation = {
-            "crop": recommended_crop['name'] if recommended_crop else "Rice (Basmati)",
-            "reason": f"Recommended for {recommended_crop['season']} season" if recommended_crop else "Perfect for current season"
-        }
-
         crops = list(crops_collection.find({}).limit(3))
-        market_prices = [{'crop': c['name'].split(' ')[0], 'price': f"₹{c['price']}/quintal"} for c in crops]
 
-        # SQLite fertilizers (only on non-Vercel)
-        sqlite_fertilizers = []
-        if not IS_VERCEL and sqlite3:
-            try:
-                ensure_table_exists()
-                conn = sqlite3.connect(DB_PATH)
-                cur = conn.cursor()
-                cur.execute("""
-                    SELECT id, fertilizer_name, cost, yield_increase, application_time, date_added, status, selected_for, suitability, user_id
-                    FROM dashboard_fertilizers
-                    WHERE user_id = ?
-                    ORDER BY id DESC
-                """, (session['user_id'],))
-                rows = cur.fetchall()
-                for r in rows:
-                    sqlite_fertilizers.append({
-                        'id': r[0], 'name': r[1], 'cost': r[2], 'yield_increase': r[3],
-                        'application_time': r[4], 'date_added': r[5], 'status': r[6],
-                        'selected_for': r[7], 'suitability': r[8], 'user_id': r[9]
-                    })
-                conn.close()
-            except Exception as e:
-                print(f"SQLite error: {e}")
+        user_id = session['user_id']
+        version = template_cache.version(user_id)
+
+        # Saved fertilizers (when storage is available)
+        fertilizers_html = template_cache.get('fertilizers', user_id, version)
+        if fertilizers_html is None:
+            sqlite_fertilizers = []
+            if storage.get() is not None:
+                try:
+                    sqlite_fertilizers = [fertilizer_row_to_dict(r) for r in storage.get().list_fertilizers(user_id)]
+                except Exception as e:
+                    print(f"Storage error: {e}")
+                    sqlite_fertilizers = None
+            fertilizers_html = dashboard_fragment('fertilizers', user_id, version, sqlite_fertilizers)
 
         # User crops from MongoDB
-        user_crops = []
-        try:
-            cursor = crops_collection.find({"user_id": session['user_id']})
-            for c in cursor:
-                user_crops.append({
-                    'id': str(c.get('_id')), 'name': c.get('name'),
-                    'season': c.get('season'), 'created_at': c.get('created_at')
-                })
-        except Exception as e:
-            print(f"Error loading user crops: {e}")
+        crops_html = template_cache.get('crops', user_id, version)
+        if crops_html is None:
+            try:
+                user_crops = [user_crop_to_dict(c) for c in crops_collection.find({"user_id": user_id})]
+            except Exception as e:
+                print(f"Error loading user crops: {e}")
+                user_crops = None
+            crops_html = dashboard_fragment('crops', user_id, version, user_crops)
 
-        return render_template('dashboard.html',
-                               user_name=session.get('user_name'),
-                               weather=weather_data,
-                               crop_rec=crop_recommendation,
-                               prices=market_prices,
-                               sqlite_fertilizers=sqlite_fertilizers,
-                               user_crops=user_crops)
+        return render_dashboard(weather_data, recommended_crop, crops, fertilizers_html, crops_html)
 
     except Exception as e:
         flash(f'Dashboard error: {str(e)}', 'error')
@@ -347,18 +359,37 @@ def logout():
     return redirect(url_for('index'))
 
 # ------------------ API Endpoints ------------------ #
+def random_weather():
+    return {
+        'temperature': random.randint(25, 35),
+        'humidity': random.randint(60, 80),
+        'rain_chance': random.randint(10, 40),
+        'location': weather_store.DEFAULT_LOCATION,
+        'updated_at': datetime.utcnow()
+    }
+
+def remember_weather_location(location):
+    """Show this location's weather on the user's dashboard from now on."""
+    if 'user_id' in session and session.get('weather_location') != location:
+        session['weather_location'] = location
+
+def fluctuate_price(base_price):
+    return int(base_price * (1 + random.uniform(-0.05, 0.05)))
+
 @app.route('/api/weather')
 def api_weather():
     try:
-        new_weather = {
-            'temperature': random.randint(25, 35),
-            'humidity': random.randint(60, 80),
-            'rain_chance': random.randint(10, 40),
-            'location': 'default',
-            'updated_at': datetime.utcnow()
-        }
-
-        weather_collection.update_one({"location": "default"}, {"$set": new_weather}, upsert=True)
+        # ?q= is a district name or "lat,lon"; known districts are served from
+        # the feed, everything else gets the simulated default reading.
+        q = request.args.get('q')
+        location = weather_store.resolve(q) if q else session.get('weather_location')
+        reading = weather_store.get(location) if location and location != weather_store.DEFAULT_LOCATION else None
+        if reading is not None:
+            remember_weather_location(location)
+            return jsonify(reading)
+
+        new_weather = random_weather()
+        weather_store.put(new_weather)
         return jsonify(new_weather)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -370,13 +401,15 @@ def api_market_prices():
         updated_prices = {}
 
         for crop in crops:
-            base_price = crop['price']
-            fluctuation = random.uniform(-0.05, 0.05)
-            new_price = int(base_price * (1 + fluctuation))
-
+            new_price = fluctuate_price(crop['price'])
             crops_collection.update_one({"_id": crop['_id']}, {"$set": {"price": new_price}})
             updated_prices[crop['name'].split(' ')[0].lower()] = new_price
 
+        try:
+            market_history.record_ticks([market_history.make_tick(c, p) for c, p in updated_prices.items()])
+        except Exception as e:
+            print(f"Market history error: {e}")
+
         return jsonify(updated_prices)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -389,21 +422,16 @@ def delete_fertilizer(fertilizer_id):
         flash('Not authenticated', 'error')
         return redirect(url_for('login'))
 
-    if IS_VERCEL or not sqlite3:
+    if storage.get() is None:
         flash('Feature not available', 'error')
         return redirect(url_for('dashboard'))
 
     try:
-        ensure_table_exists()
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
-        cur.execute("DELETE FROM dashboard_fertilizers WHERE id = ? AND user_id = ?", (fertilizer_id, session['user_id']))
-        conn.commit()
-        if cur.rowcount == 0:
+        if not storage.get().delete_fertilizer(session['user_id'], fertilizer_id):
             flash('Fertilizer not found or not permitted to delete', 'error')
         else:
+            template_cache.invalidate(session['user_id'])
             flash('Fertilizer deleted', 'success')
-        conn.close()
     except Exception as e:
         flash(f'Error deleting fertilizer: {e}', 'error')
 
@@ -423,6 +451,7 @@ def delete_crop(crop_id):
         if res.deleted_count == 0:
             flash('Crop not found or not permitted to delete', 'error')
         else:
+            template_cache.invalidate(session['user_id'])
             flash('Crop deleted', 'success')
     except Exception as e:
         flash(f'Error deleting crop: {e}', 'error')
@@ -435,7 +464,7 @@ def delete_dashboard_fertilizer():
     if 'user_id' not in session:
         return jsonify({'status': 'error', 'error': 'Not authenticated'}), 401
 
-    if IS_VERCEL or not sqlite3:
+    if storage.get() is None:
         return jsonify({'status': 'error', 'error': 'Feature not available'}), 400
 
     try:
@@ -444,15 +473,9 @@ def delete_dashboard_fertilizer():
         if not fid:
             return jsonify({'status': 'error', 'error': 'Missing id'}), 400
 
-        ensure_table_exists()
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
-        cur.execute("DELETE FROM dashboard_fertilizers WHERE id = ? AND user_id = ?", (fid, session['user_id']))
-        conn.commit()
-        if cur.rowcount == 0:
-            conn.close()
+        if not storage.get().delete_fertilizer(session['user_id'], fid):
             return jsonify({'status': 'error', 'error': 'Not found or not permitted'}), 404
-        conn.close()
+        template_cache.invalidate(session['user_id'])
         return jsonify({'status': 'success'})
     except Exception as e:
         return jsonify({'status': 'error', 'error': str(e)}), 500
@@ -465,10 +488,13 @@ def profile():
         return redirect(url_for('login'))
 
     try:
-        user = users_collection.find_one({"_id": ObjectId(session['user_id'])})
-        if not user:
-            flash('User not found', 'error')
-            return redirect(url_for('logout'))
+        user = session.get('profile')
+        if user is None:
+            user = users_collection.find_one({"_id": ObjectId(session['user_id'])})
+            if not user:
+                flash('User not found', 'error')
+                return redirect(url_for('logout'))
+            user = session['profile'] = profile_from_user(user)
 
         return render_template('profile.html', user=user)
     except Exception as e:
@@ -485,7 +511,7 @@ def crop_suggestion():
     recommendations = []
     form_data = {}
     
-    if request.method == 'POST' and crop_dataset:
+    if request.method == 'POST':
         try:
             # Get form data based on CSV structure
             form_data = {
@@ -504,20 +530,24 @@ def crop_suggestion():
                 flash('Please fill in all required fields!', 'error')
             else:
                 # Get crop recommendations using the dataset
-                recommendations = crop_dataset.get_crop_recommendations(
-                    nitrogen=form_data['nitrogen'],
-                    phosphorus=form_data['phosphorus'],
-                    potassium=form_data['potassium'],
-                    temperature=form_data['temperature'],
-                    humidity=form_data['humidity'],
-                    ph=form_data['ph'],
-                    rainfall=form_data['rainfall']
-                )
+                with metrics.span('get_crop_recommendations'):
+                    recommendations = recommendation_executor.run(
+                        'crop',
+                        nitrogen=form_data['nitrogen'],
+                        phosphorus=form_data['phosphorus'],
+                        potassium=form_data['potassium'],
+                        temperature=form_data['temperature'],
+                        humidity=form_data['humidity'],
+                        ph=form_data['ph'],
+                        rainfall=form_data['rainfall']
+                    )
                 
                 if recommendations:
                     flash(f'Found {len(recommendations)} crop recommendations!', 'success')
                 else:
                     flash('No suitable crops found.', 'warning')
+        except recommendation_executor.Saturated:
+            raise
         except Exception as e:
             flash(f'Error: {str(e)}', 'error')
     
@@ -527,52 +557,54 @@ def crop_suggestion():
                          form_data=form_data)
 
 # -------- Start Growing -------- #
+# Mock data - replace with actual data from your database.
+# Built once at import; only crop_name varies per request.
+GROWING_GUIDE = {
+    'crop_type': 'Food Crop',
+    'match_percentage': 85,
+    'expected_yield': '2500 kg',
+    'estimated_profit': '75000',
+    'land_preparation': [
+        'Clear the field of weeds and debris',
+        'Plow the soil to a depth of 20-30 cm',
+        'Add organic matter and level the field',
+        'Create proper drainage system'
+    ],
+    'soil_ph': '6.5-7.5',
+    'soil_n': '1.5',
+    'soil_p': '1.0',
+    'soil_k': '1.2',
+    'seed_varieties': [
+        {'name': 'Variety A', 'description': 'High yielding, disease resistant'},
+        {'name': 'Variety B', 'description': 'Drought tolerant, early maturing'}
+    ],
+    'seed_rate': '25',
+    'sowing_season': 'June-July',
+    'sowing_method': 'Row sowing',
+    'growing_steps': [
+        {
+            'title': 'Irrigation Management',
+            'content': '<p>Regular irrigation at 7-10 day intervals...</p>'
+        },
+        {
+            'title': 'Pest Management',
+            'content': '<p>Monitor for common pests and apply IPM practices...</p>'
+        },
+        {
+            'title': 'Fertilizer Application',
+            'content': '<p>Apply balanced NPK fertilizers as per soil test...</p>'
+        },
+        {
+            'title': 'Harvesting',
+            'content': '<p>Harvest when crop shows proper maturity signs...</p>'
+        }
+    ]
+}
+
 @app.route('/start_growing/<crop_name>')
+@cached_response(templates=['start_growing.html'])
 def start_growing(crop_name):
-    # Mock data - replace with actual data from your database
-    growing_data = {
-        'crop_name': crop_name,
-        'crop_type': 'Food Crop',
-        'match_percentage': 85,
-        'expected_yield': '2500 kg',
-        'estimated_profit': '75000',
-        'land_preparation': [
-            'Clear the field of weeds and debris',
-            'Plow the soil to a depth of 20-30 cm',
-            'Add organic matter and level the field',
-            'Create proper drainage system'
-        ],
-        'soil_ph': '6.5-7.5',
-        'soil_n': '1.5',
-        'soil_p': '1.0',
-        'soil_k': '1.2',
-        'seed_varieties': [
-            {'name': 'Variety A', 'description': 'High yielding, disease resistant'},
-            {'name': 'Variety B', 'description': 'Drought tolerant, early maturing'}
-        ],
-        'seed_rate': '25',
-        'sowing_season': 'June-July',
-        'sowing_method': 'Row sowing',
-        'growing_steps': [
-            {
-                'title': 'Irrigation Management',
-                'content': '<p>Regular irrigation at 7-10 day intervals...</p>'
-            },
-            {
-                'title': 'Pest Management',
-                'content': '<p>Monitor for common pests and apply IPM practices...</p>'
-            },
-            {
-                'title': 'Fertilizer Application',
-                'content': '<p>Apply balanced NPK fertilizers as per soil test...</p>'
-            },
-            {
-                'title': 'Harvesting',
-                'content': '<p>Harvest when crop shows proper maturity signs...</p>'
-            }
-        ]
-    }
-    return render_template('start_growing.html', **growing_data)
+    return render_template('start_growing.html', crop_name=crop_name, **GROWING_GUIDE)
 
 # -------- Fertilizer Advice -------- #
 @app.route('/fertilizer-advice', methods=['GET', 'POST'])
@@ -585,7 +617,7 @@ def fertilizer_advice():
     form_data = {}
     crop_name = ""
     
-    if request.method == 'POST' and fertilizer_dataset:
+    if request.method == 'POST':
         try:
             # Get form data
             form_data = {
@@ -606,21 +638,25 @@ def fertilizer_advice():
                 crop_name = form_data['crop'].title()
                 
                 # Get AI-powered fertilizer recommendations using the dataset
-                recommendations = fertilizer_dataset.get_fertilizer_recommendations(
-                    nitrogen=form_data['nitrogen'],
-                    phosphorus=form_data['phosphorus'],
-                    potassium=form_data['potassium'],
-                    crop=form_data['crop'],
-                    temperature=form_data['temperature'],
-                    humidity=form_data['humidity'],
-                    moisture=form_data['moisture']
-                )
+                with metrics.span('get_fertilizer_recommendations'):
+                    recommendations = recommendation_executor.run(
+                        'fertilizer',
+                        nitrogen=form_data['nitrogen'],
+                        phosphorus=form_data['phosphorus'],
+                        potassium=form_data['potassium'],
+                        crop=form_data['crop'],
+                        temperature=form_data['temperature'],
+                        humidity=form_data['humidity'],
+                        moisture=form_data['moisture']
+                    )
                 
                 if recommendations:
                     flash(f'Found {len(recommendations)} AI-powered fertilizer recommendations for {crop_name}!', 'success')
                 else:
                     flash('No suitable fertilizer recommendations found for your conditions. Please check your inputs.', 'warning')
             
+        except recommendation_executor.Saturated:
+            raise
         except Exception as e:
             flash(f'Error processing recommendations: {str(e)}', 'error')
             print(f"Fertilizer recommendation error: {e}")
@@ -631,104 +667,11 @@ def fertilizer_advice():
                          form_data=form_data,
                          crop_name=crop_name)
 
-@app.route('/save_progress', methods=['POST'])
-def save_progress():
-    if 'user_id' not in session:
-        return jsonify({'status': 'error', 'error': 'Not authenticated'}), 401
-    if IS_VERCEL or not sqlite3:
-        return jsonify({'status': 'error', 'error': 'Feature not available on this platform'}), 400
-    try:
-        payload = request.get_json() or {}
-        crop_name = payload.get('crop_name')
-        start_date = payload.get('start_date')
-        harvest_date = payload.get('harvest_date')
-        task_timeline = payload.get('task_timeline', [])
-        status = payload.get('status', 'monitoring')
-        recommendation = payload.get('recommendation', '')
-        if not crop_name or not start_date or not harvest_date:
-            return jsonify({'status': 'error', 'error': 'Missing required fields'}), 400
-        ensure_progress_table()
-        conn = sqlite3.connect(PROGRESS_DB_PATH)
-        cur = conn.cursor()
-        cur.execute("""INSERT INTO crop_progress (user_id, crop_name, start_date, harvest_date, task_timeline, status, recommendation)
-                       VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                    (session['user_id'], crop_name, start_date, harvest_date, json.dumps(task_timeline), status, recommendation))
-        conn.commit()
-        lastid = cur.lastrowid
-        conn.close()
-        return jsonify({'status': 'success', 'id': lastid})
-    except Exception as e:
-        return jsonify({'status': 'error', 'error': str(e)}), 500
-
-@app.route('/get_progress')
-def get_progress():
-    if 'user_id' not in session:
-        return jsonify([])
-    if IS_VERCEL or not sqlite3:
-        return jsonify([])
-    try:
-        ensure_progress_table()
-        conn = sqlite3.connect(PROGRESS_DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM crop_progress WHERE user_id = ? ORDER BY id DESC", (session['user_id'],))
-        rows = cur.fetchall()
-        out = []
-        today = datetime.utcnow().date()
-        for r in rows:
-            tasks = json.loads(r['task_timeline'] or '[]') if r['task_timeline'] else []
-            progress_percent = 0
-            if tasks:
-                done = sum(1 for t in tasks if t.get('done'))
-                progress_percent = int((done / len(tasks)) * 100)
-            out.append({'id': r['id'], 'crop_name': r['crop_name'], 'start_date': r['start_date'],
-                        'harvest_date': r['harvest_date'], 'tasks': tasks, 'status': r['status'],
-                        'recommendation': r['recommendation'] or '', 'progress_percent': progress_percent})
-        conn.close()
-        return jsonify(out)
-    except Exception as e:
-        return jsonify({'status': 'error', 'error': str(e)}), 500
-
-@app.route('/mark_task_done', methods=['POST'])
-def mark_task_done():
-    if 'user_id' not in session:
-        return jsonify({'status': 'error', 'error': 'Not authenticated'}), 401
-    if IS_VERCEL or not sqlite3:
-        return jsonify({'status': 'error', 'error': 'Feature not available'}), 400
-    try:
-        payload = request.get_json() or {}
-        pid = payload.get('progress_id')
-        task_index = payload.get('task_index')
-        if pid is None or task_index is None:
-            return jsonify({'status': 'error', 'error': 'Missing fields'}), 400
-        ensure_progress_table()
-        conn = sqlite3.connect(PROGRESS_DB_PATH)
-        cur = conn.cursor()
-        cur.execute("SELECT task_timeline FROM crop_progress WHERE id = ? AND user_id = ?", (pid, session['user_id']))
-        row = cur.fetchone()
-        if not row:
-            conn.close()
-            return jsonify({'status': 'error', 'error': 'Not found'}), 404
-        tasks = json.loads(row[0] or '[]')
-        if task_index < 0 or task_index >= len(tasks):
-            conn.close()
-            return jsonify({'status': 'error', 'error': 'Invalid index'}), 400
-        tasks[task_index]['done'] = True
-        all_done = all(t.get('done') for t in tasks)
-        new_status = 'completed' if all_done else 'monitoring'
-        cur.execute("UPDATE crop_progress SET task_timeline = ?, status = ? WHERE id = ?", (json.dumps(tasks), new_status, pid))
-        conn.commit()
-        conn.close()
-        return jsonify({'status': 'success', 'new_status': new_status})
-    except Exception as e:
-        return jsonify({'status': 'error', 'error': str(e)}), 500
-
-# Initialize on startup (only for non-Vercel)
-if not IS_VERCEL and sqlite3 is not None:
-    ensure_progress_table()
-
 # ------------------ Run App ------------------ #
 if __name__ == '__main__':
+    if sys.argv[1:] == ['seed']:
+        init_db()
+        sys.exit(0 if db is not None else 1)
     print("🚀 Starting Farming Assistant Application with MongoDB...")
     init_db()
     port = int(os.environ.get('PORT', 10000))
@@ -0,0 +1,430 @@
+"""Async serving mode.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 10000 --workers 2
+
+The I/O-bound routes (dashboard, profile, the weather and market-price APIs
+and, with SQLite storage, the progress / dashboard-fertilizer blueprints) are
+served natively on the event loop with Motor for Mongo and aiosqlite for
+SQLite, so a request
+waiting on the database does not hold a worker. They still run inside a
+Flask request context, so sessions, flash messages, templates and the
+before/after-request hooks (metrics, profiling) behave exactly as under WSGI.
+
+Every other route falls through to the unchanged Flask app on a thread pool.
+The CPU-bound recommendation calls run on the ``recommendation_executor``
+process pool, enabled here by default (``RECOMMENDER_PROCESSES``, defaulting
+to the CPU count). The WSGI entry point ``app:app`` is unaffected.
+
+Requires the packages in requirements-async.txt.
+"""
+import asyncio
+import io
+import os
+import sys
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+os.environ.setdefault('RECOMMENDER_PROCESSES', str(os.cpu_count() or 1))
+
+import aiosqlite
+from a2wsgi import WSGIMiddleware
+from bson.objectid import ObjectId
+from flask import flash, jsonify, redirect, render_template, request, session, url_for
+from flask.ctx import RequestContext
+from motor.motor_asyncio import AsyncIOMotorClient
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+
+import add_dashboard_fertilizer
+import app as flask_module
+import crop_progress
+import progress_service
+import market_history
+import metrics
+import weather_store
+import recommendation_executor
+import storage
+import template_cache
+
+flask_app = flask_module.app
+WSGI_THREADS = int(os.getenv('ASGI_WSGI_THREADS', '10'))
+
+mdb = None         # Motor database
+progress_db = None  # aiosqlite connections
+fertilizer_db = None
+
+
+# ------------------ Flask context bridge ------------------ #
+def _wsgi_environ(scope, body):
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name, value = name.decode('latin-1'), value.decode('latin-1')
+        if name == 'content-type':
+            environ['CONTENT_TYPE'] = value
+        elif name == 'content-length':
+            environ['CONTENT_LENGTH'] = value
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def _to_starlette(response):
+    out = Response(content=response.get_data(), status_code=response.status_code)
+    out.raw_headers = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in response.headers.items()]
+    return out
+
+
+def _open_session(request):
+    interface = flask_app.session_interface
+    return interface.open_session(flask_app, request) or interface.make_null_session(flask_app)
+
+
+def native(view):
+    """Wrap an async view so it runs inside a Flask request context with the
+    app's before/after-request hooks, error handlers and session handling.
+
+    Opening and saving the session and the before/after-request hooks (the
+    rate limiter) read and write their stores, so they run on a thread
+    (``asyncio.to_thread`` carries the request context along); only the view
+    runs on the loop."""
+    async def endpoint(req):
+        environ = _wsgi_environ(req.scope, await req.body())
+        request_ = flask_app.request_class(environ)
+        request_.json_module = flask_app.json
+        ctx = RequestContext(flask_app, environ, request=request_,
+                             session=await asyncio.to_thread(_open_session, request_))
+        ctx.push()
+        error = None
+        try:
+            try:
+                rv = await asyncio.to_thread(flask_app.preprocess_request)
+                if rv is None:
+                    rv = await view(**req.path_params)
+            except Exception as e:
+                rv = flask_app.handle_user_exception(e)
+            response = await asyncio.to_thread(flask_app.finalize_request, rv)
+        except Exception as e:
+            error = e
+            response = flask_app.handle_exception(e)
+        finally:
+            ctx.pop(error)
+        return _to_starlette(response)
+    endpoint.__name__ = view.__name__
+    return endpoint
+
+
+def _require_mongo():
+    if mdb is None:
+        raise RuntimeError('Database not available')
+    return mdb
+
+
+async def _sqlite(conn, sql, params=(), fetch=False):
+    with metrics.span(metrics.sql_span_name(sql)):
+        cursor = await conn.execute(sql, params)
+        rows = await cursor.fetchall() if fetch else None
+        await cursor.close()
+    return cursor, rows
+
+
+# ------------------ Dashboard / profile ------------------ #
+async def _dashboard_fertilizers(user_id):
+    """Saved fertilizers as dashboard dicts; None if the read failed."""
+    try:
+        if fertilizer_db is not None:
+            _, rows = await _sqlite(fertilizer_db, storage.LIST_FERTILIZERS_SQL, storage.list_params(user_id),
+                                    fetch=True)
+        elif isinstance(storage.get(), storage.MongoStorage) and mdb is not None:
+            rows = await storage.list_cursor(mdb[storage.FERTILIZERS], user_id).to_list(None)
+        else:
+            return []
+        return [flask_module.fertilizer_row_to_dict(r) for r in rows]
+    except Exception as e:
+        print(f"Storage error: {e}")
+        return None
+
+
+async def _weather(db, location):
+    hit, doc = weather_store.cache.get(location)
+    if not hit:
+        doc = await db.weather.find_one({'location': location}, {'_id': 0})
+        weather_store.cache.put(location, doc)
+    return doc
+
+
+async def _user_crops(db, user_id):
+    try:
+        return [flask_module.user_crop_to_dict(c) async for c in db.crops.find({"user_id": user_id})]
+    except Exception as e:
+        print(f"Error loading user crops: {e}")
+        return None
+
+
+async def _fragment_version(user_id):
+    """template_cache.version() without blocking the loop."""
+    if template_cache.FRAGMENT_CACHE_TTL <= 0:
+        return None
+    try:
+        if fertilizer_db is not None:
+            _, rows = await _sqlite(fertilizer_db, storage.USER_VERSION_SQL, (user_id,), fetch=True)
+            return storage.version_from_rows(rows)
+        if isinstance(storage.get(), storage.MongoStorage) and mdb is not None:
+            doc = await mdb[storage.USER_VERSIONS].find_one(storage.user_version_query(user_id))
+            return storage.version_from_doc(doc)
+    except Exception as e:
+        print(f"⚠️ Fragment version read failed: {e}")
+    return None
+
+
+async def _invalidate_fragments(user_id):
+    """template_cache.invalidate() without blocking the loop."""
+    try:
+        if fertilizer_db is not None:
+            await _sqlite(fertilizer_db, storage.BUMP_USER_VERSION_SQL, (user_id,))
+        elif isinstance(storage.get(), storage.MongoStorage) and mdb is not None:
+            await mdb[storage.USER_VERSIONS].update_one(storage.user_version_query(user_id), storage.BUMP_USER_VERSION,
+                                                        upsert=True)
+    except Exception as e:
+        print(f"⚠️ Fragment version bump failed: {e}")
+
+
+async def _fragment(name, user_id, version, load):
+    """Cached dashboard fragment, or load its data and render it."""
+    html = template_cache.get(name, user_id, version)
+    if html is None:
+        html = flask_module.dashboard_fragment(name, user_id, version, await load)
+    else:
+        load.close()
+    return html
+
+
+async def dashboard():
+    if 'user_id' not in session:
+        flash('Please log in to access dashboard', 'error')
+        return redirect(url_for('login'))
+
+    try:
+        db = _require_mongo()
+        user_id = session['user_id']
+        version = await _fragment_version(user_id)
+        weather_data, recommended_crop, crops, fertilizers_html, crops_html = await asyncio.gather(
+            _weather(db, session.get('weather_location', weather_store.DEFAULT_LOCATION)),
+            db.crops.find_one({"recommended": True}),
+            db.crops.find({}).limit(3).to_list(3),
+            _fragment('fertilizers', user_id, version, _dashboard_fertilizers(user_id)),
+            _fragment('crops', user_id, version, _user_crops(db, user_id)),
+        )
+        return flask_module.render_dashboard(weather_data, recommended_crop, crops, fertilizers_html, crops_html)
+    except Exception as e:
+        flash(f'Dashboard error: {str(e)}', 'error')
+        return redirect(url_for('index'))
+
+
+async def profile():
+    if 'user_id' not in session:
+        flash('Please log in to access profile', 'error')
+        return redirect(url_for('login'))
+
+    try:
+        user = session.get('profile')
+        if user is None:
+            user = await _require_mongo().users.find_one({"_id": ObjectId(session['user_id'])})
+            if not user:
+                flash('User not found', 'error')
+                return redirect(url_for('logout'))
+            user = session['profile'] = flask_module.profile_from_user(user)
+
+        return render_template('profile.html', user=user)
+    except Exception as e:
+        flash(f'Profile error: {str(e)}', 'error')
+        return redirect(url_for('dashboard'))
+
+
+# ------------------ API endpoints ------------------ #
+async def api_weather():
+    try:
+        db = _require_mongo()
+        q = request.args.get('q')
+        location = session.get('weather_location')
+        if q:
+            coordinates = weather_store.coordinates(q)
+            if coordinates is None:
+                location = q.strip()
+            else:
+                doc = await db.weather.find_one(*weather_store.nearest_query(*coordinates))
+                location = doc['location'] if doc else None
+        reading = await _weather(db, location) if location and location != weather_store.DEFAULT_LOCATION else None
+        if reading is not None:
+            flask_module.remember_weather_location(location)
+            return jsonify(reading)
+
+        new_weather = flask_module.random_weather()
+        await db.weather.update_one({"location": new_weather['location']}, {"$set": new_weather}, upsert=True)
+        weather_store.cache.put(new_weather['location'], new_weather)
+        return jsonify(new_weather)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+async def api_market_prices():
+    try:
+        db = _require_mongo()
+        crops = await db.crops.find({}).to_list(None)
+        updated_prices = {}
+        updates = []
+        for crop in crops:
+            new_price = flask_module.fluctuate_price(crop['price'])
+            updates.append(db.crops.update_one({"_id": crop['_id']}, {"$set": {"price": new_price}}))
+            updated_prices[crop['name'].split(' ')[0].lower()] = new_price
+        await asyncio.gather(*updates)
+
+        ticks = [market_history.make_tick(c, p) for c, p in updated_prices.items()]
+        if ticks and market_history.rollups_collection is not None:
+            try:
+                await db[market_history.TICKS].insert_many(ticks, ordered=False)
+                await db[market_history.ROLLUPS].bulk_write(market_history.rollup_ops(ticks), ordered=False)
+            except Exception as e:
+                print(f"Market history error: {e}")
+        return jsonify(updated_prices)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# ------------------ Progress / dashboard-fertilizer blueprints ------------------ #
+async def add_progress():
+    if 'user_id' not in session:
+        return jsonify({'status': 'error', 'error': 'Not authenticated'}), 401
+
+    try:
+        record = progress_service.new_progress_record(request.get_json(silent=True) or {}, session['user_id'])
+    except progress_service.ProgressError as e:
+        return crop_progress.error_response(e)
+    if record is None:
+        return jsonify({'status': 'error', 'error': 'Missing required fields'}), 400
+    try:
+        cursor, _ = await _sqlite(progress_db, storage.INSERT_PROGRESS_SQL, storage.progress_params(record))
+        progress_service.invalidate(session['user_id'])
+        return jsonify({'status': 'success', 'id': cursor.lastrowid})
+    except Exception as e:
+        return jsonify({'status': 'error', 'error': str(e)}), 500
+
+
+async def list_progress():
+    if 'user_id' not in session:
+        return jsonify([])
+    try:
+        user_id = session['user_id']
+        before_id, limit = progress_service.page_args(request.args)
+        hit, entries = progress_service.cached_entries(user_id, before_id, limit)
+        if not hit:
+            _, rows = await _sqlite(progress_db, storage.LIST_PROGRESS_SQL,
+                                    storage.list_params(user_id, before_id, limit), fetch=True)
+            entries = [storage.progress_from_row(r) for r in rows]
+            progress_service.remember(user_id, before_id, limit, entries)
+        today = datetime.utcnow().date()
+        return crop_progress.paged_response([progress_service.serialize_progress_row(r, today) for r in entries],
+                                            limit)
+    except Exception as e:
+        return crop_progress.error_response(e)
+
+
+async def delete_progress_json():
+    if 'user_id' not in session:
+        return jsonify({'status': 'error', 'error': 'Not authenticated'}), 401
+
+    pid = (request.get_json(silent=True) or {}).get('id')
+    if pid is None:
+        return jsonify({'status': 'error', 'error': 'Missing id'}), 400
+    try:
+        cursor, _ = await _sqlite(progress_db, storage.DELETE_PROGRESS_SQL, (pid, session['user_id']))
+        if cursor.rowcount == 0:
+            return jsonify({'status': 'error', 'error': 'Not found or not permitted'}), 404
+        progress_service.invalidate(session['user_id'])
+        return jsonify({'status': 'success'})
+    except Exception as e:
+        return jsonify({'status': 'error', 'error': str(e)}), 500
+
+
+async def add_dashboard_fertilizer_view():
+    if 'user_id' not in session:
+        return jsonify({'status': 'error', 'error': 'Not authenticated'}), 401
+
+    record = add_dashboard_fertilizer.new_fertilizer_record(request.get_json(silent=True) or {}, session['user_id'])
+    if record is None:
+        return jsonify({'status': 'error', 'error': 'Missing fertilizer name'}), 400
+    try:
+        cursor, _ = await _sqlite(fertilizer_db, storage.INSERT_FERTILIZER_SQL, storage.fertilizer_params(record))
+        await _invalidate_fragments(session['user_id'])
+        return jsonify(add_dashboard_fertilizer.fertilizer_saved_response(cursor.lastrowid, record))
+    except Exception as e:
+        return jsonify({'status': 'error', 'error': str(e)}), 500
+
+
+# ------------------ Application ------------------ #
+@asynccontextmanager
+async def lifespan(_):
+    global mdb, progress_db, fertilizer_db
+    mongo_uri = flask_module.get_mongo_uri()
+    motor_client = None
+    if mongo_uri:
+        motor_client = AsyncIOMotorClient(mongo_uri, serverSelectionTimeoutMS=10000,
+                                          event_listeners=[metrics.MongoCommandListener()])
+        mdb = motor_client[flask_module.MONGO_DB]
+    store = storage.get()
+    if isinstance(store, storage.SQLiteStorage):
+        # autocommit: statements from concurrent requests share one connection per file
+        progress_db = await aiosqlite.connect(store.progress_path, isolation_level=None)
+        progress_db.row_factory = aiosqlite.Row
+        fertilizer_db = await aiosqlite.connect(store.fertilizer_path, isolation_level=None)
+        fertilizer_db.row_factory = aiosqlite.Row
+    recommendation_executor.start()
+    try:
+        yield
+    finally:
+        for conn in (progress_db, fertilizer_db):
+            if conn is not None:
+                await conn.close()
+        if motor_client is not None:
+            motor_client.close()
+        recommendation_executor.shutdown()
+
+
+routes = [
+    Route('/dashboard', native(dashboard), methods=['GET', 'HEAD']),
+    Route('/profile', native(profile), methods=['GET', 'HEAD']),
+    Route('/api/weather', native(api_weather), methods=['GET', 'HEAD']),
+    Route('/api/market-prices', native(api_market_prices), methods=['GET', 'HEAD']),
+]
+# With Mongo storage these fall through to the blueprints
+if isinstance(storage.get(), storage.SQLiteStorage):
+    routes += [
+        Route('/progress/add', native(add_progress), methods=['POST']),
+        Route('/progress/list', native(list_progress), methods=['GET', 'HEAD']),
+        Route('/save_progress', native(add_progress), methods=['POST']),
+        Route('/get_progress', native(list_progress), methods=['GET', 'HEAD']),
+        Route('/progress/delete', native(delete_progress_json), methods=['POST']),
+        Route('/add_dashboard_fertilizer', native(add_dashboard_fertilizer_view), methods=['POST']),
+    ]
+routes.append(Mount('/', app=WSGIMiddleware(flask_app, workers=WSGI_THREADS)))
+
+app = Starlette(routes=routes, lifespan=lifespan)
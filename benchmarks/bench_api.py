@@ -0,0 +1,77 @@
+"""Payload size and latency: HTML form posts vs the /api/v1 JSON endpoints.
+
+    python -m benchmarks.bench_api [--repeat 200] [--out FILE]
+
+A logged-in client posts the same inputs to ``/crop-suggestion`` /
+``/fertilizer-advice`` (form, rendered page) and to ``/api/v1/...`` (JSON).
+Reports the response body size uncompressed, gzip and br (JSON responses
+are compressed by the app; HTML sizes are what the same codecs would give)
+and end-to-end latency through the WSGI test client. Recommendations run
+in-process (``RECOMMENDER_PROCESSES=0``) so only the web layer differs.
+"""
+import argparse
+import gzip
+import os
+
+from benchmarks.bench_recommenders import crop_inputs, fertilizer_inputs
+from benchmarks.harness import boot_app, measure, print_table, seed_users, write_results
+
+PASSWORD = 'benchpass'
+
+
+def _sizes(body):
+    sizes = {'raw': len(body), 'gzip': len(gzip.compress(body, compresslevel=6))}
+    try:
+        import brotli
+        sizes['br'] = len(brotli.compress(body, quality=5))
+    except ImportError:
+        pass
+    return sizes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args(argv)
+
+    os.environ['RECOMMENDER_PROCESSES'] = '0'
+    app_module, _ = boot_app()
+    email = seed_users(app_module, 1, PASSWORD, rounds=4)[0]
+    client = app_module.app.test_client()
+    client.post('/login', data={'email': email, 'password': PASSWORD})
+
+    crop = {k: round(v, 1) for k, v in crop_inputs(1)[0].items()}
+    fert = dict(fertilizer_inputs(1)[0], crop='rice')
+    fert = {k: (round(v, 1) if isinstance(v, float) else v) for k, v in fert.items()}
+    cases = {
+        'crop HTML': lambda: client.post('/crop-suggestion', data=crop),
+        'crop JSON': lambda: client.post('/api/v1/crop-suggestion', json=crop),
+        'crop JSON gzip': lambda: client.post('/api/v1/crop-suggestion', json=crop,
+                                              headers={'Accept-Encoding': 'gzip'}),
+        'fertilizer HTML': lambda: client.post('/fertilizer-advice', data=fert),
+        'fertilizer JSON': lambda: client.post('/api/v1/fertilizer-advice', json=fert),
+        'fertilizer JSON gzip': lambda: client.post('/api/v1/fertilizer-advice', json=fert,
+                                                    headers={'Accept-Encoding': 'gzip'}),
+    }
+
+    results = {}
+    sizes = {}
+    for name, call in cases.items():
+        response = call()
+        assert response.status_code == 200, (name, response.status_code)
+        if 'gzip' not in name:
+            sizes[name] = _sizes(response.get_data())
+        else:
+            sizes[name] = {'sent': len(response.get_data())}
+        results[name] = measure(call, repeat=args.repeat)
+        results[name]['bytes'] = sizes[name]
+
+    print_table(results)
+    for name, s in sizes.items():
+        print(f"{name:24s} " + '  '.join(f"{k} {v:>7d} B" for k, v in s.items()))
+    write_results('api', results, params=vars(args), path=args.out)
+
+
+if __name__ == '__main__':
+    main()
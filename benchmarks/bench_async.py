@@ -0,0 +1,118 @@
+"""WSGI vs ASGI dashboard capacity.
+
+    python -m benchmarks.bench_async --mongo-uri mongodb://127.0.0.1:27017 [--slo-ms 250]
+
+Starts ``gunicorn app:app`` and ``uvicorn asgi:app`` (one worker each, so the
+result is per core) against the given mongod, database ``farmerdb_bench``.
+For each server, concurrent users log in and poll ``/dashboard`` at
+increasing concurrency; the reported capacity is the highest concurrency
+whose p95 stays under ``--slo-ms`` with no errors.
+
+Needs a real mongod (Motor cannot talk to mongomock), httpx and the packages
+in requirements-async.txt.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from time import perf_counter
+
+import httpx
+
+from benchmarks.harness import ROOT, boot_app, seed_users, summarize, write_results
+
+PASSWORD = 'benchpass'
+SERVERS = {
+    'wsgi': lambda port: [sys.executable, '-m', 'gunicorn', 'app:app', '--workers', '1', '--threads', '8',
+                          '--bind', f'127.0.0.1:{port}', '--config', '/dev/null'],
+    'asgi': lambda port: [sys.executable, '-m', 'uvicorn', 'asgi:app', '--workers', '1',
+                          '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning'],
+}
+
+
+def _start(kind, port, env):
+    proc = subprocess.Popen(SERVERS[kind](port), cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f'http://127.0.0.1:{port}/login', timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f'{kind} server did not start on port {port}')
+
+
+async def _user(base_url, email, duration, samples, errors):
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        await client.post('/login', data={'email': email, 'password': PASSWORD})
+        stop = perf_counter() + duration
+        while perf_counter() < stop:
+            start = perf_counter()
+            try:
+                r = await client.get('/dashboard')
+                ok = r.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            samples.append(perf_counter() - start)
+            if not ok:
+                errors.append(1)
+
+
+async def _step(base_url, emails, duration):
+    samples, errors = [], []
+    await asyncio.gather(*(_user(base_url, e, duration, samples, errors) for e in emails))
+    return dict(summarize(samples), errors=len(errors), throughput_rps=len(samples) / duration)
+
+
+def run_server(kind, port, env, emails, levels, duration, slo_ms):
+    proc = _start(kind, port, env)
+    results, capacity = {}, 0
+    try:
+        for users in levels:
+            r = asyncio.run(_step(f'http://127.0.0.1:{port}', emails[:users], duration))
+            results[f'{kind} /dashboard x{users}'] = r
+            print(f"{kind}  users={users:4d}  p95 {r['p95_ms']:8.1f} ms  "
+                  f"{r['throughput_rps']:7.1f} req/s  errors={r['errors']}")
+            if r['p95_ms'] > slo_ms or r['errors']:
+                break
+            capacity = users
+    finally:
+        proc.terminate()
+        proc.wait()
+    results[f'{kind} capacity'] = {'users_per_core': capacity}
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--mongo-uri', required=True)
+    parser.add_argument('--levels', default='10,25,50,100,200,400')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per concurrency level')
+    parser.add_argument('--slo-ms', type=float, default=250.0, help='p95 latency target')
+    parser.add_argument('--port', type=int, default=18000)
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args(argv)
+    levels = [int(n) for n in args.levels.split(',')]
+
+    app_module, _ = boot_app(args.mongo_uri)
+    emails = seed_users(app_module, max(levels), PASSWORD, rounds=4)
+
+    # /dashboard only reads the SQLite files, so the servers can use the checked-in ones.
+    env = dict(os.environ, MONGO_URI=args.mongo_uri, MONGO_DB='farmerdb_bench', SECRET_KEY='bench',
+               PYTHONPATH=ROOT, METRICS_DIR=tempfile.mkdtemp(prefix='farming-bench-async-'))
+
+    results = {}
+    for offset, kind in enumerate(SERVERS):
+        results.update(run_server(kind, args.port + offset, env, emails, levels, args.duration, args.slo_ms))
+    print(f"users/core under p95 {args.slo_ms:.0f} ms: "
+          f"wsgi {results['wsgi capacity']['users_per_core']}, asgi {results['asgi capacity']['users_per_core']}")
+    write_results('async', results, params=vars(args), path=args.out)
+
+
+if __name__ == '__main__':
+    main()
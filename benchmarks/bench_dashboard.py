@@ -0,0 +1,84 @@
+"""Dashboard render time with and without the fragment cache, and template compile cost.
+
+    python -m benchmarks.bench_dashboard [--fertilizers 20] [--crops 10] [--repeat 300]
+
+A logged-in user with ``--fertilizers`` saved fertilizers and ``--crops``
+saved crops requests ``/dashboard`` repeatedly, first with the fragment cache
+disabled (every visit reads both lists and renders the whole page), then
+enabled (steady state: both fragments are cache hits). The write case
+invalidates the fertilizer fragment before each visit, as saving a
+fertilizer does.
+
+The compile rows time loading ``dashboard.html`` into a fresh Jinja
+environment, as a new worker does, without and with the on-disk bytecode
+cache.
+"""
+import argparse
+import os
+import tempfile
+
+from benchmarks.harness import boot_app, measure, print_table, seed_users, write_results
+
+PASSWORD = 'benchpass'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--fertilizers', type=int, default=20)
+    parser.add_argument('--crops', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=300)
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args(argv)
+
+    app_module, data_dir = boot_app()
+    import storage
+    import template_cache
+    from jinja2 import FileSystemBytecodeCache
+
+    email = seed_users(app_module, 1, PASSWORD, rounds=4)[0]
+    user_id = str(app_module.users_collection.find_one({'email': email})['_id'])
+    for i in range(args.fertilizers):
+        storage.get().add_fertilizer({'fertilizer_name': f"Fertilizer {i}", 'cost': 500 + i, 'yield_increase': '12',
+                                      'application_time': 'Morning', 'date_added': '2025-06-01T00:00:00',
+                                      'status': 'Purchased', 'selected_for': 'Rice', 'suitability': 80,
+                                      'user_id': user_id})
+    app_module.crops_collection.insert_many([{'name': f"Crop {i}", 'season': 'Kharif', 'user_id': user_id,
+                                              'created_at': '2025-06-01T00:00:00'} for i in range(args.crops)])
+
+    client = app_module.app.test_client()
+    client.post('/login', data={'email': email, 'password': PASSWORD})
+
+    def visit():
+        response = client.get('/dashboard')
+        assert response.status_code == 200, response.status_code
+
+    def visit_after_write():
+        template_cache.invalidate(user_id)
+        visit()
+
+    results = {}
+    ttl = template_cache.FRAGMENT_CACHE_TTL
+    template_cache.FRAGMENT_CACHE_TTL = 0
+    results['dashboard, no fragment cache'] = measure(visit, repeat=args.repeat)
+    template_cache.FRAGMENT_CACHE_TTL = ttl or 60
+    results['dashboard, fragments cached'] = measure(visit, repeat=args.repeat)
+    results['dashboard, fertilizers invalidated'] = measure(visit_after_write, repeat=args.repeat)
+
+    cache_dir = tempfile.mkdtemp(dir=data_dir)
+
+    def compile_template(bytecode_cache):
+        env = app_module.app.create_jinja_environment()
+        env.bytecode_cache = bytecode_cache
+        env.get_template('dashboard.html')
+
+    results['compile dashboard.html, no bytecode cache'] = measure(lambda: compile_template(None),
+                                                                   repeat=50, warmup=2)
+    results['load dashboard.html from bytecode cache'] = measure(
+        lambda: compile_template(FileSystemBytecodeCache(cache_dir)), repeat=50, warmup=2)
+
+    print_table(results)
+    write_results('dashboard', results, params=vars(args), path=args.out)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""Pickled sklearn forest vs its forest_arrays exports: size, memory, load time, latency.
+
+    python -m benchmarks.bench_forest_arrays [--trees 100] [--depths none,12,8] [--repeat 200]
+
+Trains the forest ``FertilizerDataset`` trains by default (``--trees``,
+unbounded depth, single-threaded) on the fertilizer dataset, pickles it and
+exports it with ``forest_arrays`` at each of ``--depths`` (``none``
+unpruned). Each artifact is then loaded in a fresh interpreter, which reports
+
+* file size on disk and load time;
+* RSS growth over the load (``/proc/self/statm``; a memory map adds only the
+  pages touched so far) and after serving ``--repeat`` single-row predictions;
+* the median single-row ``predict_proba`` and the per-row time of one batch of
+  every dataset row;
+* accuracy on the training rows and the largest probability difference from
+  the sklearn forest (0 for the unpruned export).
+
+Needs scikit-learn (benchmarks/requirements.txt).
+"""
+import argparse
+import json
+import os
+import pickle
+import statistics
+import subprocess
+import sys
+import tempfile
+from time import perf_counter
+
+from benchmarks.harness import ROOT, write_results
+
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+
+
+def child(kind, path, data_path, repeat):
+    """Runs in the measured interpreter; prints a JSON result line."""
+    import numpy as np
+    import forest_arrays
+    if kind == 'pickle':
+        import sklearn.ensemble  # noqa: F401  (imported before the baseline, like numpy)
+    data = np.load(data_path)
+    X, y, expected = data['X'], data['y'], data['proba']
+
+    before = rss_mb()
+    start = perf_counter()
+    if kind == 'pickle':
+        with open(path, 'rb') as f:
+            model = pickle.load(f)
+    else:
+        model = forest_arrays.load(path)
+    load_ms = (perf_counter() - start) * 1e3
+    loaded = rss_mb()
+
+    times = []
+    for i in range(repeat):
+        row = X[i % len(X)][None]
+        start = perf_counter()
+        model.predict_proba(row)
+        times.append(perf_counter() - start)
+    served = rss_mb()
+    start = perf_counter()
+    proba = model.predict_proba(X)
+    batch_s = perf_counter() - start
+    print(json.dumps({
+        'load_ms': load_ms,
+        'rss_load_mb': loaded - before,
+        'rss_served_mb': served - before,
+        'single_row_ms': statistics.median(times) * 1e3,
+        'batch_us_per_row': batch_s / len(X) * 1e6,
+        'accuracy': float(np.mean(model.classes_[proba.argmax(axis=1)] == y)),
+        'max_proba_diff': float(np.abs(proba - expected).max()),
+    }))
+
+
+def run_child(kind, path, data_path, repeat):
+    out = subprocess.run([sys.executable, '-m', 'benchmarks.bench_forest_arrays', '--child', kind, path, data_path,
+                          '--repeat', str(repeat)], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def disk_kb(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)) / 1024
+    return os.path.getsize(path) / 1024
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--trees', type=int, default=100)
+    parser.add_argument('--depths', default='none,12,8')
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--out', default=None)
+    parser.add_argument('--child', nargs=3, metavar=('KIND', 'PATH', 'DATA'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        child(*args.child, args.repeat)
+        return
+
+    import numpy as np
+    from sklearn.ensemble import RandomForestClassifier
+    import forest_arrays
+    import fertilizer_data
+
+    X, y, _ = fertilizer_data.training_data(fertilizer_data.load_dataset())
+    forest = RandomForestClassifier(n_estimators=args.trees, random_state=42, n_jobs=1).fit(X, y)
+    workdir = tempfile.mkdtemp(prefix='farming-bench-forest-')
+    data_path = os.path.join(workdir, 'data.npz')
+    np.savez(data_path, X=X, y=y, proba=forest.predict_proba(X))
+
+    artifacts = {'sklearn pickle': ('pickle', os.path.join(workdir, 'forest.pkl'))}
+    with open(artifacts['sklearn pickle'][1], 'wb') as f:
+        pickle.dump(forest, f)
+    for depth in args.depths.split(','):
+        max_depth = None if depth == 'none' else int(depth)
+        name = 'arrays' if max_depth is None else f"arrays depth {max_depth}"
+        path = os.path.join(workdir, name.replace(' ', '-'))
+        forest_arrays.ForestArrays.from_forest(forest, max_depth).save(path)
+        artifacts[name] = ('arrays', path)
+
+    results = {}
+    for name, (kind, path) in artifacts.items():
+        results[name] = dict(disk_kb=disk_kb(path), **run_child(kind, path, data_path, args.repeat))
+
+    print(f"{'artifact':18s} {'disk KB':>8s} {'load ms':>8s} {'RSS load':>9s} {'RSS srv':>8s} "
+          f"{'1-row ms':>9s} {'batch us':>9s} {'accuracy':>9s} {'max diff':>9s}")
+    for name, r in results.items():
+        print(f"{name:18s} {r['disk_kb']:8.0f} {r['load_ms']:8.2f} {r['rss_load_mb']:8.1f}M {r['rss_served_mb']:7.1f}M "
+              f"{r['single_row_ms']:9.3f} {r['batch_us_per_row']:9.1f} {r['accuracy']:9.4f} {r['max_proba_diff']:9.4f}")
+    write_results('forest_arrays', results, params=vars(args), path=args.out)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Cold-start cost of the Vercel entry point vs the full app, from ``-X importtime``.
+
+    python -m benchmarks.bench_importtime [--repeat 5] [--top 8]
+
+Each case imports its entry module in a fresh ``python -X importtime``
+interpreter and then serves one crop and one fertilizer recommendation, as
+the first request after a cold start would:
+
+* ``api.index``: the serverless entry, recommendations from the precomputed
+  NumPy tables (``RECOMMENDATION_TABLES=1``);
+* ``app``: the full app with recommendations from the dataset CSVs (pandas,
+  and the sklearn forest when it is installed).
+
+Reported per case: the median import time and first-recommendation time over
+``--repeat`` runs, whether pandas / sklearn / NumPy / bcrypt were imported and
+when, and the ``--top`` slowest top-level imports by cumulative time.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+from benchmarks.harness import ROOT, write_results
+
+CASES = {
+    'api.index': {'RECOMMENDATION_TABLES': '1'},
+    'app': {'RECOMMENDATION_TABLES': '0'},
+}
+WATCHED = ('pandas', 'sklearn', 'numpy', 'bcrypt')
+LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)')
+
+CHILD = """
+import json, time
+start = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+import model_registry
+models = model_registry.current()
+models.crop.get_crop_recommendations('90', '42', '43', '21', '82', '6.5', '203')
+models.fertilizer.get_fertilizer_recommendations('20', '30', '40', 'rice', '28', '60', '40')
+print(json.dumps({{'import_ms': (imported - start) * 1e3,
+                  'first_recommendation_ms': (time.perf_counter() - imported) * 1e3}}))
+"""
+
+
+def parse_importtime(stderr):
+    """``(cumulative_us by module, top-level (module, cumulative_us) list)`` from ``-X importtime`` output."""
+    cumulative, top_level = {}, []
+    for line in stderr.splitlines():
+        m = LINE.match(line)
+        if not m:
+            continue
+        us, name = int(m.group(2)), m.group(4)
+        cumulative[name] = us
+        if not m.group(3):
+            top_level.append((name, us))
+    return cumulative, top_level
+
+
+def run_case(module, env_overrides):
+    env = dict(os.environ, MONGO_URI='', MONGO_USER='', MONGO_PASSWORD='', RECOMMENDER_PROCESSES='0',
+               MODEL_WATCH_INTERVAL='0', **env_overrides)
+    env.pop('VERCEL', None)  # api.index sets it itself
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD.format(module=module)],
+                          cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    cumulative, top_level = parse_importtime(proc.stderr)
+    result['imported'] = {name: cumulative.get(name, 0) / 1e3 for name in WATCHED if name in cumulative}
+    result['top_level'] = top_level
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=8)
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args(argv)
+
+    results = {}
+    for module, env in CASES.items():
+        runs = [run_case(module, env) for _ in range(args.repeat)]
+        last = runs[-1]
+        results[module] = {
+            'import_ms': statistics.median(r['import_ms'] for r in runs),
+            'first_recommendation_ms': statistics.median(r['first_recommendation_ms'] for r in runs),
+            'imported_ms': last['imported'],
+            'slowest_imports_ms': {name: us / 1e3 for name, us in
+                                   sorted(last['top_level'], key=lambda kv: kv[1], reverse=True)[:args.top]},
+        }
+
+    for module, r in results.items():
+        print(f"{module:10s} import {r['import_ms']:8.1f} ms  first recommendation {r['first_recommendation_ms']:8.1f} ms")
+        imported = ', '.join(f"{name} {ms:.0f} ms" for name, ms in r['imported_ms'].items()) or 'none'
+        print(f"{'':10s} imported: {imported}")
+        for name, ms in r['slowest_imports_ms'].items():
+            print(f"{'':10s}   {name:40s} {ms:8.1f} ms")
+    write_results('importtime', results, params=vars(args), path=args.out)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Peak RSS and load time of the pandas vs streaming dataset loaders.
+
+    python -m benchmarks.bench_loaders [--rows 100000,1000000] [--keep DIR]
+
+Synthesizes crop and fertilizer CSVs of each size by resampling the bundled
+datasets with jitter (``Remark`` strings included), then loads every file
+with each loader in a fresh interpreter and records its peak RSS
+(``ru_maxrss``) and wall time. ``baseline`` is the interpreter with pandas
+imported and nothing loaded.
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+from time import perf_counter
+
+from benchmarks.harness import ROOT, write_results
+
+CHUNK = 200000
+
+
+def synthesize(kind, rows, path, seed=0):
+    import numpy as np
+    import pandas as pd
+    source = 'Crop_recommendation.csv' if kind == 'crop' else 'fertilizer_recommendation_dataset.csv'
+    base = pd.read_csv(os.path.join(ROOT, source))
+    numeric = base.select_dtypes('number').columns
+    rng = np.random.default_rng(seed)
+    written = 0
+    while written < rows:
+        n = min(CHUNK, rows - written)
+        chunk = base.iloc[rng.integers(0, len(base), n)].reset_index(drop=True)
+        chunk[numeric] = chunk[numeric] * rng.normal(1.0, 0.02, (n, len(numeric)))
+        chunk.to_csv(path, mode='a', header=written == 0, index=False)
+        written += n
+
+
+def child(kind, loader, path):
+    """Runs in the measured interpreter; prints a JSON result line."""
+    import pandas as pd  # noqa: F401  (part of the baseline)
+    start = perf_counter()
+    if loader == 'baseline':
+        pass
+    elif kind == 'crop':
+        os.environ['CROP_DATASET_PATH'] = path
+        os.environ['DATASET_LOADER'] = loader
+        import crop_data  # builds crop_data.crop_dataset from the env above
+    elif loader == 'streaming':
+        import streaming_loader
+        streaming_loader.fertilizer_sample(path)
+    else:
+        # FertilizerDataset._load_dataset
+        df = pd.read_csv(path)
+        df.columns = df.columns.str.strip()
+    print(json.dumps({'seconds': perf_counter() - start,
+                      'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+
+
+def run_child(kind, loader, path):
+    out = subprocess.run([sys.executable, '-m', 'benchmarks.bench_loaders', '--child', kind, loader, path],
+                         cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', default='100000,1000000')
+    parser.add_argument('--keep', default=None, help='write the synthetic CSVs here and keep them')
+    parser.add_argument('--child', nargs=3, metavar=('KIND', 'LOADER', 'PATH'), help=argparse.SUPPRESS)
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args(argv)
+    if args.child:
+        child(*args.child)
+        return
+
+    workdir = args.keep or tempfile.mkdtemp(prefix='farming-bench-loaders-')
+    os.makedirs(workdir, exist_ok=True)
+    results = {'baseline': run_child('crop', 'baseline', '-')}
+    try:
+        for rows in [int(n) for n in args.rows.split(',')]:
+            for kind in ('crop', 'fertilizer'):
+                path = os.path.join(workdir, f"{kind}-{rows}.csv")
+                if not os.path.exists(path):
+                    synthesize(kind, rows, path)
+                size_mb = os.path.getsize(path) / 2**20
+                for loader in ('pandas', 'streaming'):
+                    r = run_child(kind, loader, path)
+                    r.update(rows=rows, file_mb=size_mb)
+                    results[f"{kind} {loader} {rows} rows"] = r
+                    print(f"{kind:10s} {loader:9s} {rows:>10d} rows  {size_mb:8.1f} MB file  "
+                          f"peak RSS {r['peak_rss_mb']:8.1f} MB  {r['seconds']:7.2f} s")
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+    print(f"baseline peak RSS {results['baseline']['peak_rss_mb']:.1f} MB")
+    write_results('loaders', results, params=vars(args), path=args.out)
+
+
+if __name__ == '__main__':
+    main()
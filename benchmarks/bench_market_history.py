@@ -0,0 +1,66 @@
+"""Market price history: rollup reads vs scanning raw ticks.
+
+    python -m benchmarks.bench_market_history --mongo-uri mongodb://127.0.0.1:27017 [--days 730 --interval 15]
+
+Generates synthetic ticks with ``market_history.generate`` (recording the
+write rate), then times ``/api/market-prices/history`` for several ranges
+against building the same candles from the raw ticks. Needs a real mongod:
+mongomock can't run the rollups' ``bulk_write`` (and would scan linearly).
+"""
+import argparse
+from datetime import datetime, timedelta
+from time import perf_counter
+
+from benchmarks.harness import boot_app, measure, print_table, write_results
+
+RANGES = {'1d': timedelta(days=1), '30d': timedelta(days=30), '1y': timedelta(days=365)}
+
+
+def raw_candles(ticks_collection, crop, mandi, resolution, start, end):
+    import market_history
+    candles = {}
+    for tick in ticks_collection.find({'meta.crop': crop, 'meta.mandi': mandi, 'ts': {'$gte': start, '$lt': end}}):
+        t = market_history.bucket_start(tick['ts'], resolution)
+        c = candles.setdefault(t, [tick['price'], tick['price'], tick['price'], tick['price']])
+        c[1], c[2], c[3] = max(c[1], tick['price']), min(c[2], tick['price']), tick['price']
+    return candles
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--mongo-uri', required=True)
+    parser.add_argument('--days', type=float, default=730)
+    parser.add_argument('--interval', type=int, default=15, help='minutes between ticks')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args(argv)
+
+    app_module, _ = boot_app(args.mongo_uri)
+    import market_history
+    start = perf_counter()
+    count = market_history.generate(app_module.db, args.days / 365, args.interval)
+    elapsed = perf_counter() - start
+    results = {'generate': {'ticks': count, 'seconds': elapsed, 'ticks_per_s': count / elapsed}}
+    print(f"Generated {count} ticks in {elapsed:.1f}s ({count / elapsed:.0f} ticks/s)")
+
+    client = app_module.app.test_client()
+    end = datetime.utcnow()
+    for label, span in RANGES.items():
+        if span.days > args.days:
+            continue
+        resolution = market_history.pick_resolution(end - span, end)
+        query = f"/api/market-prices/history?crop=rice&start={(end - span).isoformat()}&end={end.isoformat()}"
+        points = len(client.get(query).get_json()['points'])
+        results[f'history {label} ({resolution}, {points} points)'] = measure(lambda: client.get(query),
+                                                                               repeat=args.repeat, warmup=2)
+        results[f'raw scan {label} ({resolution})'] = measure(
+            lambda: raw_candles(market_history.ticks_collection, 'rice', market_history.DEFAULT_MANDI,
+                                resolution, end - span, end),
+            repeat=args.repeat, warmup=2)
+
+    print_table(results)
+    write_results('market_history', results, params=vars(args), path=args.out)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Per-request overhead of the metrics hooks.
+
+Run from the repo root:  python -m benchmarks.bench_metrics
+
+Times the before/after/teardown hooks directly inside a request context (the
+part metrics adds to every request) and, for reference, end-to-end requests
+through the test client with and without the hooks installed.
+"""
+import sys
+import time
+from time import perf_counter
+
+from flask import Flask
+
+import metrics
+from benchmarks.harness import write_results
+
+BUDGET_US = 20.0
+N = 50000
+
+
+def _plain_app(with_metrics):
+    app = Flask(__name__)
+
+    @app.route('/ping')
+    def ping():
+        return 'ok'
+
+    if with_metrics:
+        metrics.init_app(app)
+    return app
+
+
+def bench_hooks():
+    app = _plain_app(with_metrics=True)
+    response = app.response_class('ok')
+    with app.test_request_context('/ping'):
+        for _ in range(1000):  # warm up
+            metrics._before_request()
+            metrics._after_request(response)
+            metrics._teardown_request(None)
+        start = perf_counter()
+        for _ in range(N):
+            metrics._before_request()
+            metrics._after_request(response)
+            metrics._teardown_request(None)
+        elapsed = perf_counter() - start
+    return elapsed / N * 1e6
+
+
+def bench_end_to_end(with_metrics, n=5000):
+    client = _plain_app(with_metrics).test_client()
+    for _ in range(200):
+        client.get('/ping')
+    start = perf_counter()
+    for _ in range(n):
+        client.get('/ping')
+    return (perf_counter() - start) / n * 1e6
+
+
+def main():
+    metrics.reset()
+    hook_us = bench_hooks()
+    base_us = bench_end_to_end(False)
+    with_us = bench_end_to_end(True)
+    print(f"metrics hooks:         {hook_us:8.2f} us/request (budget {BUDGET_US:.0f} us)")
+    print(f"test client, no hooks: {base_us:8.2f} us/request")
+    print(f"test client, hooks:    {with_us:8.2f} us/request (delta {with_us - base_us:+.2f} us)")
+
+    start = time.perf_counter()
+    body = metrics.render_latest()
+    render_ms = (time.perf_counter() - start) * 1e3
+    print(f"/metrics render:       {render_ms:8.2f} ms ({len(body)} bytes)")
+    write_results('metrics', {
+        'hooks': {'median_ms': hook_us / 1e3, 'us_per_request': hook_us, 'budget_us': BUDGET_US},
+        'test_client_without_hooks': {'median_ms': base_us / 1e3},
+        'test_client_with_hooks': {'median_ms': with_us / 1e3},
+        'render': {'median_ms': render_ms, 'bytes': len(body)},
+    })
+    return 0 if hook_us < BUDGET_US else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
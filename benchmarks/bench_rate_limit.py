@@ -0,0 +1,63 @@
+"""Per-request overhead of the rate limiter for each store.
+
+    python -m benchmarks.bench_rate_limit [--mongo-uri URI] [--repeat 2000]
+
+For each backend, times ``store.take()`` alone and the limiter's
+before/teardown hooks around a limited request (``POST /login``), with a
+budget large enough that every request is allowed. Keys rotate over
+``--clients`` clients. The Mongo store needs a real mongod (mongomock has no
+pipeline updates).
+"""
+import argparse
+import itertools
+import os
+import tempfile
+import time
+
+from benchmarks.harness import boot_app, measure, print_table, write_results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--mongo-uri', default=None)
+    parser.add_argument('--repeat', type=int, default=2000)
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args(argv)
+
+    app_module, data_dir = boot_app(args.mongo_uri)
+    import rate_limit
+    rate_limit.BUDGETS['login'] = (10 ** 9, 1.0)
+    stores = {
+        'memory': rate_limit.MemoryStore(),
+        'sqlite': rate_limit.SQLiteStore(os.path.join(data_dir or tempfile.mkdtemp(), 'rate_limits.db')),
+    }
+    if args.mongo_uri:
+        stores['mongo'] = rate_limit.MongoStore(app_module.db)
+
+    app = app_module.app
+    ips = itertools.cycle([f"10.0.{i // 256}.{i % 256}" for i in range(args.clients)])
+    keys = itertools.cycle([f"login:ip:10.0.0.{i}" for i in range(args.clients)])
+
+    def hooks():
+        with app.test_request_context('/login', method='POST', environ_base={'REMOTE_ADDR': next(ips)}):
+            assert rate_limit._before_request() is None
+            rate_limit._teardown_request(None)
+
+    def bare():
+        with app.test_request_context('/login', method='POST', environ_base={'REMOTE_ADDR': next(ips)}):
+            pass
+
+    results = {'request context, no limiter': measure(bare, repeat=args.repeat)}
+    for name, store in stores.items():
+        results[f'{name} take()'] = measure(lambda: store.take(next(keys), 10 ** 9, 1.0, time.time()),
+                                            repeat=args.repeat)
+        rate_limit._store = store
+        results[f'{name} request context + hooks'] = measure(hooks, repeat=args.repeat)
+
+    print_table(results)
+    write_results('rate_limit', results, params=vars(args), path=args.out)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Microbenchmarks for the recommendation engines.
+
+    python -m benchmarks.bench_recommenders [--repeat 200] [--out FILE]
+
+Inputs are drawn from a fixed seed so runs are comparable. The ``tables:``
+rows serve from ``models/recommendation_tables.npz`` (the bundled forest
+export instead of the sklearn forest).
+"""
+import argparse
+import itertools
+import random
+
+from benchmarks.harness import measure, print_table, write_results
+
+CROPS = ['rice', 'wheat', 'maize', 'cotton', 'sugarcane', 'tea', 'coffee', 'unknowncrop']
+
+
+def crop_inputs(n, seed=7):
+    rng = random.Random(seed)
+    return [dict(nitrogen=rng.uniform(0, 140), phosphorus=rng.uniform(5, 145), potassium=rng.uniform(5, 205),
+                 temperature=rng.uniform(10, 40), humidity=rng.uniform(15, 99), ph=rng.uniform(4, 9),
+                 rainfall=rng.uniform(20, 290)) for _ in range(n)]
+
+
+def fertilizer_inputs(n, seed=11):
+    rng = random.Random(seed)
+    return [dict(nitrogen=rng.uniform(0, 120), phosphorus=rng.uniform(0, 100), potassium=rng.uniform(0, 150),
+                 crop=rng.choice(CROPS), temperature=rng.uniform(10, 40), humidity=rng.uniform(20, 95),
+                 moisture=rng.uniform(20, 100)) for _ in range(n)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args(argv)
+
+    from crop_data import CropDataset
+    from fertilizer_data import FertilizerDataset
+    from recommendation_records import dumps
+    import recommendation_tables
+    crops = CropDataset()
+    ferts = FertilizerDataset()
+    table_crops, table_ferts = recommendation_tables.load()
+
+    crop_cycle = itertools.cycle(crop_inputs(64))
+    fert_cycle = itertools.cycle(fertilizer_inputs(64))
+
+    def numeric(kw):
+        return (float(kw['temperature']), float(kw['humidity']), float(kw['moisture']) / 100.0,
+                float(kw['nitrogen']), float(kw['phosphorus']), float(kw['potassium']), kw['crop'])
+
+    crop_recs = crops.get_crop_recommendations(**crop_inputs(1)[0])
+    fert_recs = ferts.get_fertilizer_recommendations(**fertilizer_inputs(1)[0])
+
+    results = {
+        'CropDataset.get_crop_recommendations':
+            measure(lambda: crops.get_crop_recommendations(**next(crop_cycle)), repeat=args.repeat),
+        'FertilizerDataset.get_fertilizer_recommendations':
+            measure(lambda: ferts.get_fertilizer_recommendations(**next(fert_cycle)), repeat=args.repeat),
+        'FertilizerDataset._fertilizer_counts':
+            measure(lambda: ferts._fertilizer_counts(*numeric(next(fert_cycle))), repeat=args.repeat),
+        'FertilizerDataset._predict_fertilizers':
+            measure(lambda: _predict(ferts, next(fert_cycle)), repeat=args.repeat),
+        'tables: CropTable.get_crop_recommendations':
+            measure(lambda: table_crops.get_crop_recommendations(**next(crop_cycle)), repeat=args.repeat),
+        'tables: TableFertilizerModel.get_fertilizer_recommendations':
+            measure(lambda: table_ferts.get_fertilizer_recommendations(**next(fert_cycle)), repeat=args.repeat),
+        'dumps(crop recommendations)': measure(lambda: dumps(crop_recs), repeat=args.repeat),
+        'dumps(fertilizer recommendations)': measure(lambda: dumps(fert_recs), repeat=args.repeat),
+    }
+    print_table(results)
+    write_results('recommenders', results, params={'repeat': args.repeat}, path=args.out)
+
+
+def _predict(ferts, kw):
+    return ferts._predict_fertilizers(float(kw['temperature']), float(kw['moisture']), float(kw['nitrogen']),
+                                      float(kw['phosphorus']), float(kw['potassium']), kw['crop'], top_k=5)
+
+
+if __name__ == '__main__':
+    main()
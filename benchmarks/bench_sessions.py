@@ -0,0 +1,94 @@
+"""Cookie size, queries and latency per page view for each session backend.
+
+    python -m benchmarks.bench_sessions [--mongo-uri URI] [--repeat 200]
+
+For ``cookie`` (Flask's signed cookie), ``sqlite`` and ``mongo`` server-side
+sessions, a logged-in user views ``/profile`` and ``/dashboard``; reports the
+session cookie size, the Mongo and SQLite operations issued per view and the
+view latency.
+"""
+import argparse
+from collections import Counter
+
+from benchmarks.harness import boot_app, measure, print_table, seed_users, write_results
+
+PASSWORD = 'benchpass'
+PAGES = ('/profile', '/dashboard')
+
+
+class CountingCollection:
+    """Wraps a collection and counts method calls by ``<collection>.<method>``."""
+
+    def __init__(self, collection, counts):
+        self._collection = collection
+        self._counts = counts
+
+    def __getattr__(self, attr):
+        value = getattr(self._collection, attr)
+        if not callable(value):
+            return value
+        name = f"{self._collection.name}.{attr}"
+
+        def call(*args, **kwargs):
+            self._counts[name] += 1
+            return value(*args, **kwargs)
+        return call
+
+
+def _sqlite_ops():
+    import metrics
+    return sum(sum(h[:-1]) for (name, labels), h in metrics._histograms.items()
+               if name == 'farming_span_duration_seconds' and labels[0][1].startswith('sqlite.'))
+
+
+def run_backend(app_module, backend, email, repeat, counts):
+    import session_store
+    session_store.init_app(app_module.app, mongo_db=app_module.db, backend=backend)
+    if backend == 'mongo':
+        interface = app_module.app.session_interface
+        interface.backend.collection = CountingCollection(interface.backend.collection, counts)
+
+    client = app_module.app.test_client()
+    client.post('/login', data={'email': email, 'password': PASSWORD})
+    cookie = client.get_cookie('session')
+    results = {f'{backend} cookie': {'bytes': len(cookie.key) + 1 + len(cookie.value)}}
+
+    for page in PAGES:
+        client.get(page)  # warm the LRU
+        counts.clear()
+        sqlite_before = _sqlite_ops()
+        client.get(page)
+        results[f'{backend} {page} queries'] = {'mongo': sum(counts.values()), 'sqlite': _sqlite_ops() - sqlite_before,
+                                                 'detail': dict(counts)}
+        results[f'{backend} GET {page}'] = measure(lambda: client.get(page), repeat=repeat)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--mongo-uri', default=None, help='local mongod instead of mongomock')
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args(argv)
+
+    app_module, _ = boot_app(args.mongo_uri)
+    email = seed_users(app_module, 1, PASSWORD, rounds=4)[0]
+    counts = Counter()
+    for name in ('users_collection', 'crops_collection', 'weather_collection'):
+        setattr(app_module, name, CountingCollection(getattr(app_module, name), counts))
+
+    results = {}
+    for backend in ('cookie', 'sqlite', 'mongo'):
+        results.update(run_backend(app_module, backend, email, args.repeat, counts))
+
+    print_table(results)
+    for key, r in results.items():
+        if 'bytes' in r:
+            print(f"{key:52s} {r['bytes']} bytes")
+        elif 'mongo' in r:
+            print(f"{key:52s} mongo {r['mongo']}  sqlite {r['sqlite']}  {r['detail']}")
+    write_results('sessions', results, params=vars(args), path=args.out)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Per-user list queries on the SQLite store, with and without the user_id indexes.
+
+    python -m benchmarks.bench_storage [--users 2000] [--per-user 20] [--repeat 500]
+
+Seeds ``--users`` users with ``--per-user`` progress entries and saved
+fertilizers each (interleaved, as real traffic writes them), then times
+``list_progress`` / ``list_fertilizers`` for one user: the full list and a
+first page of 10. The same queries are repeated after dropping the
+``(user_id, id DESC)`` indexes to show the table-scan cost, and the query
+plans of both runs are printed.
+"""
+import argparse
+import os
+import random
+import tempfile
+
+from benchmarks.harness import measure, print_table, write_results
+
+import storage
+from metrics import sqlite_connect
+
+INDEXES = {'progress_path': 'idx_crop_progress_user_id', 'fertilizer_path': 'idx_dashboard_fertilizers_user_id'}
+
+
+def seed(store, users, per_user):
+    progress, fertilizers = [], []
+    for n in range(per_user):
+        for u in range(users):
+            user_id = f"user{u:06d}"
+            progress.append({'user_id': user_id, 'crop_name': 'Rice', 'start_date': '2025-06-01',
+                             'harvest_date': '2025-10-01', 'status': 'monitoring', 'recommendation': '',
+                             'task_timeline': [{'name': f"Task {i}", 'date': '2025-07-01'} for i in range(8)]})
+            fertilizers.append({'fertilizer_name': 'Urea', 'cost': 540, 'yield_increase': '12%',
+                                'application_time': 'Morning', 'date_added': '2025-06-01T00:00:00',
+                                'status': 'Purchased', 'selected_for': 'Rice', 'suitability': 80,
+                                'user_id': user_id})
+    store.add_progress_many(progress)
+    store.add_fertilizers_many(fertilizers)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--per-user', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=500)
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args(argv)
+
+    data_dir = tempfile.mkdtemp(prefix='farming-bench-')
+    store = storage.SQLiteStorage(os.path.join(data_dir, 'progress.db'),
+                                  os.path.join(data_dir, 'dashboard_fertilizers.db'))
+    store.ensure_schema()
+    seed(store, args.users, args.per_user)
+    users = [f"user{u:06d}" for u in range(args.users)]
+
+    cases = {
+        'list_progress': lambda: store.list_progress(random.choice(users)),
+        'list_progress limit 10': lambda: store.list_progress(random.choice(users), limit=10),
+        'list_fertilizers': lambda: store.list_fertilizers(random.choice(users)),
+    }
+    results = {}
+    for label in ('indexed', 'no index'):
+        if label == 'no index':
+            for attr, index in INDEXES.items():
+                conn = sqlite_connect(getattr(store, attr))
+                conn.execute(f"DROP INDEX {index}")
+                conn.commit()
+                conn.close()
+        for name, plan in store.query_plans().items():
+            print(f"{label:9s} {name:18s} {' / '.join(plan)}")
+        for name, call in cases.items():
+            results[f"{name} ({label})"] = measure(call, repeat=args.repeat)
+
+    print_table(results)
+    write_results('storage', results, params=vars(args), path=args.out)
+
+
+if __name__ == '__main__':
+    main()
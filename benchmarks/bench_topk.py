@@ -0,0 +1,94 @@
+"""Top-k selection vs full sorts on the fertilizer path, with a 100-class synthetic model.
+
+    python -m benchmarks.bench_topk [--classes 100] [--rows-per-class 40] [--repeat 500]
+
+Writes a synthetic fertilizer dataset with ``--classes`` fertilizers (the ten
+real ones plus made-up names) and ``--rows-per-class`` rows each, points
+``FERTILIZER_DATASET_PATH`` at it and builds ``FertilizerDataset`` from it
+(the forest is trained when sklearn is installed). Then times
+
+* the selections the recommenders make, full sort vs ``topk``: the 5 most
+  probable classes and the 10 nearest rows;
+* ``_predict_fertilizers`` and ``get_fertilizer_recommendations`` end to end,
+  for ``top_k`` 5 and 20.
+"""
+import argparse
+import itertools
+import os
+import tempfile
+
+import numpy as np
+
+from benchmarks.harness import ROOT, measure, print_table, write_results
+from benchmarks.bench_recommenders import fertilizer_inputs
+
+COLUMNS = ['Temperature', 'Moisture', 'Rainfall', 'PH', 'Nitrogen', 'Phosphorous', 'Potassium', 'Carbon', 'Soil',
+           'Crop', 'Fertilizer', 'Remark']
+
+
+def synthesize(path, classes, rows_per_class, seed=0):
+    import pandas as pd
+    from fertilizer_rules import FERTILIZERS
+    base = pd.read_csv(os.path.join(ROOT, 'fertilizer_recommendation_dataset.csv'))
+    base.columns = base.columns.str.strip()
+    names = list(FERTILIZERS) + [f"Synthetic Fertilizer {i:03d}" for i in range(max(0, classes - len(FERTILIZERS)))]
+    rng = np.random.default_rng(seed)
+    frames = []
+    for i, name in enumerate(names[:classes]):
+        rows = base.iloc[rng.integers(0, len(base), rows_per_class)].reset_index(drop=True)
+        # Shift each class's numbers so the classes are separable
+        for col, scale in (('Temperature', 0.3), ('Nitrogen', 1.0), ('Phosphorous', 1.0), ('Potassium', 1.5)):
+            rows[col] = rows[col] + rng.normal(i * scale, 2.0, rows_per_class)
+        rows['Fertilizer'] = name
+        frames.append(rows)
+    pd.concat(frames, ignore_index=True)[COLUMNS].to_csv(path, index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--classes', type=int, default=100)
+    parser.add_argument('--rows-per-class', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=500)
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args(argv)
+
+    path = os.path.join(tempfile.mkdtemp(prefix='farming-bench-topk-'), 'fertilizers.csv')
+    synthesize(path, args.classes, args.rows_per_class)
+    os.environ['FERTILIZER_DATASET_PATH'] = path
+    os.environ['DATASET_LOADER'] = 'pandas'
+    from fertilizer_data import FertilizerDataset
+    from topk import top_indices
+    ferts = FertilizerDataset()
+    table = ferts.table
+    model = 'forest' if ferts.model is not None else 'no model'
+    print(f"{len(table)} rows, {len(table.labels)} classes, predictions from {model}")
+
+    probs = np.random.default_rng(1).dirichlet(np.ones(args.classes))
+    classes = np.array(table.labels)
+    row_scores = np.random.default_rng(3).random(len(table))
+    inputs = itertools.cycle(fertilizer_inputs(64))
+
+    def predict(kw):
+        return ferts._predict_fertilizers(float(kw['temperature']), float(kw['moisture']), float(kw['nitrogen']),
+                                          float(kw['phosphorus']), float(kw['potassium']), kw['crop'], top_k=5)
+
+    results = {
+        'top 5 classes: sorted': measure(
+            lambda: sorted(zip(classes, probs), key=lambda kv: kv[1], reverse=True)[:5], repeat=args.repeat),
+        'top 5 classes: top_indices': measure(lambda: top_indices(probs, 5), repeat=args.repeat),
+        f"nearest 10 of {len(table)} rows: lexsort": measure(
+            lambda: np.lexsort((table.rows, row_scores))[:10], repeat=args.repeat),
+        f"nearest 10 of {len(table)} rows: top_indices": measure(
+            lambda: top_indices(row_scores, 10, largest=False, tiebreak=table.rows), repeat=args.repeat),
+        f"_predict_fertilizers ({model})": measure(lambda: predict(next(inputs)), repeat=args.repeat),
+    }
+    for k in (5, 20):
+        results[f"get_fertilizer_recommendations top_k={k}"] = measure(
+            lambda: ferts.get_fertilizer_recommendations(**next(inputs), top_k=k), repeat=args.repeat)
+
+    print_table(results)
+    write_results('topk', results, params=dict(vars(args), model=model), path=args.out)
+
+
+if __name__ == '__main__':
+    main()
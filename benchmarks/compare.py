@@ -0,0 +1,46 @@
+"""Compare two benchmark result files and flag regressions.
+
+    python -m benchmarks.compare BASELINE.json CURRENT.json [--threshold 0.10] [--metric median_ms]
+
+Exits with status 1 when any benchmark's metric grew by more than
+``threshold`` (a fraction) relative to the baseline.
+"""
+import argparse
+import json
+import sys
+
+
+def compare(baseline, current, metric='median_ms', threshold=0.10):
+    """Yield ``(name, old, new, change, regressed)`` for benchmarks in both records."""
+    for name, new in current['results'].items():
+        old = baseline['results'].get(name)
+        if not isinstance(old, dict) or not isinstance(new, dict) or metric not in old or metric not in new:
+            continue
+        change = (new[metric] - old[metric]) / old[metric] if old[metric] else 0.0
+        yield name, old[metric], new[metric], change, change > threshold
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=0.10)
+    parser.add_argument('--metric', default='median_ms')
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    regressions = 0
+    for name, old, new, change, regressed in compare(baseline, current, args.metric, args.threshold):
+        flag = 'REGRESSION' if regressed else ''
+        regressions += regressed
+        print(f"{name:52s} {old:10.3f} -> {new:10.3f} {args.metric} ({change:+.1%}) {flag}")
+    print(f"{regressions} regression(s) above {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
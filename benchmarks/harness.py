@@ -0,0 +1,154 @@
+"""Shared setup for the benchmark suite.
+
+``boot_app()`` imports the Flask app against local stand-ins: mongomock (or a
+local mongod given by ``--mongo-uri``) and SQLite files in a temp directory,
+so runs never touch Atlas or the checked-in ``*.db`` files.
+``measure()`` times a callable and ``write_results()`` stores a JSON record
+under ``benchmarks/results/`` that ``benchmarks.compare`` can diff.
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from time import perf_counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def isolate(data_dir=None):
+    """Point the app's configuration at temp files; call before importing any app module
+    (``storage``, ``session_store``... read their paths on import). Returns ``data_dir``."""
+    # Keep app.py from connecting to Atlas with credentials from .env
+    os.environ['MONGO_USER'] = ''
+    os.environ['MONGO_PASSWORD'] = ''
+    os.environ['MONGO_URI'] = ''
+    os.environ.pop('VERCEL', None)
+    data_dir = data_dir or tempfile.mkdtemp(prefix='farming-bench-')
+    os.environ.setdefault('SESSION_DB_PATH', os.path.join(data_dir, 'sessions.db'))
+    # Benchmarks replay many requests from one client; bench_rate_limit installs its own
+    os.environ.setdefault('RATE_LIMIT_BACKEND', 'off')
+
+    os.environ.setdefault('STORAGE_BACKEND', 'sqlite')
+    os.environ.setdefault('PROGRESS_DB_PATH', os.path.join(data_dir, 'progress.db'))
+    os.environ.setdefault('FERTILIZER_DB_PATH', os.path.join(data_dir, 'dashboard_fertilizers.db'))
+    os.environ.setdefault('JINJA_CACHE_DIR', os.path.join(data_dir, 'jinja'))
+    return data_dir
+
+
+def boot_app(mongo_uri=None, data_dir=None):
+    """Import ``app`` wired to local Mongo and temp SQLite files.
+
+    Returns ``(app_module, data_dir)``.
+    """
+    data_dir = isolate(data_dir)
+
+    import app as app_module
+
+    if mongo_uri:
+        from pymongo import MongoClient
+        client = MongoClient(mongo_uri)
+        client.drop_database('farmerdb_bench')
+    else:
+        import mongomock
+        client = mongomock.MongoClient()
+    db = client['farmerdb_bench']
+    app_module.client = client
+    app_module.db = db
+    app_module.users_collection = db['users']
+    app_module.crops_collection = db['crops']
+    app_module.weather_collection = db['weather']
+    app_module.market_collection = db['market_prices']
+    app_module.init_db()
+    import market_history
+    import weather_store
+    market_history.ensure_collections(db)
+    weather_store.init(db)
+    app_module.app.config['TESTING'] = True
+    return app_module, data_dir
+
+
+def seed_users(app_module, count, password='benchpass', rounds=12):
+    """Insert ``count`` users sharing one bcrypt hash; returns their emails."""
+    import bcrypt
+    hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds))
+    emails = [f"farmer{i}@bench.local" for i in range(count)]
+    app_module.users_collection.insert_many([
+        {"name": f"Farmer {i}", "email": email, "password": hashed,
+         "created_at": datetime.utcnow(), "last_login": datetime.utcnow()}
+        for i, email in enumerate(emails)
+    ])
+    return emails
+
+
+def summarize(samples):
+    """Latency summary in milliseconds for a list of durations in seconds."""
+    ordered = sorted(samples)
+    n = len(ordered)
+    return {
+        'n': n,
+        'min_ms': ordered[0] * 1e3,
+        'median_ms': statistics.median(ordered) * 1e3,
+        'mean_ms': statistics.fmean(ordered) * 1e3,
+        'p95_ms': ordered[min(n - 1, int(n * 0.95))] * 1e3,
+        'max_ms': ordered[-1] * 1e3,
+    }
+
+
+def measure(func, repeat=200, warmup=10):
+    """Call ``func`` ``warmup`` + ``repeat`` times and summarize the timed calls."""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = perf_counter()
+        func()
+        samples.append(perf_counter() - start)
+    return summarize(samples)
+
+
+def _git_rev():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(name, results, params=None, path=None):
+    """Write a results record and return its path.
+
+    ``results`` maps a benchmark name to a ``summarize()`` dict (plus any
+    extra numbers); ``benchmarks.compare`` diffs records by those keys.
+    """
+    record = {
+        'suite': name,
+        'timestamp': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+        'git_rev': _git_rev(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'params': params or {},
+        'results': results,
+    }
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{name}-{time.strftime('%Y%m%dT%H%M%S')}.json")
+    with open(path, 'w') as f:
+        json.dump(record, f, indent=2)
+    print(f"Results written to {path}")
+    return path
+
+
+def print_table(results):
+    for key, r in results.items():
+        if isinstance(r, dict) and 'median_ms' in r:
+            print(f"{key:52s} median {r['median_ms']:9.3f} ms  p95 {r['p95_ms']:9.3f} ms  n={r['n']}")
@@ -0,0 +1,153 @@
+"""Scripted multi-user load test.
+
+    python -m benchmarks.load_test [--users 20] [--iterations 10] [--mongo-uri URI]
+    python -m benchmarks.load_test --base-url http://127.0.0.1:10000 --users 50
+
+Each virtual user logs in, opens the dashboard, then loops over the polling
+endpoints (weather, market prices) and the progress routes (add, list, mark
+done). Without ``--base-url`` the app runs in-process against mongomock (or
+``--mongo-uri``) and temp SQLite files; with it, users are registered over
+HTTP against a running server.
+"""
+import argparse
+import http.cookiejar
+import json
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from datetime import date, timedelta
+from time import perf_counter
+
+from benchmarks.harness import boot_app, print_table, seed_users, summarize, write_results
+
+PASSWORD = 'benchpass'
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class RemoteClient:
+    """Minimal cookie-keeping HTTP client with the test-client call shape."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect())
+
+    def _open(self, req):
+        try:
+            with self.opener.open(req, timeout=30) as resp:
+                return resp.status, resp.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def get(self, path):
+        return self._open(urllib.request.Request(self.base_url + path))
+
+    def post(self, path, data=None, json_body=None):
+        if json_body is not None:
+            body, ctype = json.dumps(json_body).encode(), 'application/json'
+        else:
+            body, ctype = urllib.parse.urlencode(data or {}).encode(), 'application/x-www-form-urlencoded'
+        return self._open(urllib.request.Request(self.base_url + path, data=body,
+                                                 headers={'Content-Type': ctype}, method='POST'))
+
+
+class LocalClient:
+    def __init__(self, flask_app):
+        self.client = flask_app.test_client()
+
+    def get(self, path):
+        r = self.client.get(path)
+        return r.status_code, r.data
+
+    def post(self, path, data=None, json_body=None):
+        r = self.client.post(path, data=data, json=json_body)
+        return r.status_code, r.data
+
+
+def virtual_user(client, email, iterations, timings, errors, lock):
+    local = defaultdict(list)
+    failed = defaultdict(int)
+
+    def step(name, call, ok=(200,)):
+        start = perf_counter()
+        status, body = call()
+        local[name].append(perf_counter() - start)
+        if status not in ok:
+            failed[name] += 1
+        return status, body
+
+    step('POST /login', lambda: client.post('/login', data={'email': email, 'password': PASSWORD}), ok=(302,))
+    step('GET /dashboard', lambda: client.get('/dashboard'))
+    today = date.today()
+    timeline = [{'name': f'Task {i}', 'date': (today + timedelta(days=7 * i)).isoformat(), 'done': False}
+                for i in range(6)]
+    for i in range(iterations):
+        step('GET /api/weather', lambda: client.get('/api/weather'))
+        step('GET /api/market-prices', lambda: client.get('/api/market-prices'))
+        if i % 5 == 0:
+            status, body = step('POST /progress/add', lambda: client.post('/progress/add', json_body={
+                'crop_name': 'Rice', 'start_date': today.isoformat(),
+                'harvest_date': (today + timedelta(days=120)).isoformat(), 'task_timeline': timeline}))
+            if status == 200:
+                pid = json.loads(body)['id']
+                step('POST /mark_task_done', lambda: client.post('/mark_task_done', json_body={
+                    'progress_id': pid, 'task_index': 0}))
+        step('GET /progress/list', lambda: client.get('/progress/list'))
+        step('GET /get_progress', lambda: client.get('/get_progress'))
+    step('GET /dashboard (end)', lambda: client.get('/dashboard'))
+
+    with lock:
+        for name, samples in local.items():
+            timings[name].extend(samples)
+        for name, count in failed.items():
+            errors[name] += count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--mongo-uri', default=None, help='local mongod instead of mongomock')
+    parser.add_argument('--base-url', default=None, help='drive a running server instead of in-process')
+    parser.add_argument('--bcrypt-rounds', type=int, default=12)
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args(argv)
+
+    if args.base_url:
+        emails = [f"loadtest{i}@bench.local" for i in range(args.users)]
+        for email in emails:
+            RemoteClient(args.base_url).post('/register', data={
+                'name': 'Load Test', 'email': email, 'password': PASSWORD, 'confirm_password': PASSWORD})
+        clients = [RemoteClient(args.base_url) for _ in emails]
+    else:
+        app_module, data_dir = boot_app(args.mongo_uri)
+        emails = seed_users(app_module, args.users, PASSWORD, rounds=args.bcrypt_rounds)
+        clients = [LocalClient(app_module.app) for _ in emails]
+
+    timings, errors, lock = defaultdict(list), defaultdict(int), threading.Lock()
+    threads = [threading.Thread(target=virtual_user, args=(c, e, args.iterations, timings, errors, lock))
+               for c, e in zip(clients, emails)]
+    start = perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = perf_counter() - start
+
+    results = {name: dict(summarize(samples), errors=errors.get(name, 0)) for name, samples in timings.items()}
+    total = sum(len(s) for s in timings.values())
+    results['overall'] = {'requests': total, 'wall_s': wall, 'throughput_rps': total / wall,
+                          'errors': sum(errors.values())}
+    print_table(results)
+    print(f"{total} requests in {wall:.2f}s ({total / wall:.1f} req/s), {sum(errors.values())} errors")
+    write_results('load', results, params=vars(args), path=args.out)
+
+
+if __name__ == '__main__':
+    main()
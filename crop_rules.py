@@ -0,0 +1,46 @@
+"""Crop reference data shared by ``CropDataset`` (crop_data.py, pandas) and the
+precomputed tables (recommendation_tables.py, NumPy only)."""
+from recommendation_records import CropInfo, CropRecommendation
+
+# Additional information about crops, keyed by dataset label
+CROP_INFO = {
+    'rice': CropInfo('Cereal', (45, 60), 75000, 120, 'High', '10:26:26'),
+    'maize': CropInfo('Cereal', (30, 50), 45000, 100, 'Medium', '18:46:0'),
+    'chickpea': CropInfo('Pulse', (8, 15), 35000, 110, 'Low', '18:46:0'),
+    'kidneybeans': CropInfo('Pulse', (6, 12), 40000, 90, 'Medium', '12:32:16'),
+    'pigeonpeas': CropInfo('Pulse', (10, 18), 38000, 150, 'Low', '12:32:16'),
+    'mothbeans': CropInfo('Pulse', (5, 10), 25000, 75, 'Very Low', '10:20:10'),
+    'mungbean': CropInfo('Pulse', (8, 12), 32000, 65, 'Medium', '12:32:16'),
+    'blackgram': CropInfo('Pulse', (6, 10), 35000, 80, 'Medium', '12:32:16'),
+    'lentil': CropInfo('Pulse', (8, 15), 30000, 95, 'Low', '18:46:0'),
+    'pomegranate': CropInfo('Fruit', (100, 150), 150000, 365, 'Medium', '19:19:19'),
+    'banana': CropInfo('Fruit', (200, 300), 120000, 365, 'High', '8:10:8'),
+    'mango': CropInfo('Fruit', (80, 120), 100000, 365, 'Medium', '10:10:20'),
+    'grapes': CropInfo('Fruit', (150, 250), 200000, 365, 'Medium', '10:10:10'),
+    'watermelon': CropInfo('Fruit', (200, 400), 80000, 90, 'High', '8:24:24'),
+    'muskmelon': CropInfo('Fruit', (150, 300), 70000, 85, 'High', '8:24:24'),
+    'apple': CropInfo('Fruit', (100, 200), 180000, 365, 'Medium', '10:10:10'),
+    'orange': CropInfo('Fruit', (120, 180), 90000, 365, 'Medium', '8:8:8'),
+    'papaya': CropInfo('Fruit', (300, 500), 110000, 365, 'High', '14:14:14'),
+    'coconut': CropInfo('Tree Crop', (40, 80), 85000, 365, 'High', '8:2:12'),
+    'cotton': CropInfo('Cash Crop', (15, 25), 65000, 180, 'Medium', '17:17:17'),
+    'jute': CropInfo('Fiber Crop', (20, 30), 40000, 120, 'High', '10:5:5'),
+    'coffee': CropInfo('Beverage Crop', (8, 15), 120000, 365, 'Medium', '10:5:20'),
+}
+DEFAULT_CROP_INFO = CropInfo('Crop', (20, 40), 45000, 90, 'Medium', '10:26:26')
+
+
+def crop_recommendation(crop_name, suitability, profile):
+    """The ``CropRecommendation`` for dataset label ``crop_name``; ``profile`` is its NutrientProfile."""
+    info = CROP_INFO.get(crop_name, DEFAULT_CROP_INFO)
+    return CropRecommendation(
+        name=crop_name.title(),
+        suitability=suitability,
+        category=info.category,
+        expected_yield=info.yield_range,
+        expected_profit=info.profit,
+        growth_duration=info.duration,
+        water_requirement=info.water,
+        fertilizer_npk=info.npk,
+        avg_requirements=profile
+    )
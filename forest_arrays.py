@@ -0,0 +1,175 @@
+"""Random forests as compact NumPy arrays, pruned at export and memory-mapped at load.
+
+A fitted sklearn ``RandomForestClassifier`` pickles every tree's full node
+table (float64 thresholds and impurities, per-node class distributions) and
+unpickles it into each worker's heap. ``ForestArrays`` keeps only what
+prediction needs, in three ``.npy`` files of a directory:
+
+* ``nodes.npy``: one structured record per node of every tree, ``feature``
+  (int16, -1 on a leaf), ``threshold`` (float32), ``left`` / ``right``
+  (int32 node indices; on a leaf ``left`` is its row in ``leaves.npy``);
+* ``leaves.npy``: the class counts of every leaf (uint8, scaled down
+  proportionally where a leaf holds more than 255 samples);
+* ``roots.npy``: each tree's first node;
+
+plus ``meta.json`` (classes, feature names, crop codes, depth). ``load()``
+maps the arrays with ``mmap_mode='r'``, so the pages are shared by every
+process serving from the same file and nothing is deserialized.
+
+``from_forest()`` prunes while it exports: below ``max_depth``, or where a
+split would leave a child with fewer than ``min_samples`` training samples,
+the node becomes a leaf holding the class counts of every sample below it.
+Thresholds are rounded down to float32 and inputs cast to float32 as sklearn
+does, so an unpruned export predicts exactly what the forest predicts.
+``PrunedForest`` fits a forest and exports it in one step; ``train.py``
+cross-validates it against the other candidates to choose the limits.
+
+Prediction needs NumPy only, not sklearn.
+"""
+import json
+import os
+import shutil
+
+import numpy as np
+
+NODE_DTYPE = np.dtype([('feature', '<i2'), ('threshold', '<f4'), ('left', '<i4'), ('right', '<i4')])
+MAX_COUNT = np.iinfo(np.uint8).max
+
+
+class ForestArrays:
+    def __init__(self, nodes, leaves, roots, classes, depth, meta=None):
+        self.nodes = nodes
+        self.leaves = leaves
+        self.roots = roots
+        self.classes_ = np.asarray(classes)
+        self.depth = depth
+        self.meta = meta or {}
+
+    @property
+    def nbytes(self):
+        return self.nodes.nbytes + self.leaves.nbytes + self.roots.nbytes
+
+    def apply(self, X):
+        """Leaf row of every (sample, tree), shape ``(len(X), trees)``."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None]
+        node = np.tile(self.roots, len(X))
+        sample = np.repeat(np.arange(len(X)), len(self.roots))
+        # One level per pass, over the (sample, tree) pairs not yet at a leaf
+        active = np.arange(len(node))
+        for _ in range(self.depth):
+            record = self.nodes[node[active]]
+            inner = record['feature'] >= 0
+            active, record = active[inner], record[inner]
+            if not len(active):
+                break
+            go_left = X[sample[active], record['feature']] <= record['threshold']
+            node[active] = np.where(go_left, record['left'], record['right'])
+        return self.nodes['left'][node].reshape(len(X), len(self.roots))
+
+    def predict_proba(self, X):
+        counts = self.leaves[self.apply(X)].astype(np.float64)
+        # Mean of each tree's leaf distribution, as RandomForestClassifier does
+        return (counts / counts.sum(axis=2, keepdims=True)).mean(axis=1)
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    @classmethod
+    def from_forest(cls, forest, max_depth=None, min_samples=None, meta=None):
+        """Export a fitted ``RandomForestClassifier``, collapsing subtrees past the limits into leaves."""
+        nodes, leaves, roots = [], [], []
+        depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            distribution = tree.value[:, 0, :] / tree.value[:, 0, :].sum(axis=1, keepdims=True)
+            counts = distribution * tree.weighted_n_node_samples[:, None]
+            roots.append(len(nodes))
+            # Depth-first; children are filled in once their index is known
+            stack = [(0, 0, None, None)]
+            while stack:
+                source, level, parent, side = stack.pop()
+                index = len(nodes)
+                if parent is not None:
+                    nodes[parent][side] = index
+                left, right = tree.children_left[source], tree.children_right[source]
+                is_leaf = left < 0 or (max_depth is not None and level >= max_depth) or \
+                    (min_samples and min(tree.weighted_n_node_samples[left],
+                                         tree.weighted_n_node_samples[right]) < min_samples)
+                depth = max(depth, level)
+                if is_leaf:
+                    nodes.append([-1, 0.0, len(leaves), -1])
+                    leaves.append(counts[source])
+                    continue
+                threshold = np.float32(tree.threshold[source])
+                if threshold > tree.threshold[source]:
+                    # x <= t for float32 x is x <= t rounded down
+                    threshold = np.nextafter(threshold, np.float32(-np.inf))
+                nodes.append([tree.feature[source], threshold, -1, -1])
+                stack.append((right, level + 1, index, 3))
+                stack.append((left, level + 1, index, 2))
+
+        leaves = np.array(leaves, dtype=np.float64)
+        peak = leaves.max(axis=1, keepdims=True)
+        scale = np.where(peak > MAX_COUNT, MAX_COUNT / np.maximum(peak, 1), 1.0)
+        # Keep at least one count so a leaf's distribution never sums to zero
+        leaves = np.maximum(np.rint(leaves * scale), np.where(leaves == peak, 1, 0))
+        return cls(np.array([tuple(n) for n in nodes], dtype=NODE_DTYPE), leaves.astype(np.uint8),
+                   np.array(roots, dtype=np.int32), forest.classes_, depth, meta)
+
+    def save(self, path):
+        """Write the arrays and meta.json to directory ``path``, replacing it whole."""
+        tmp = f"{path}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        np.save(os.path.join(tmp, 'nodes.npy'), self.nodes)
+        np.save(os.path.join(tmp, 'leaves.npy'), self.leaves)
+        np.save(os.path.join(tmp, 'roots.npy'), self.roots)
+        meta = dict(self.meta, classes=self.classes_.tolist(), depth=self.depth)
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+        old = f"{path}.old"
+        if os.path.exists(path):
+            os.replace(path, old)
+        os.replace(tmp, path)
+        shutil.rmtree(old, ignore_errors=True)
+        return path
+
+
+def load(path, mmap_mode='r'):
+    """``ForestArrays`` from a directory written by ``save()``, memory-mapped by default."""
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+    arrays = [np.load(os.path.join(path, name), mmap_mode=mmap_mode)
+              for name in ('nodes.npy', 'leaves.npy', 'roots.npy')]
+    return ForestArrays(*arrays, meta.pop('classes'), meta.pop('depth'), meta)
+
+
+def files(path):
+    """The files of a saved forest, for model_registry's watch list."""
+    return [os.path.join(path, name) for name in ('meta.json', 'nodes.npy', 'leaves.npy', 'roots.npy')]
+
+
+class PrunedForest:
+    """Estimator for train.py: fits a single-threaded forest, keeps only its pruned ``ForestArrays``."""
+
+    def __init__(self, n_estimators=100, max_depth=None, min_samples=None, random_state=42):
+        self.n_estimators = n_estimators
+        self.max_depth = max_depth
+        self.min_samples = min_samples
+        self.random_state = random_state
+
+    def fit(self, X, y):
+        from sklearn.ensemble import RandomForestClassifier
+        forest = RandomForestClassifier(n_estimators=self.n_estimators, random_state=self.random_state, n_jobs=1)
+        forest.fit(X, y)
+        self.arrays_ = ForestArrays.from_forest(forest, self.max_depth, self.min_samples)
+        self.classes_ = self.arrays_.classes_
+        return self
+
+    def predict_proba(self, X):
+        return self.arrays_.predict_proba(X)
+
+    def predict(self, X):
+        return self.arrays_.predict(X)
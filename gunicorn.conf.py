@@ -0,0 +1,21 @@
+# Picked up automatically by `gunicorn app:app` (Procfile, render.yaml).
+import glob
+import os
+import tempfile
+
+# Every worker snapshots its metrics here so /metrics can merge all workers.
+os.environ.setdefault('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'farming-metrics'))
+
+
+def on_starting(server):
+    """Drop snapshots left over from a previous run."""
+    metrics_dir = os.environ['METRICS_DIR']
+    os.makedirs(metrics_dir, exist_ok=True)
+    for path in glob.glob(os.path.join(metrics_dir, '*.json')):
+        os.remove(path)
+
+
+def post_fork(server, worker):
+    """Pre-warm this worker's recommendation processes."""
+    import recommendation_executor
+    recommendation_executor.start()
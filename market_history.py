@@ -0,0 +1,226 @@
+"""Market price history: raw ticks plus incrementally maintained OHLC rollups.
+
+Every price observed by ``/api/market-prices`` is recorded as a tick in the
+``market_ticks`` collection (a MongoDB time-series collection keyed by
+``meta.crop`` / ``meta.mandi`` where the server supports it) and folded into
+minute, hour and day candles in ``market_ohlc`` in the same call, so
+``/api/market-prices/history`` reads one pre-aggregated document per point
+returned instead of scanning ticks.
+
+Candles assume ticks for a series arrive in time order (``open`` is set on
+the first write to a bucket, ``close`` on every write).
+
+    python market_history.py generate --years 2 [--interval 15] [--mongo-uri URI]
+
+fills the collections with synthetic random-walk ticks for benchmarking.
+"""
+import argparse
+import math
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+from flask import Blueprint, jsonify, request
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import CollectionInvalid, OperationFailure
+
+TICKS = 'market_ticks'
+ROLLUPS = 'market_ohlc'
+DEFAULT_MANDI = 'Delhi Mandi'
+RESOLUTIONS = {
+    'minute': timedelta(minutes=1),
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+}
+MAX_POINTS = 1000
+
+market_history_bp = Blueprint('market_history', __name__)
+ticks_collection = None
+rollups_collection = None
+
+
+def bucket_start(ts, resolution):
+    if resolution == 'minute':
+        return ts.replace(second=0, microsecond=0)
+    if resolution == 'hour':
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def make_tick(crop, price, mandi=DEFAULT_MANDI, ts=None):
+    return {'ts': ts or datetime.utcnow(), 'meta': {'crop': crop, 'mandi': mandi}, 'price': price}
+
+
+def rollup_ops(ticks):
+    """``UpdateOne`` upserts folding ``ticks`` into every resolution.
+
+    Ticks are combined per bucket first, so a batch costs one write per
+    (resolution, series, bucket) rather than one per tick.
+    """
+    candles = {}
+    for tick in ticks:
+        crop, mandi, price = tick['meta']['crop'], tick['meta']['mandi'], tick['price']
+        for resolution in RESOLUTIONS:
+            key = (resolution, crop, mandi, bucket_start(tick['ts'], resolution))
+            c = candles.get(key)
+            if c is None:
+                candles[key] = [price, price, price, price, 1, price]
+            else:
+                c[1] = max(c[1], price)
+                c[2] = min(c[2], price)
+                c[3] = price
+                c[4] += 1
+                c[5] += price
+    return [UpdateOne({'res': res, 'crop': crop, 'mandi': mandi, 't': t}, {
+                '$setOnInsert': {'open': o},
+                '$max': {'high': h},
+                '$min': {'low': lo},
+                '$set': {'close': cl},
+                '$inc': {'count': n, 'sum': total},
+            }, upsert=True)
+            for (res, crop, mandi, t), (o, h, lo, cl, n, total) in candles.items()]
+
+
+def ensure_collections(db):
+    """Create the tick and rollup collections and their indexes."""
+    global ticks_collection, rollups_collection
+    if TICKS not in db.list_collection_names():
+        try:
+            db.create_collection(TICKS, timeseries={'timeField': 'ts', 'metaField': 'meta', 'granularity': 'minutes'})
+        except (CollectionInvalid, OperationFailure, NotImplementedError):
+            # Older servers (and mongomock): plain collection with a compound index
+            db[TICKS].create_index([('meta.crop', ASCENDING), ('meta.mandi', ASCENDING), ('ts', ASCENDING)])
+    rollups = db[ROLLUPS]
+    rollups.create_index([('res', ASCENDING), ('crop', ASCENDING), ('mandi', ASCENDING), ('t', ASCENDING)],
+                         unique=True)
+    ticks_collection, rollups_collection = db[TICKS], rollups
+
+
+def record_ticks(ticks):
+    """Store ``ticks`` and update their candles."""
+    if rollups_collection is None or not ticks:
+        return
+    ticks_collection.insert_many(ticks, ordered=False)
+    rollups_collection.bulk_write(rollup_ops(ticks), ordered=False)
+
+
+def pick_resolution(start, end):
+    """Finest resolution that covers ``start``..``end`` in at most MAX_POINTS points."""
+    for resolution, step in RESOLUTIONS.items():
+        if (end - start) / step <= MAX_POINTS:
+            return resolution
+    return 'day'
+
+
+def history(crop, mandi, resolution, start, end, limit=MAX_POINTS):
+    cursor = rollups_collection.find(
+        {'res': resolution, 'crop': crop, 'mandi': mandi, 't': {'$gte': start, '$lt': end}},
+        {'_id': 0, 't': 1, 'open': 1, 'high': 1, 'low': 1, 'close': 1, 'count': 1, 'sum': 1},
+    ).sort('t', ASCENDING).limit(limit)
+    return [{
+        't': doc['t'].isoformat() + 'Z',
+        'open': doc['open'],
+        'high': doc['high'],
+        'low': doc['low'],
+        'close': doc['close'],
+        'avg': round(doc['sum'] / doc['count'], 2),
+        'count': doc['count'],
+    } for doc in cursor]
+
+
+def _parse_time(value, default):
+    if not value:
+        return default
+    ts = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+@market_history_bp.route('/api/market-prices/history')
+def market_price_history():
+    if rollups_collection is None:
+        return jsonify({'status': 'error', 'error': 'Database not available'}), 503
+    crop = (request.args.get('crop') or '').lower()
+    if not crop:
+        return jsonify({'status': 'error', 'error': 'Missing crop'}), 400
+    mandi = request.args.get('mandi', DEFAULT_MANDI)
+    try:
+        end = _parse_time(request.args.get('end'), datetime.utcnow())
+        start = _parse_time(request.args.get('start'), end - timedelta(days=30))
+        limit = int(request.args.get('limit', MAX_POINTS))
+    except ValueError:
+        return jsonify({'status': 'error', 'error': 'Invalid start, end or limit'}), 400
+    if not 1 <= limit <= MAX_POINTS:
+        return jsonify({'status': 'error', 'error': f"limit must be between 1 and {MAX_POINTS}"}), 400
+    resolution = request.args.get('resolution') or pick_resolution(start, end)
+    if resolution not in RESOLUTIONS:
+        return jsonify({'status': 'error', 'error': f"resolution must be one of {', '.join(RESOLUTIONS)}"}), 400
+    try:
+        points = history(crop, mandi, resolution, start, end, limit)
+        return jsonify({'crop': crop, 'mandi': mandi, 'resolution': resolution, 'points': points})
+    except Exception as e:
+        return jsonify({'status': 'error', 'error': str(e)}), 500
+
+
+def init_app(app, db):
+    if db is not None:
+        try:
+            ensure_collections(db)
+        except Exception as e:
+            print(f"❌ Market history init error: {e}")
+    app.register_blueprint(market_history_bp)
+
+
+# ------------------ Synthetic data ------------------ #
+def synthetic_ticks(crops, mandis, start, end, interval=timedelta(minutes=15), seed=42):
+    """Yield ticks for every (crop, mandi) as a seasonal random walk, in time order."""
+    rng = random.Random(seed)
+    prices = {(crop, mandi): float(base) for crop, base in crops.items() for mandi in mandis}
+    ts = start
+    while ts < end:
+        season = 1 + 0.08 * math.sin(2 * math.pi * ts.timetuple().tm_yday / 365.25)
+        for (crop, mandi), price in prices.items():
+            price = max(1.0, price * (1 + rng.gauss(0, 0.002)))
+            prices[(crop, mandi)] = price
+            yield make_tick(crop, round(price * season), mandi, ts)
+        ts += interval
+
+
+def generate(db, years, interval_minutes=15, batch_size=5000):
+    ensure_collections(db)
+    crops = {'rice': 2850, 'wheat': 2150, 'cotton': 5200}
+    mandis = [DEFAULT_MANDI, 'Azadpur Mandi', 'Vashi APMC']
+    end = datetime.utcnow().replace(second=0, microsecond=0)
+    start = end - timedelta(days=round(365 * years))
+    batch, total = [], 0
+    for tick in synthetic_ticks(crops, mandis, start, end, timedelta(minutes=interval_minutes)):
+        batch.append(tick)
+        if len(batch) >= batch_size:
+            record_ticks(batch)
+            total += len(batch)
+            batch = []
+    record_ticks(batch)
+    return total + len(batch)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Market price history tools')
+    parser.add_argument('command', choices=['generate'])
+    parser.add_argument('--years', type=float, default=1)
+    parser.add_argument('--interval', type=int, default=15, help='minutes between ticks')
+    parser.add_argument('--mongo-uri', default=None, help='defaults to the app configuration')
+    parser.add_argument('--db', default=None)
+    args = parser.parse_args()
+
+    from pymongo import MongoClient
+    if args.mongo_uri:
+        uri = args.mongo_uri
+    else:
+        from app import get_mongo_uri  # loads .env
+        uri = get_mongo_uri()
+    if not uri:
+        parser.error('no MongoDB configured; pass --mongo-uri')
+    db = MongoClient(uri)[args.db or os.getenv('MONGO_DB', 'farmerdb')]
+    count = generate(db, args.years, args.interval)
+    print(f"Recorded {count} ticks into {db.name}.{TICKS} and rollups into {db.name}.{ROLLUPS}")
@@ -0,0 +1,406 @@
+"""Lightweight request and span metrics exposed in Prometheus text format.
+
+Per-endpoint latency histograms, status counters and in-flight gauges are
+recorded from Flask's request hooks. Inner spans (Mongo commands, SQLite
+statements, recommendation calls, bcrypt) are recorded with ``span()`` /
+``timed()``.
+
+Each process keeps its metrics in memory. When ``METRICS_DIR`` is set (do this
+under gunicorn) every worker also snapshots its metrics to
+``METRICS_DIR/<pid>-<start>.json`` at most once per ``METRICS_FLUSH_INTERVAL``
+seconds, and ``/metrics`` merges the snapshots of all workers. Snapshots of
+workers that have exited are folded into ``METRICS_DIR/retired.json``
+(counters and histograms only) and removed.
+"""
+import atexit
+import fcntl
+import glob
+import json
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from time import perf_counter
+
+from flask import Response, request
+
+METRICS_DIR = os.getenv('METRICS_DIR') or os.getenv('PROMETHEUS_MULTIPROC_DIR')
+FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '1.0'))
+
+# Prometheus client default buckets (seconds)
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SPAN_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+_HELP = {
+    'farming_http_request_duration_seconds': ('histogram', 'Request latency by endpoint'),
+    'farming_http_requests_total': ('counter', 'Requests by endpoint, method and status'),
+    'farming_http_requests_in_flight': ('gauge', 'Requests currently being served'),
+    'farming_span_duration_seconds': ('histogram', 'Latency of inner spans (db calls, recommenders, bcrypt)'),
+    'farming_response_cache_total': ('counter', 'Rendered-response cache lookups by result'),
+    'farming_recommender_queue_depth': ('gauge', 'Recommendation calls queued or running'),
+    'farming_recommender_rejected_total': ('counter', 'Recommendation calls refused (queue full) or timed out'),
+    'farming_recommender_pool_restarts_total': ('counter', 'Recommendation pools replaced after a process died'),
+    'farming_rate_limited_total': ('counter', 'Requests refused by the rate limiter (rate) or admission control (concurrency)'),
+    'farming_model_version': ('gauge', 'Serving processes on each model version'),
+    'farming_model_reloads_total': ('counter', 'Model reloads by result (ok, unchanged, failed)'),
+    'farming_fragment_cache_total': ('counter', 'Dashboard fragment cache lookups by fragment and result'),
+}
+
+_lock = threading.Lock()
+_counters = {}    # (name, labels) -> float
+_gauges = {}      # (name, labels) -> float
+_histograms = {}  # (name, labels) -> [bucket counts..., +Inf count, sum]
+_buckets = {
+    'farming_http_request_duration_seconds': REQUEST_BUCKETS,
+    'farming_span_duration_seconds': SPAN_BUCKETS,
+}
+_process_key = f"{os.getpid()}-{int(time.time() * 1000)}"
+RETIRED = 'retired.json'
+_last_flush = 0.0
+
+
+# ------------------ Recording ------------------ #
+def observe(name, labels, value):
+    """Record ``value`` in histogram ``name``; ``labels`` is a tuple of (key, value) pairs."""
+    buckets = _buckets[name]
+    idx = bisect_left(buckets, value)
+    key = (name, labels)
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+        h[idx] += 1
+        h[-1] += value
+
+
+def inc(name, labels, amount=1):
+    key = (name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def gauge_add(name, labels, amount):
+    key = (name, labels)
+    with _lock:
+        _gauges[key] = _gauges.get(key, 0) + amount
+
+
+def observe_span(name, seconds):
+    observe('farming_span_duration_seconds', (('span', name),), seconds)
+
+
+@contextmanager
+def span(name):
+    """Time the enclosed block as span ``name``."""
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        observe_span(name, perf_counter() - start)
+
+
+def timed(name):
+    """Decorator form of ``span()``."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe_span(name, perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+# ------------------ Mongo / SQLite instrumentation ------------------ #
+try:
+    from pymongo import monitoring
+
+    class MongoCommandListener(monitoring.CommandListener):
+        """Records every Mongo command as a ``mongo.<command>`` span."""
+
+        def started(self, event):
+            pass
+
+        def succeeded(self, event):
+            observe_span(f"mongo.{event.command_name}", event.duration_micros / 1e6)
+
+        def failed(self, event):
+            observe_span(f"mongo.{event.command_name}", event.duration_micros / 1e6)
+except ImportError:
+    MongoCommandListener = None
+
+
+def sql_span_name(sql):
+    """Span name for a SQL statement: ``sqlite.<verb>`` (``sqlite.select``, ``sqlite.insert``...)."""
+    return f"sqlite.{sql.lstrip().split(None, 1)[0].lower()}" if sql.strip() else 'sqlite'
+
+
+class TimedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        start = perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            observe_span(sql_span_name(sql), perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            observe_span(sql_span_name(sql), perf_counter() - start)
+
+
+class TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def commit(self):
+        start = perf_counter()
+        try:
+            return super().commit()
+        finally:
+            observe_span('sqlite.commit', perf_counter() - start)
+
+
+def sqlite_connect(path, **kwargs):
+    """``sqlite3.connect`` returning a connection whose statements are timed."""
+    return sqlite3.connect(path, factory=TimedConnection, **kwargs)
+
+
+# ------------------ Flask hooks ------------------ #
+# The hooks keep their state on the request object itself rather than on
+# ``g``: every proxy lookup costs ~1-2 us and the budget is 20 us per request.
+
+
+def _before_request():
+    req = request._get_current_object()
+    endpoint = req.endpoint or 'unmatched'
+    req._metrics_state = [perf_counter(), endpoint]
+    key = ('farming_http_requests_in_flight', (('endpoint', endpoint),))
+    with _lock:
+        _gauges[key] = _gauges.get(key, 0) + 1
+
+
+def _after_request(response):
+    req = request._get_current_object()
+    state = getattr(req, '_metrics_state', None)
+    if state is not None and len(state) == 2:
+        elapsed = perf_counter() - state[0]
+        state.append(True)  # recorded; teardown only decrements the gauge
+        endpoint_labels = (('endpoint', state[1]),)
+        hkey = ('farming_http_request_duration_seconds', endpoint_labels)
+        ckey = ('farming_http_requests_total',
+                endpoint_labels + (('method', req.method), ('status', str(response.status_code))))
+        idx = bisect_left(REQUEST_BUCKETS, elapsed)
+        with _lock:
+            h = _histograms.get(hkey)
+            if h is None:
+                h = _histograms[hkey] = [0] * (len(REQUEST_BUCKETS) + 1) + [0.0]
+            h[idx] += 1
+            h[-1] += elapsed
+            _counters[ckey] = _counters.get(ckey, 0) + 1
+    return response
+
+
+def _teardown_request(exc):
+    req = request._get_current_object()
+    state = req.__dict__.pop('_metrics_state', None)
+    if state is not None:
+        key = ('farming_http_requests_in_flight', (('endpoint', state[1]),))
+        with _lock:
+            _gauges[key] -= 1
+    # After the decrement, so a snapshot never counts a finished request as in flight
+    if METRICS_DIR and time.monotonic() - _last_flush >= FLUSH_INTERVAL:
+        flush()
+
+
+def init_app(app):
+    """Register request hooks and the ``/metrics`` endpoint on ``app``."""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+    if METRICS_DIR:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        atexit.register(flush)
+
+
+def metrics_view():
+    return Response(render_latest(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+# ------------------ Multi-process snapshots ------------------ #
+def _snapshot():
+    with _lock:
+        return {
+            'pid': os.getpid(),
+            'counters': [[n, list(l), v] for (n, l), v in _counters.items()],
+            'gauges': [[n, list(l), v] for (n, l), v in _gauges.items()],
+            'histograms': [[n, list(l), list(h)] for (n, l), h in _histograms.items()],
+        }
+
+
+def flush():
+    """Write this process's metrics to ``METRICS_DIR`` (atomic replace)."""
+    global _last_flush
+    _last_flush = time.monotonic()
+    if not METRICS_DIR:
+        return
+    path = os.path.join(METRICS_DIR, f"{_process_key}.json")
+    tmp = f"{path}.tmp"
+    try:
+        with open(tmp, 'w') as f:
+            json.dump(_snapshot(), f)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"Metrics flush error: {e}")
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _retire(retired, snap):
+    """Add the counters and histograms of a dead worker's ``snap`` into ``retired``."""
+    counters = {(n, tuple(map(tuple, l))): v for n, l, v in retired['counters']}
+    for n, l, v in snap['counters']:
+        key = (n, tuple(map(tuple, l)))
+        counters[key] = counters.get(key, 0) + v
+    histograms = {(n, tuple(map(tuple, l))): h for n, l, h in retired['histograms']}
+    for n, l, h in snap['histograms']:
+        key = (n, tuple(map(tuple, l)))
+        acc = histograms.get(key)
+        histograms[key] = list(h) if acc is None else [a + v for a, v in zip(acc, h)]
+    retired['counters'] = [[n, list(l), v] for (n, l), v in counters.items()]
+    retired['histograms'] = [[n, list(l), h] for (n, l), h in histograms.items()]
+
+
+def _collect():
+    """Snapshots of the live workers, plus RETIRED with the exited workers' snapshots folded in."""
+    # Under a lock, so no reader sees a dead worker both in its own file and in RETIRED
+    with open(os.path.join(METRICS_DIR, '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        retired_path = os.path.join(METRICS_DIR, RETIRED)
+        retired = _read(retired_path)
+        snaps, dead = [], []
+        for path in glob.glob(os.path.join(METRICS_DIR, '*-*.json')):
+            snap = _read(path)
+            if snap is None:
+                continue
+            if snap['pid'] == os.getpid() or _pid_alive(snap['pid']):
+                snaps.append(snap)
+            else:
+                dead.append(path)
+                retired = retired or {'pid': None, 'counters': [], 'gauges': [], 'histograms': []}
+                _retire(retired, snap)
+        if dead:
+            tmp = f"{retired_path}.tmp"
+            with open(tmp, 'w') as f:
+                json.dump(retired, f)
+            os.replace(tmp, retired_path)
+            for path in dead:
+                os.remove(path)
+    return snaps + ([retired] if retired else [])
+
+
+def _merged():
+    """Merge snapshots of all workers. Gauges of dead workers are dropped;
+    their counters and histograms are kept (in RETIRED) so totals stay monotonic."""
+    if not METRICS_DIR:
+        snap = _snapshot()
+        snaps = [snap]
+    else:
+        flush()
+        snaps = _collect()
+
+    counters, gauges, histograms = {}, {}, {}
+    for snap in snaps:
+        alive = snap['pid'] is not None  # RETIRED; _collect() keeps only live workers otherwise
+        for n, l, v in snap['counters']:
+            key = (n, tuple(tuple(p) for p in l))
+            counters[key] = counters.get(key, 0) + v
+        if alive:
+            for n, l, v in snap['gauges']:
+                key = (n, tuple(tuple(p) for p in l))
+                gauges[key] = gauges.get(key, 0) + v
+        for n, l, h in snap['histograms']:
+            key = (n, tuple(tuple(p) for p in l))
+            acc = histograms.get(key)
+            if acc is None:
+                histograms[key] = list(h)
+            else:
+                for i, v in enumerate(h):
+                    acc[i] += v
+    return counters, gauges, histograms
+
+
+# ------------------ Exposition ------------------ #
+def _fmt_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    inner = ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in pairs)
+    return '{' + inner + '}'
+
+
+def render_latest():
+    """Return all metrics in Prometheus text exposition format."""
+    counters, gauges, histograms = _merged()
+    lines = []
+    seen = set()
+
+    def header(name):
+        if name not in seen:
+            seen.add(name)
+            kind, help_text = _HELP.get(name, ('untyped', name))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in sorted(counters.items()):
+        header(name)
+        lines.append(f"{name}{_fmt_labels(labels)} {value}")
+    for (name, labels), value in sorted(gauges.items()):
+        header(name)
+        lines.append(f"{name}{_fmt_labels(labels)} {value}")
+    for (name, labels), h in sorted(histograms.items()):
+        header(name)
+        cumulative = 0
+        for bound, count in zip(_buckets[name], h):
+            cumulative += count
+            lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', bound)])} {cumulative}")
+        cumulative += h[-2]
+        lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', '+Inf')])} {cumulative}")
+        lines.append(f"{name}_sum{_fmt_labels(labels)} {h[-1]}")
+        lines.append(f"{name}_count{_fmt_labels(labels)} {cumulative}")
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    """Clear this process's in-memory metrics (used by benchmarks)."""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _histograms.clear()
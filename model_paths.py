@@ -0,0 +1,25 @@
+"""Where the recommendation models are built from.
+
+Only environment lookups: ``model_registry`` watches these files from the
+serving process, which must not import ``crop_data`` / ``fertilizer_data``
+(they build the datasets, with pandas and sklearn, on import).
+
+* ``CROP_DATASET_PATH`` / ``FERTILIZER_DATASET_PATH``: the dataset CSVs;
+* ``FERTILIZER_MODEL_PATH`` / ``FERTILIZER_FOREST_PATH``: the model
+  ``python train.py`` chose, pickled or as a forest_arrays export;
+* ``RECOMMENDATION_TABLES`` / ``RECOMMENDATION_TABLES_PATH``: serve from the
+  precomputed NumPy tables instead (recommendation_tables.py).
+"""
+import os
+
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR = os.path.join(_ROOT, 'models')
+
+CROP_DATASET_PATH = os.getenv('CROP_DATASET_PATH', os.path.join(_ROOT, 'Crop_recommendation.csv'))
+FERTILIZER_DATASET_PATH = os.getenv('FERTILIZER_DATASET_PATH',
+                                    os.path.join(_ROOT, 'fertilizer_recommendation_dataset.csv'))
+FERTILIZER_MODEL_PATH = os.getenv('FERTILIZER_MODEL_PATH') or os.path.join(MODELS_DIR, 'fertilizer_model.pkl')
+FERTILIZER_FOREST_PATH = os.getenv('FERTILIZER_FOREST_PATH') or os.path.join(MODELS_DIR, 'fertilizer_forest')
+
+TABLES_ENABLED = os.getenv('RECOMMENDATION_TABLES', '1' if os.environ.get('VERCEL') else '0') == '1'
+TABLES_PATH = os.getenv('RECOMMENDATION_TABLES_PATH') or os.path.join(MODELS_DIR, 'recommendation_tables.npz')
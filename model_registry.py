@@ -0,0 +1,266 @@
+"""Versioned crop/fertilizer model state with hot reload.
+
+The active ``ModelVersion`` (a ``CropDataset``, a ``FertilizerDataset`` and
+the version id of the files they were built from) is held in a single module
+reference. Callers take it once with ``current()`` and use that object for
+the whole call; ``reload()`` builds the replacement off the request path and
+swaps the reference, so in-flight calls finish on the version they started
+with and the old one is freed when they are done.
+
+A reload is triggered by
+
+* the watcher thread, which every ``MODEL_WATCH_INTERVAL`` seconds (default
+  30, 0 disables; off on Vercel) checks the size and mtime of the dataset
+  CSVs, ``models/*.pkl`` and the ``models/*_forest/`` exports (of the tables
+  file when serving from ``recommendation_tables``), or
+* ``POST /admin/models/reload`` (``X-Admin-Token``; ``?force=1`` rebuilds
+  even if nothing changed). ``GET /admin/models`` shows the active version.
+
+A new version that fails to load (empty dataset) is discarded and the old one
+stays active. With a recommendation process pool (``RECOMMENDER_PROCESSES`` >
+0) only the pool's processes hold the models: the serving process compares
+the files with the version its pool loaded and, when they changed, replaces
+the pool with freshly warmed processes (``recommendation_executor.recycle()``);
+it never builds the datasets itself. Calls already submitted finish on the
+old processes.
+
+Every response carries ``X-Model-Version`` (for recommendation calls, the
+version that produced the result) and ``farming_model_version{version=...}``
+counts the serving processes on each version (with a pool, the version the
+pool loaded, reported by the serving process).
+"""
+import glob
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime
+
+from flask import jsonify, request
+
+import metrics
+import model_paths
+from admin_auth import admin_required
+
+_DEFAULT_INTERVAL = '0' if os.environ.get('VERCEL') else '30'
+WATCH_INTERVAL = float(os.getenv('MODEL_WATCH_INTERVAL', _DEFAULT_INTERVAL))
+MODELS_DIR = model_paths.MODELS_DIR
+
+_active = None
+_load_lock = threading.Lock()    # first load and reloads
+_reload_thread = None
+_watcher_pid = None
+
+
+class ModelVersion:
+    __slots__ = ('version', 'crop', 'fertilizer', 'loaded_at')
+
+    def __init__(self, version, crop, fertilizer):
+        self.version = version
+        self.crop = crop
+        self.fertilizer = fertilizer
+        self.loaded_at = datetime.utcnow()
+
+
+def watched_files():
+    # Paths only: importing crop_data / fertilizer_data would build the datasets
+    if model_paths.TABLES_ENABLED:
+        return [model_paths.TABLES_PATH]
+    return [model_paths.CROP_DATASET_PATH, model_paths.FERTILIZER_DATASET_PATH] + \
+        sorted(glob.glob(os.path.join(MODELS_DIR, '*.pkl')) + glob.glob(os.path.join(MODELS_DIR, '*_forest', '*')))
+
+
+def source_version():
+    """Short id derived from the name, size and mtime of every watched file.
+
+    The same files give the same id in every process.
+    """
+    digest = hashlib.sha1()
+    for path in watched_files():
+        try:
+            st = os.stat(path)
+            digest.update(f"{os.path.basename(path)}:{st.st_size}:{st.st_mtime_ns};".encode())
+        except OSError:
+            digest.update(f"{os.path.basename(path)}:missing;".encode())
+    return digest.hexdigest()[:12]
+
+
+def _activate(new):
+    global _active
+    old, _active = _active, new
+    metrics.gauge_add('farming_model_version', (('version', new.version),), 1)
+    if old is not None:
+        metrics.gauge_add('farming_model_version', (('version', old.version),), -1)
+
+
+def current():
+    """The active ``ModelVersion``; loaded on first use."""
+    if _active is None:
+        with _load_lock:
+            if _active is None:
+                import recommendation_tables
+                version = source_version()
+                if recommendation_tables.ENABLED:
+                    _activate(build(version))
+                else:
+                    # The module-level datasets are built on import
+                    import crop_data
+                    import fertilizer_data
+                    _activate(ModelVersion(version, crop_data.crop_dataset, fertilizer_data.fertilizer_dataset))
+    return _active
+
+
+def build(version):
+    import recommendation_tables
+    if recommendation_tables.ENABLED:
+        crop, fertilizer = recommendation_tables.load()
+    else:
+        import crop_data
+        import fertilizer_data
+        crop = crop_data.CropDataset()
+        fertilizer = fertilizer_data.FertilizerDataset()
+    if not crop.crop_means or not fertilizer.has_data():
+        raise ValueError('dataset failed to load')
+    return ModelVersion(version, crop, fertilizer)
+
+
+def reload(force=False):
+    """Rebuild from the files on disk and swap the new version in.
+
+    Returns the active version id, or None if the rebuild failed (the old
+    version stays active). Skipped when the files are unchanged unless
+    ``force``. With a process pool the pool is replaced instead.
+    """
+    import recommendation_executor
+    if recommendation_executor.pooled():
+        return _reload_pool(force)
+    import recommendation_tables
+    active = current()
+    with _load_lock:
+        version = source_version()
+        if version == active.version and not force:
+            metrics.inc('farming_model_reloads_total', (('result', 'unchanged'),))
+            return active.version
+        start = time.perf_counter()
+        try:
+            with metrics.span('model_reload'):
+                new = build(version)
+        except Exception as e:
+            print(f"❌ Model reload failed, keeping {active.version}: {e}")
+            metrics.inc('farming_model_reloads_total', (('result', 'failed'),))
+            return None
+        _activate(new)
+        if not recommendation_tables.ENABLED:
+            import crop_data
+            import fertilizer_data
+            # Keep the module attributes pointing at the active version so the old one can be freed
+            crop_data.crop_dataset, fertilizer_data.fertilizer_dataset = new.crop, new.fertilizer
+        metrics.inc('farming_model_reloads_total', (('result', 'ok'),))
+        print(f"✅ Models {active.version} -> {new.version} in {time.perf_counter() - start:.1f}s")
+    return new.version
+
+
+def _reload_pool(force):
+    """``reload()`` with a process pool: new processes load the files, this one loads nothing."""
+    import recommendation_executor
+    with _load_lock:
+        version = source_version()
+        loaded = recommendation_executor.pool_version()
+        if loaded is None or (version == loaded and not force):
+            # No pool yet: it loads the current files when it starts
+            metrics.inc('farming_model_reloads_total', (('result', 'unchanged'),))
+            return loaded or version
+        start = time.perf_counter()
+        new = recommendation_executor.recycle()
+        if new is None:
+            print(f"❌ Model reload failed, keeping {loaded}")
+            metrics.inc('farming_model_reloads_total', (('result', 'failed'),))
+            return None
+        metrics.inc('farming_model_reloads_total', (('result', 'ok'),))
+        print(f"✅ Models {loaded} -> {new} in {time.perf_counter() - start:.1f}s")
+    return new
+
+
+def loaded_version():
+    """Version serving recommendations in this process or its pool, without loading anything."""
+    import recommendation_executor
+    if recommendation_executor.pooled():
+        return recommendation_executor.pool_version()
+    return _active.version if _active is not None else None
+
+
+def reload_in_background(force=False):
+    """Start ``reload()`` on a thread unless one is already running; returns whether it started."""
+    global _reload_thread
+    with _load_lock:
+        if _reload_thread is not None and _reload_thread.is_alive():
+            return False
+        _reload_thread = threading.Thread(target=reload, kwargs={'force': force},
+                                          name='model-reload', daemon=True)
+        _reload_thread.start()
+        return True
+
+
+def _watch():
+    while True:
+        time.sleep(WATCH_INTERVAL)
+        try:
+            # Nothing to replace until the first recommendation has loaded a version
+            loaded = loaded_version()
+            if loaded is not None and source_version() != loaded:
+                reload()
+        except Exception as e:
+            print(f"❌ Model watcher error: {e}")
+
+
+def start_watcher():
+    """Start this process's watcher thread (once per process, so after a fork too)."""
+    global _watcher_pid
+    if WATCH_INTERVAL <= 0 or _watcher_pid == os.getpid():
+        return
+    _watcher_pid = os.getpid()
+    threading.Thread(target=_watch, name='model-watcher', daemon=True).start()
+
+
+def _start_watcher_hook():
+    if _watcher_pid != os.getpid():
+        start_watcher()
+
+
+def _version_header(response):
+    req = request._get_current_object()
+    version = getattr(req, '_model_version', None) or loaded_version()
+    if version:
+        response.headers['X-Model-Version'] = version
+    return response
+
+
+def status():
+    import recommendation_executor
+    active = _active
+    return {
+        'version': loaded_version(),
+        'loaded_at': active.loaded_at.isoformat() + 'Z' if active is not None else None,
+        'pooled': recommendation_executor.pooled(),
+        'source_version': source_version(),
+        'reloading': _reload_thread is not None and _reload_thread.is_alive(),
+        'watch_interval': WATCH_INTERVAL,
+    }
+
+
+@admin_required
+def models_view():
+    return jsonify(status())
+
+
+@admin_required
+def reload_view():
+    started = reload_in_background(force=request.args.get('force') in ('1', 'true'))
+    return jsonify(dict(status(), started=started)), 202
+
+
+def init_app(app):
+    app.before_request(_start_watcher_hook)
+    app.after_request(_version_header)
+    app.add_url_rule('/admin/models', 'admin_models', models_view)
+    app.add_url_rule('/admin/models/reload', 'admin_models_reload', reload_view, methods=['POST'])
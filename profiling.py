@@ -0,0 +1,205 @@
+"""On-demand request profiling.
+
+Disabled unless ``PROFILING_ENABLED=1``; when disabled no hooks are installed,
+so there is no per-request cost. When enabled a request is profiled if
+
+* it is an admin request (see ``admin_auth``) carrying ``X-Profile: cprofile``
+  or ``X-Profile: sample``, or
+* its endpoint is in ``PROFILE_ENDPOINTS`` and it wins the
+  ``PROFILE_SAMPLE_RATE`` draw (uses ``PROFILE_MODE``).
+
+``cprofile`` writes a pstats file (``<id>.prof``, open with ``pstats`` or
+snakeviz). ``sample`` runs a stack sampler on the request thread every
+``PROFILE_INTERVAL_MS`` and writes flamegraph-ready collapsed stacks
+(``<id>.collapsed``, one ``frame;frame;frame count`` line per stack). Files go
+to ``PROFILE_DIR``; the id is returned in the ``X-Profile-Id`` header.
+
+The hooks only see the request thread. Recommendation calls that run on the
+process pool (``recommendation_executor``) are profiled inside the pool task
+with the request's mode (``profile_call()``) and the result is merged into the
+request's profile (``add_profile()``), so the file covers the recommender too.
+"""
+import cProfile
+import os
+import pstats
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from flask import has_request_context, request
+
+from admin_auth import is_admin_request
+
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', '').lower() in ('1', 'true', 'yes')
+PROFILE_DIR = os.getenv('PROFILE_DIR') or os.path.join(tempfile.gettempdir(), 'farming-profiles')
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_MODE = os.getenv('PROFILE_MODE', 'cprofile')
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', '1'))
+PROFILE_ENDPOINTS = set(filter(None, os.getenv(
+    'PROFILE_ENDPOINTS', 'fertilizer_advice,crop_suggestion,dashboard').split(',')))
+
+MODES = ('cprofile', 'sample')
+
+
+class StackSampler:
+    """Samples one thread's Python stack on a background thread."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                module = os.path.splitext(os.path.basename(code.co_filename))[0]
+                stack.append(f"{module}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def write_collapsed(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class _RecordedStats:
+    """cProfile stats recorded in another process; ``pstats`` loads anything with ``create_stats()``."""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def current_mode():
+    """The mode the current request is being profiled with, or None."""
+    if not has_request_context():
+        return None
+    state = getattr(request._get_current_object(), '_profile_state', None)
+    return state[0] if state is not None else None
+
+
+def profile_call(mode, func, *args):
+    """Call ``func(*args)`` on this thread under a ``mode`` profiler.
+
+    Returns ``(result, profile)``; ``profile`` (pstats data or sampled stacks,
+    both picklable) is for ``add_profile()`` in the process serving the request,
+    None if another profiler was already active.
+    """
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return func(*args), None
+        try:
+            result = func(*args)
+        finally:
+            profiler.disable()
+        profiler.create_stats()
+        return result, profiler.stats
+    sampler = StackSampler(threading.get_ident(), PROFILE_INTERVAL_MS / 1000.0)
+    sampler.start()
+    try:
+        result = func(*args)
+    finally:
+        sampler.stop()
+    return result, sampler.stacks
+
+
+def add_profile(profile):
+    """Merge a ``profile_call()`` profile into the current request's."""
+    if profile is not None and current_mode() is not None:
+        req = request._get_current_object()
+        req.__dict__.setdefault('_remote_profiles', []).append(profile)
+
+
+def _requested_mode():
+    header = request.headers.get('X-Profile')
+    if header:
+        if header in MODES and is_admin_request():
+            return header
+        return None
+    if PROFILE_SAMPLE_RATE > 0 and request.endpoint in PROFILE_ENDPOINTS \
+            and random.random() < PROFILE_SAMPLE_RATE:
+        return PROFILE_MODE
+    return None
+
+
+def _before_request():
+    mode = _requested_mode()
+    if mode is None:
+        return
+    req = request._get_current_object()
+    profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{request.endpoint or 'unmatched'}-{os.getpid()}-{random.getrandbits(24):06x}"
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # another profiler is already active on this interpreter
+            return
+    else:
+        profiler = StackSampler(threading.get_ident(), PROFILE_INTERVAL_MS / 1000.0)
+        profiler.start()
+    req._profile_state = (mode, profile_id, profiler)
+
+
+def _after_request(response):
+    state = getattr(request._get_current_object(), '_profile_state', None)
+    if state is not None:
+        response.headers['X-Profile-Id'] = state[1]
+    return response
+
+
+def _teardown_request(exc):
+    req = request._get_current_object()
+    state = req.__dict__.pop('_profile_state', None)
+    if state is None:
+        return
+    mode, profile_id, profiler = state
+    remote = req.__dict__.pop('_remote_profiles', ())
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        if mode == 'cprofile':
+            profiler.disable()
+            stats = pstats.Stats(profiler)
+            for recorded in remote:
+                stats.add(_RecordedStats(recorded))
+            stats.dump_stats(os.path.join(PROFILE_DIR, f"{profile_id}.prof"))
+        else:
+            profiler.stop()
+            for stacks in remote:
+                profiler.stacks.update(stacks)
+            profiler.write_collapsed(os.path.join(PROFILE_DIR, f"{profile_id}.collapsed"))
+    except Exception as e:
+        print(f"Profiling error: {e}")
+
+
+def init_app(app):
+    """Install the profiling hooks on ``app`` when profiling is enabled."""
+    if not PROFILING_ENABLED:
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    print(f"Profiling enabled (sample rate {PROFILE_SAMPLE_RATE}, output {PROFILE_DIR})")
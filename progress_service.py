@@ -0,0 +1,222 @@
+"""Crop progress tracking: one code path for both sets of progress URLs.
+
+progress.js uses ``/progress/add``, ``/progress/list``, ``/progress/delete``
+and ``/mark_task_done``; start_growing.html uses ``/save_progress``; and
+``/get_progress`` is the older list URL. All of them are thin routes in
+crop_progress.py over the functions here, so every URL validates, stores
+(through ``storage``) and serializes an entry the same way.
+
+Lists are cached per user (``PROGRESS_CACHE_TTL`` seconds,
+``PROGRESS_CACHE_SIZE`` users). Writes made through this process drop that
+user's cached pages at once. Writes made on another node show up within
+the TTL.
+"""
+import os
+import time
+from datetime import datetime
+
+import storage
+from ttl_cache import TTLCache
+
+CACHE_TTL = float(os.getenv('PROGRESS_CACHE_TTL', '5'))
+CACHE_SIZE = int(os.getenv('PROGRESS_CACHE_SIZE', '4096'))
+MAX_PAGE_SIZE = 100
+
+# user_id -> {(before_id, limit): (stored at, stored entries)}
+cache = TTLCache(CACHE_TTL, CACHE_SIZE)
+
+
+class ProgressError(Exception):
+    """A request the service refuses; ``status`` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def page_args(args):
+    """Keyset page from ``?before_id=&limit=``: (before_id, limit), each None when absent."""
+    before_id = args.get('before_id', type=int)
+    limit = args.get('limit', type=int)
+    if ('before_id' in args and before_id is None) or ('limit' in args and limit is None):
+        raise ProgressError('before_id and limit must be integers')
+    if (before_id is not None and before_id < 1) or (limit is not None and limit < 1):
+        raise ProgressError('before_id and limit must be positive')
+    return before_id, None if limit is None else min(limit, MAX_PAGE_SIZE)
+
+
+def _text(payload, field):
+    value = payload.get(field) or ''
+    if not isinstance(value, str):
+        raise ProgressError(f"{field} must be a string")
+    return value.strip()
+
+
+def new_progress_record(payload, user_id):
+    """Validate an add payload; returns the record to store, or None if required fields are missing.
+
+    Raises ProgressError when a required field is not a string.
+    """
+    crop_name = _text(payload, 'crop_name')
+    start_date = _text(payload, 'start_date')
+    harvest_date = _text(payload, 'harvest_date')
+    if not crop_name or not start_date or not harvest_date:
+        return None
+    return {
+        'user_id': user_id,
+        'crop_name': crop_name,
+        'start_date': start_date,
+        'harvest_date': harvest_date,
+        'task_timeline': payload.get('task_timeline', []),
+        'status': payload.get('status', 'monitoring'),
+        'recommendation': payload.get('recommendation', '')
+    }
+
+
+def serialize_progress_row(r, today):
+    """Shape one stored progress entry the way progress.js expects (adds recommendation, next_task, progress_percent)."""
+    tasks = [dict(t, done=bool(t.get('done', False))) for t in r['task_timeline']]
+
+    # recommendation / next task from today's date and the task timeline
+    rec = ''
+    next_task = None
+    harvest_date = None
+    try:
+        if r['harvest_date']:
+            harvest_date = datetime.fromisoformat(r['harvest_date']).date()
+    except:
+        try:
+            harvest_date = datetime.strptime(r['harvest_date'], '%Y-%m-%d').date()
+        except:
+            harvest_date = None
+
+    today_tasks = []
+    for t in tasks:
+        try:
+            if t.get('date') and datetime.fromisoformat(t['date']).date() == today:
+                today_tasks.append(t)
+        except:
+            pass
+
+    if today_tasks:
+        rec = f"Perform today's task: {today_tasks[0].get('name')}"
+        next_task = today_tasks[0]
+    else:
+        future = []
+        for t in tasks:
+            try:
+                td = datetime.fromisoformat(t['date']).date()
+                if td > today and not t.get('done'):
+                    future.append((td, t))
+            except:
+                continue
+        if future:
+            future.sort(key=lambda x: x[0])
+            next_task = future[0][1]
+            rec = f"Next upcoming task: {next_task.get('name')} on {future[0][0].isoformat()}"
+        else:
+            if harvest_date and today > harvest_date:
+                rec = "Harvest completed — check final yield."
+            else:
+                try:
+                    sd = datetime.fromisoformat(r['start_date']).date()
+                    if (today - sd).days <= 3 or not tasks:
+                        rec = "Land preparation ongoing."
+                    else:
+                        rec = "Monitoring in progress."
+                except:
+                    rec = "Monitoring in progress."
+
+    total_tasks = len(tasks) or 0
+    done_tasks = sum(1 for t in tasks if t.get('done'))
+    progress_percent = int((done_tasks / total_tasks) * 100) if total_tasks else 0
+
+    return {
+        'id': r['id'],
+        'crop_name': r['crop_name'],
+        'start_date': r['start_date'],
+        'harvest_date': r['harvest_date'],
+        'tasks': tasks,
+        'status': r['status'],
+        'recommendation': rec,
+        'next_task': next_task,
+        'progress_percent': progress_percent
+    }
+
+
+def available():
+    return storage.get() is not None
+
+
+def _store():
+    store = storage.get()
+    if store is None:
+        raise ProgressError('Feature not available on this platform')
+    return store
+
+
+def cached_entries(user_id, before_id=None, limit=None):
+    """``(True, entries)`` if this page is cached, ``(False, None)`` otherwise."""
+    hit, pages = cache.get(user_id)
+    stored_at, entries = pages.get((before_id, limit), (0, None)) if hit else (0, None)
+    if time.monotonic() - stored_at < CACHE_TTL:
+        return True, entries
+    return False, None
+
+
+def remember(user_id, before_id, limit, entries):
+    # Re-putting the user restarts their TTL, so each page also keeps its own age
+    hit, pages = cache.get(user_id)
+    pages = dict(pages) if hit else {}
+    pages[(before_id, limit)] = (time.monotonic(), entries)
+    cache.put(user_id, pages)
+
+
+def invalidate(user_id):
+    cache.discard(user_id)
+
+
+def list_entries(user_id, before_id=None, limit=None):
+    """Serialized entries for one page of the user's progress, newest first."""
+    hit, entries = cached_entries(user_id, before_id, limit)
+    if not hit:
+        entries = _store().list_progress(user_id, before_id, limit)
+        remember(user_id, before_id, limit, entries)
+    today = datetime.utcnow().date()
+    return [serialize_progress_row(r, today) for r in entries]
+
+
+def add(user_id, payload):
+    """Store a new entry; returns its id."""
+    record = new_progress_record(payload, user_id)
+    if record is None:
+        raise ProgressError('Missing required fields')
+    progress_id = _store().add_progress(record)
+    invalidate(user_id)
+    return progress_id
+
+
+def mark_task_done(user_id, progress_id, task_index):
+    """Mark one task done; returns the entry's new status (completed once every task is done)."""
+    if progress_id is None or task_index is None:
+        raise ProgressError('Missing fields')
+    store = _store()
+    entry = store.get_progress(user_id, progress_id)
+    if not entry:
+        raise ProgressError('Not found', 404)
+    tasks = entry['task_timeline']
+    if not isinstance(task_index, int) or task_index < 0 or task_index >= len(tasks):
+        raise ProgressError('Invalid index')
+    tasks[task_index]['done'] = True
+    new_status = 'completed' if all(t.get('done') for t in tasks) else 'monitoring'
+    store.update_progress(user_id, progress_id, tasks, new_status)
+    invalidate(user_id)
+    return new_status
+
+
+def delete(user_id, progress_id):
+    if progress_id is None:
+        raise ProgressError('Missing id')
+    if not _store().delete_progress(user_id, progress_id):
+        raise ProgressError('Not found or not permitted', 404)
+    invalidate(user_id)
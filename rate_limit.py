@@ -0,0 +1,240 @@
+"""Per-client rate limits and admission control for the expensive routes.
+
+Each limited route belongs to a bucket with a token-bucket budget
+(``capacity`` requests, refilled at ``capacity / period`` per second). The
+bucket is keyed by the logged-in user, or by client IP for anonymous
+requests (login is always keyed by IP). Over budget the request gets 429
+with ``Retry-After``.
+
+Limited routes also share a per-process concurrency limit
+(``RATE_LIMIT_MAX_CONCURRENT``): when that many are already in flight a new
+one is refused at once with 503 rather than queueing behind them.
+
+Settings:
+
+* ``RATE_LIMIT_BACKEND``: ``memory`` (default, per process), ``sqlite``
+  (``RATE_LIMIT_DB_PATH``, shared by the workers on one host) or ``mongo``
+  (the ``rate_limits`` collection, shared by every instance; default on
+  Vercel), ``off`` to disable;
+* ``RATE_LIMIT_<BUCKET>=capacity/period`` overrides a budget, e.g.
+  ``RATE_LIMIT_LOGIN=10/60``;
+* ``RATE_LIMIT_TRUSTED_PROXIES``: number of proxies in front of the app whose
+  ``X-Forwarded-For`` entries are trusted for the client IP (1 on Render).
+
+A shared store that errors fails open (the request is allowed).
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from flask import jsonify, request, session
+from pymongo import ReturnDocument
+
+import metrics
+from metrics import sqlite_connect
+
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND') or ('mongo' if os.environ.get('VERCEL') else 'memory')
+RATE_LIMIT_DB_PATH = os.getenv('RATE_LIMIT_DB_PATH', os.path.join(os.path.dirname(__file__), 'rate_limits.db'))
+MAX_CONCURRENT = int(os.getenv('RATE_LIMIT_MAX_CONCURRENT', '16'))
+TRUSTED_PROXIES = int(os.getenv('RATE_LIMIT_TRUSTED_PROXIES', '0'))
+MEMORY_MAX_KEYS = 100000
+PURGE_EVERY = 1000   # SQLite: drop idle buckets every N requests
+IDLE_SECONDS = 3600  # longer than any budget's period
+
+
+def _budget(bucket, default):
+    capacity, period = os.getenv(f"RATE_LIMIT_{bucket.upper()}", default).split('/')
+    return int(capacity), float(period)
+
+
+# bucket -> (capacity, period seconds)
+BUDGETS = {
+    'login': _budget('login', '5/60'),
+    'recommend': _budget('recommend', '20/60'),
+    'market_prices': _budget('market_prices', '30/60'),
+}
+# endpoint -> (bucket, limited methods)
+ROUTES = {
+    'login': ('login', {'POST'}),
+    'register': ('login', {'POST'}),
+    'crop_suggestion': ('recommend', {'POST'}),
+    'fertilizer_advice': ('recommend', {'POST'}),
+    'api_v1.crop_suggestion': ('recommend', {'POST'}),
+    'api_v1.fertilizer_advice': ('recommend', {'POST'}),
+    'api_market_prices': ('market_prices', {'GET'}),
+}
+
+_store = None
+_slots = threading.BoundedSemaphore(MAX_CONCURRENT)
+
+
+def _refill(tokens, updated, now, capacity, rate):
+    return min(capacity, tokens + (now - updated) * rate)
+
+
+class MemoryStore:
+    """Token buckets in a per-process dict (least recently used keys evicted)."""
+
+    def __init__(self, max_keys=MEMORY_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> [tokens, updated]
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate, now):
+        """Take one token; returns ``(allowed, tokens_left)``."""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(capacity), now]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = _refill(bucket[0], bucket[1], now, capacity, rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return True, bucket[0]
+            return False, bucket[0]
+
+
+class SQLiteStore:
+    """Token buckets in a SQLite table, updated by one atomic upsert per request.
+
+    Each thread keeps its own connection; buckets are not worth an fsync, so
+    commits use ``synchronous=NORMAL`` (durable up to the last checkpoint).
+    """
+
+    def __init__(self, path=RATE_LIMIT_DB_PATH):
+        self.path = path
+        self._takes = 0
+        self._local = threading.local()
+        conn = sqlite_connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""CREATE TABLE IF NOT EXISTS rate_limits (
+            key TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated REAL NOT NULL,
+            allowed INTEGER NOT NULL
+        )""")
+        conn.commit()
+        conn.close()
+
+    def take(self, key, capacity, rate, now):
+        refill = "MIN(:capacity, tokens + (:now - updated) * :rate)"
+        conn = self._connection()
+        # SET expressions see the old row, so `allowed` and `tokens` agree. fetchall()
+        # runs the statement to completion, which commits it.
+        allowed, tokens = conn.execute(f"""
+            INSERT INTO rate_limits (key, tokens, updated, allowed) VALUES (:key, :capacity - 1, :now, 1)
+            ON CONFLICT(key) DO UPDATE SET
+                tokens = CASE WHEN {refill} >= 1 THEN {refill} - 1 ELSE {refill} END,
+                updated = :now,
+                allowed = {refill} >= 1
+            RETURNING allowed, tokens""", {'key': key, 'capacity': capacity, 'rate': rate, 'now': now}).fetchall()[0]
+        self._takes += 1
+        if self._takes % PURGE_EVERY == 0:
+            conn.execute("DELETE FROM rate_limits WHERE updated < ?", (now - IDLE_SECONDS,))
+        return bool(allowed), tokens
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite_connect(self.path, isolation_level=None, timeout=1)
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+
+class MongoStore:
+    """Token buckets in the ``rate_limits`` collection, one pipeline update per request."""
+
+    def __init__(self, db):
+        self.collection = db['rate_limits']
+        self.collection.create_index('expires_at', expireAfterSeconds=0)
+
+    def take(self, key, capacity, rate, now):
+        refill = {'$min': [capacity, {'$add': [
+            {'$ifNull': ['$tokens', capacity]},
+            {'$multiply': [{'$subtract': [now, {'$ifNull': ['$updated', now]}]}, rate]},
+        ]}]}
+        doc = self.collection.find_one_and_update({'_id': key}, [
+            {'$set': {'tokens': refill}},
+            {'$set': {'allowed': {'$gte': ['$tokens', 1]}}},
+            {'$set': {
+                'tokens': {'$cond': ['$allowed', {'$subtract': ['$tokens', 1]}, '$tokens']},
+                'updated': now,
+                # A bucket idle for one full refill is back at capacity
+                'expires_at': datetime.utcnow() + timedelta(seconds=capacity / rate),
+            }},
+        ], upsert=True, return_document=ReturnDocument.AFTER)
+        return doc['allowed'], doc['tokens']
+
+
+def client_ip():
+    if TRUSTED_PROXIES > 0:
+        route = request.access_route
+        if len(route) >= TRUSTED_PROXIES:
+            return route[-TRUSTED_PROXIES]
+    return request.remote_addr or 'unknown'
+
+
+def _too_many(bucket, retry_after):
+    metrics.inc('farming_rate_limited_total', (('bucket', bucket), ('reason', 'rate')))
+    response = jsonify({'status': 'error', 'error': 'Too many requests, please slow down'})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(1, int(retry_after + 0.999)))
+    return response
+
+
+def _overloaded(bucket):
+    metrics.inc('farming_rate_limited_total', (('bucket', bucket), ('reason', 'concurrency')))
+    response = jsonify({'status': 'error', 'error': 'Server is busy, please retry shortly'})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+
+def _before_request():
+    route = ROUTES.get(request.endpoint)
+    if route is None or request.method not in route[1]:
+        return None
+    bucket = route[0]
+    capacity, period = BUDGETS[bucket]
+    rate = capacity / period
+    user_id = session.get('user_id') if bucket != 'login' else None
+    key = f"{bucket}:u:{user_id}" if user_id else f"{bucket}:ip:{client_ip()}"
+    try:
+        allowed, tokens = _store.take(key, capacity, rate, time.time())
+    except Exception as e:
+        print(f"❌ Rate limit store error: {e}")
+        allowed, tokens = True, 0
+    if not allowed:
+        return _too_many(bucket, (1 - tokens) / rate)
+
+    if not _slots.acquire(blocking=False):
+        return _overloaded(bucket)
+    request._get_current_object()._rate_limit_slot = True
+    return None
+
+
+def _teardown_request(exc):
+    if request._get_current_object().__dict__.pop('_rate_limit_slot', False):
+        _slots.release()
+
+
+def init_app(app, mongo_db=None, backend=RATE_LIMIT_BACKEND):
+    global _store
+    if backend == 'off':
+        return
+    if backend == 'mongo' and mongo_db is None:
+        backend = 'memory' if os.environ.get('VERCEL') else 'sqlite'
+    if backend == 'mongo':
+        _store = MongoStore(mongo_db)
+    elif backend == 'sqlite':
+        _store = SQLiteStore()
+    else:
+        _store = MemoryStore()
+    app.before_request(_before_request)
+    app.teardown_request(_teardown_request)
@@ -0,0 +1,274 @@
+"""Runs the CPU-bound recommendation calls on a bounded pool of worker processes.
+
+With ``RECOMMENDER_PROCESSES`` > 0 (the default outside Vercel) calls run on a
+pool of that many processes, each of which loads the crop and fertilizer
+datasets and trains the model once at start-up, so a pandas/sklearn call does
+not hold the serving process's GIL. With 0 they run in the request thread.
+
+Either way at most ``RECOMMENDER_QUEUE_SIZE`` calls may be queued or running
+per serving process. When the queue is full a caller waits up to
+``RECOMMENDER_QUEUE_WAIT`` seconds for a slot and then gets ``Saturated``;
+a call that does not finish within ``RECOMMENDER_TIMEOUT`` seconds also raises
+``Saturated``. ``init_app()`` turns it into a 503 with ``Retry-After``.
+
+``start()`` pre-warms the pool; gunicorn calls it from ``post_fork`` and
+``asgi.py`` from its lifespan, otherwise the pool starts on first use.
+``recycle()`` swaps in a freshly warmed pool after a model reload. A pool
+broken by a process that died (OOM, SIGKILL) is replaced on the next call:
+a call that could not be submitted is retried once on the new pool, a call
+that was running on the dead process gets ``Saturated``.
+
+Tasks run against ``model_registry.current()`` in the pool's processes; the
+serving process itself never builds the models while there is a pool
+(``pooled()``), it only tracks the version its pool loaded
+(``pool_version()``). The version that produced a result is recorded on the
+request for the ``X-Model-Version`` header. For a request being profiled
+(``profiling``) the task runs under the request's profiler in the pool process
+and the profile comes back with the result.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import has_request_context, jsonify, request
+
+import metrics
+import model_registry
+import profiling
+
+_DEFAULT_PROCESSES = '0' if os.environ.get('VERCEL') else '1'
+RECOMMENDER_PROCESSES = int(os.getenv('RECOMMENDER_PROCESSES', _DEFAULT_PROCESSES))
+QUEUE_SIZE = int(os.getenv('RECOMMENDER_QUEUE_SIZE', str(max(1, RECOMMENDER_PROCESSES) * 4)))
+QUEUE_WAIT = float(os.getenv('RECOMMENDER_QUEUE_WAIT', '0.5'))
+TIMEOUT = float(os.getenv('RECOMMENDER_TIMEOUT', '10'))
+RETRY_AFTER = int(os.getenv('RECOMMENDER_RETRY_AFTER', '2'))
+
+_pool = None
+_pool_version = None    # source version the pool's processes loaded
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(QUEUE_SIZE)
+
+
+class Saturated(Exception):
+    """The recommendation queue is full or a call timed out; retry later."""
+
+    def __init__(self, message, retry_after=RETRY_AFTER):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# Task functions run inside the worker processes.
+def _warm():
+    """Pool initializer: load the datasets and train the model once per process."""
+    model_registry.current()
+
+
+def _ping():
+    return model_registry.current().version
+
+
+def crop_recommendations(kwargs):
+    models = model_registry.current()
+    return models.version, models.crop.get_crop_recommendations(**kwargs)
+
+
+def fertilizer_recommendations(kwargs):
+    models = model_registry.current()
+    return models.version, models.fertilizer.get_fertilizer_recommendations(**kwargs)
+
+
+TASKS = {
+    'crop': crop_recommendations,
+    'fertilizer': fertilizer_recommendations,
+}
+
+
+def profiled(mode, kind, kwargs):
+    """Task ``kind`` under a ``mode`` profiler: ``(versioned result, profile)``."""
+    return profiling.profile_call(mode, TASKS[kind], kwargs)
+
+
+def _new_pool():
+    return ProcessPoolExecutor(max_workers=RECOMMENDER_PROCESSES,
+                               mp_context=multiprocessing.get_context('spawn'),
+                               initializer=_warm)
+
+
+def pooled():
+    """Whether recommendations run on the process pool rather than in this process."""
+    return RECOMMENDER_PROCESSES > 0
+
+
+def pool_version():
+    """Version of the files the pool's processes loaded (None before the pool starts)."""
+    return _pool_version
+
+
+def _set_pool_version(version):
+    """Record the version the pool loaded; call with ``_pool_lock`` held.
+
+    The pool's processes export no metrics, so this process reports the
+    pool's version in ``farming_model_version``.
+    """
+    global _pool_version
+    old, _pool_version = _pool_version, version
+    if version != old:
+        metrics.gauge_add('farming_model_version', (('version', version),), 1)
+        if old is not None:
+            metrics.gauge_add('farming_model_version', (('version', old),), -1)
+
+
+def get_pool():
+    """Create the process pool on first use (after gunicorn/uvicorn has forked)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # The processes load the files as they are now
+                _set_pool_version(model_registry.source_version())
+                _pool = _new_pool()
+    return _pool
+
+
+def _prewarm(pool):
+    # The pool spawns a process per submission while none is idle.
+    return [pool.submit(_ping) for _ in range(RECOMMENDER_PROCESSES)]
+
+
+def start():
+    """Spawn every pool process now so the first requests don't pay for start-up."""
+    if RECOMMENDER_PROCESSES <= 0:
+        return
+    _prewarm(get_pool())
+
+
+def recycle(warm_timeout=300):
+    """Replace a running pool with new processes (which load the current files).
+
+    The new pool is warmed before it is swapped in; calls already submitted
+    to the old pool finish there before its processes exit. Returns the
+    version the new pool loaded, or None if it failed to warm (the old pool
+    stays) or there is no pool yet (it will load the current files).
+    """
+    global _pool
+    if RECOMMENDER_PROCESSES <= 0 or _pool is None:
+        return None
+    pool = _new_pool()
+    try:
+        versions = [future.result(timeout=warm_timeout) for future in _prewarm(pool)]
+    except Exception as e:
+        print(f"❌ Recommendation pool recycle failed, keeping the old pool: {e}")
+        pool.shutdown(wait=False, cancel_futures=True)
+        return None
+    with _pool_lock:
+        old, _pool = _pool, pool
+        _set_pool_version(versions[0])
+    if old is not None:
+        old.shutdown(wait=False)
+    return versions[0]
+
+
+def _replace_broken(pool):
+    """Swap a new pool in for ``pool``, which a dead process has broken; returns the pool to use."""
+    global _pool
+    with _pool_lock:
+        replaced = _pool is pool
+        if replaced:
+            _set_pool_version(model_registry.source_version())
+            _pool = _new_pool()
+        current = _pool
+    if replaced:
+        print("❌ A recommendation process died, replacing the pool")
+        metrics.inc('farming_recommender_pool_restarts_total', ())
+        pool.shutdown(wait=False, cancel_futures=True)
+        _prewarm(current)
+    return current
+
+
+def _submit(kind, kwargs, profile_mode=None):
+    """``(pool, future)``; a broken pool is replaced and the submit retried once."""
+    task = (TASKS[kind], kwargs) if profile_mode is None else (profiled, profile_mode, kind, kwargs)
+    pool = get_pool()
+    try:
+        return pool, pool.submit(*task)
+    except BrokenProcessPool:
+        pool = _replace_broken(pool)
+        return pool, pool.submit(*task)
+
+
+def _release(_future):
+    _slots.release()
+    metrics.gauge_add('farming_recommender_queue_depth', (), -1)
+
+
+def _result(versioned):
+    version, result = versioned
+    if has_request_context():
+        request._get_current_object()._model_version = version
+    return result
+
+
+def run(kind, **kwargs):
+    """Run recommendation ``kind`` ('crop' or 'fertilizer') and return its result.
+
+    Raises ``Saturated`` if no queue slot frees up within ``QUEUE_WAIT`` seconds
+    or the call takes longer than ``TIMEOUT``.
+    """
+    if not _slots.acquire(timeout=QUEUE_WAIT):
+        metrics.inc('farming_recommender_rejected_total', (('kind', kind), ('reason', 'queue_full')))
+        raise Saturated('Recommendation service is busy, please retry shortly')
+    metrics.gauge_add('farming_recommender_queue_depth', (), 1)
+
+    if RECOMMENDER_PROCESSES <= 0:
+        try:
+            return _result(TASKS[kind](kwargs))
+        finally:
+            _release(None)
+
+    profile_mode = profiling.current_mode()
+    try:
+        pool, future = _submit(kind, kwargs, profile_mode)
+    except BrokenProcessPool:
+        _release(None)
+        metrics.inc('farming_recommender_rejected_total', (('kind', kind), ('reason', 'pool_broken')))
+        raise Saturated('Recommendation service is restarting, please retry shortly')
+    except Exception:
+        _release(None)
+        raise
+    # The slot is held until the work actually finishes, even if we stop waiting.
+    future.add_done_callback(_release)
+    try:
+        versioned = future.result(timeout=TIMEOUT)
+        if profile_mode is not None:
+            versioned, profile = versioned
+            profiling.add_profile(profile)
+        return _result(versioned)
+    except FutureTimeout:
+        future.cancel()
+        metrics.inc('farming_recommender_rejected_total', (('kind', kind), ('reason', 'timeout')))
+        raise Saturated('Recommendation took too long, please retry shortly')
+    except BrokenProcessPool:
+        # The process running this call died; later calls go to a new pool
+        _replace_broken(pool)
+        metrics.inc('farming_recommender_rejected_total', (('kind', kind), ('reason', 'pool_broken')))
+        raise Saturated('Recommendation service is restarting, please retry shortly')
+
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def saturated_response(e):
+    response = jsonify({'status': 'error', 'error': str(e)})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
+
+def init_app(app):
+    app.register_error_handler(Saturated, saturated_response)
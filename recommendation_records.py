@@ -0,0 +1,98 @@
+"""Immutable records for crop/fertilizer reference data and recommendations.
+
+The reference tables (``crop_rules.CROP_INFO``, ``fertilizer_rules.FERTILIZERS``)
+are built from these once at import. Recommendations carry numbers only
+(e.g. ``application_rate`` in kg/acre); units and formatting are added by the
+templates, and ``to_json()`` serializes the numbers as-is (with orjson when it
+is installed).
+"""
+import dataclasses
+import json
+from dataclasses import dataclass
+from typing import Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _plain(obj):
+    if dataclasses.is_dataclass(obj):
+        return dataclasses.asdict(obj)
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj):
+    """JSON bytes for a record, a list of records or plain data."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, default=_plain, separators=(',', ':')).encode()
+
+
+class _Record:
+    __slots__ = ()
+
+    def to_json(self):
+        return dumps(self)
+
+
+@dataclass(frozen=True, slots=True)
+class CropInfo(_Record):
+    category: str
+    yield_range: Tuple[int, int]  # quintals/hectare
+    profit: int                   # rupees/hectare
+    duration: int                 # days
+    water: str
+    npk: str
+
+
+@dataclass(frozen=True, slots=True)
+class FertilizerInfo(_Record):
+    full_name: str
+    type: str
+    npk: Tuple[int, int, int]
+    cost_per_kg: int
+    description: str
+    application_method: str
+    frequency: str
+    best_time: str
+    yield_increase: int           # percent
+
+
+@dataclass(frozen=True, slots=True)
+class NutrientProfile(_Record):
+    nitrogen: float
+    phosphorus: float
+    potassium: float
+    temperature: float
+    humidity: float
+    ph: float
+    rainfall: float
+
+
+@dataclass(frozen=True, slots=True)
+class CropRecommendation(_Record):
+    name: str
+    suitability: int
+    category: str
+    expected_yield: Tuple[int, int]
+    expected_profit: int
+    growth_duration: int
+    water_requirement: str
+    fertilizer_npk: str
+    avg_requirements: NutrientProfile
+
+
+@dataclass(frozen=True, slots=True)
+class FertilizerRecommendation(_Record):
+    name: str
+    type: str
+    suitability: int
+    application_rate: float       # kg/acre
+    cost: int                     # rupees/acre
+    timing: str
+    yield_increase: int
+    application_method: str
+    frequency: str
+    best_time: str
@@ -0,0 +1,274 @@
+"""NumPy recommendation engine and its precompiled table bundle.
+
+Serving needs a handful of float columns and a few per-crop statistics, so
+recommendations are computed from plain arrays:
+
+* ``crop_labels`` / ``crop_means``: each crop's feature means, in dataset order;
+* ``fert_values``: Temperature, Moisture, Nitrogen, Phosphorous and Potassium
+  of every fertilizer dataset row, grouped by crop. Crop ``i``'s rows are
+  ``fert_crop_offsets[i]:fert_crop_offsets[i + 1]`` (names in
+  ``fert_crop_labels``, normalized); ``fert_rows`` is each row's position in
+  the dataset and ``fert_codes`` its fertilizer, an index into ``fert_labels``;
+* ``forest_*``: the fertilizer model ``FertilizerDataset`` predicts with, as
+  ``forest_arrays`` arrays (``forest_nodes``, ``forest_leaves``,
+  ``forest_roots``, ``forest_classes``, ``forest_depth``) with its
+  ``forest_features`` and ``forest_crop_classes`` (the ``crop_enc`` codes).
+
+``CropTable`` scores crops and ``FertilizerTable`` does the fertilizer
+neighbour search and its value counts; ``forest_predictions()`` turns a
+model's probabilities into the predictions both fertilizer paths use. Only
+``crop_tables()`` / ``fertilizer_tables()`` use pandas: ``CropDataset`` and
+``FertilizerDataset`` call them once after loading the CSVs, and
+``python recommendation_tables.py build`` calls them offline to write the
+bundle to ``models/recommendation_tables.npz``.
+
+``model_registry`` serves from that file when ``RECOMMENDATION_TABLES=1``
+(the default on Vercel, where a cold start would otherwise import pandas and
+sklearn and train the forest). ``RECOMMENDATION_TABLES_PATH`` overrides the
+file. The bundle's forest is an unpruned export of the forest
+``FertilizerDataset`` trains (or the ``models/fertilizer_forest/`` export it
+loads), so both paths give the same recommendations; a model that is not a
+forest (a ``train.py`` pickle of another candidate) is left out and the bundle
+then has no model predictions, like ``FertilizerDataset`` without a model.
+The file is committed; rebuild it whenever the dataset CSVs or the fertilizer
+model change.
+"""
+import io
+import os
+import sys
+
+import numpy as np
+
+import forest_arrays
+import model_paths
+from crop_rules import crop_recommendation
+from fertilizer_rules import FertilizerRules
+from recommendation_records import NutrientProfile
+from topk import top_indices
+
+ENABLED = model_paths.TABLES_ENABLED
+TABLES_PATH = model_paths.TABLES_PATH
+
+# Same order as streaming_loader.CROP_FEATURES, with the divisor of each
+# feature's distance in the crop score
+CROP_FEATURES = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
+CROP_SCALES = np.array([100, 100, 100, 30, 100, 7, 200], dtype=np.float64)
+FERTILIZER_FEATURES = ['Temperature', 'Moisture', 'Nitrogen', 'Phosphorous', 'Potassium']
+NEIGHBOURS = 10
+TOP_CROPS = 6
+
+
+def normalize_crop(name):
+    return name.lower().replace(' ', '').replace('_', '')
+
+
+class CropTable:
+    def __init__(self, tables):
+        self.labels = tables['crop_labels'].tolist()
+        self.means = tables['crop_means']
+        self.crop_means = {label: dict(zip(CROP_FEATURES, row)) for label, row in zip(self.labels, self.means.tolist())}
+        self.crop_profiles = {label: NutrientProfile(*np.round(row, 1).tolist())
+                              for label, row in zip(self.labels, self.means)}
+
+    def get_crop_recommendations(self, nitrogen, phosphorus, potassium, temperature, humidity, ph, rainfall,
+                                 top_k=TOP_CROPS):
+        """Top ``top_k`` crops by suitability: 100 - 20 x the scaled L1 distance to the crop's means."""
+        if not self.labels:
+            return []
+        try:
+            x = np.array([float(v) for v in (nitrogen, phosphorus, potassium, temperature, humidity, ph, rainfall)])
+        except (TypeError, ValueError) as e:
+            print(f"Error in get_crop_recommendations: {e}")
+            return []
+
+        score = (np.abs(x - self.means) / CROP_SCALES).sum(axis=1)
+        suitability = np.clip(np.trunc(100 - score * 20), 0, 100).astype(int)
+        # Highest first; equal scores keep dataset order
+        suitable = np.flatnonzero(suitability > 0)
+        best = suitable[top_indices(suitability[suitable], top_k)]
+        return [crop_recommendation(self.labels[i], int(suitability[i]), self.crop_profiles[self.labels[i]])
+                for i in best]
+
+
+class FertilizerTable:
+    def __init__(self, tables):
+        self.values = tables['fert_values']
+        self.rows = tables['fert_rows']
+        self.crop_offsets = tables['fert_crop_offsets']
+        self.crop_labels = tables['fert_crop_labels'].tolist()
+        self.codes = tables['fert_codes']
+        self.labels = tables['fert_labels'].tolist()
+
+    def __len__(self):
+        return len(self.values)
+
+    def _crop_rows(self, crop):
+        """Rows of every crop whose name contains ``crop``; all rows if none does."""
+        matched = [i for i, label in enumerate(self.crop_labels) if crop in label]
+        if not matched or len(matched) == len(self.crop_labels):
+            return slice(None)
+        if len(matched) == 1:
+            i = matched[0]
+            return slice(self.crop_offsets[i], self.crop_offsets[i + 1])
+        return np.concatenate([np.arange(self.crop_offsets[i], self.crop_offsets[i + 1]) for i in matched])
+
+    def fertilizer_counts(self, temp, moisture, nitrogen, phosphorus, potassium, crop, neighbours=NEIGHBOURS):
+        """``(fertilizer, rows)`` among the ``neighbours`` rows closest to the input, most common first.
+
+        Closeness is the weighted sum of relative differences; ties go to the
+        earlier dataset row. Equal counts keep the order in which the
+        fertilizers first appear among the closest rows.
+        """
+        rows = self._crop_rows(crop)
+        t, m, n, p, k = self.values[rows].T
+        temp_diff = np.abs(t - temp) / temp if temp > 0 else 0
+        moisture_diff = np.abs(m - moisture) / moisture if moisture > 0 else 0
+        n_diff = np.abs(n - nitrogen) / max(nitrogen, 1)
+        p_diff = np.abs(p - phosphorus) / max(phosphorus, 1)
+        k_diff = np.abs(k - potassium) / max(potassium, 1)
+        score = temp_diff * 0.25 + moisture_diff * 0.20 + n_diff * 0.20 + p_diff * 0.20 + k_diff * 0.15
+        nearest = top_indices(score, neighbours, largest=False, tiebreak=self.rows[rows])
+
+        codes = self.codes[rows][nearest]
+        counts = np.bincount(codes, minlength=len(self.labels))
+        seen, first = np.unique(codes, return_index=True)
+        by_appearance = seen[np.argsort(first)]
+        ranked = by_appearance[np.argsort(-counts[by_appearance], kind='stable')]
+        return [(self.labels[c], int(counts[c])) for c in ranked]
+
+
+def forest_predictions(model, features, crop_codes, temp, moist, nitrogen, phosphorus, potassium, crop, top_k=5):
+    """The ``top_k`` most probable fertilizers as ``{'name', 'prob'}``.
+
+    The model's inputs are the ``FertilizerDataset`` features; PH is not an
+    input (0) and an unseen ``crop`` (normalized) gets code 0.
+    """
+    x = np.array([temp, moist, nitrogen, phosphorus, potassium, 0.0, crop_codes.get(crop, 0)], dtype=float)
+    # Ensure length matches
+    if x.shape[0] != len(features):
+        x = x[:len(features)]
+    try:
+        probs = model.predict_proba([x])[0]
+    except Exception:
+        return []
+    classes = model.classes_
+    return [{'name': classes[i], 'prob': float(probs[i])} for i in top_indices(probs, top_k)]
+
+
+class TableFertilizerModel(FertilizerRules):
+    """Fertilizer recommendations from the bundle alone: table search, the bundled forest's predictions."""
+
+    def __init__(self, tables):
+        self.fertilizer_database = self._create_fertilizer_database()
+        self.crop_nutrient_mapping = self._create_crop_nutrient_mapping()
+        self.table = FertilizerTable(tables)
+        self.model = None
+        if 'forest_nodes' in tables:
+            self.model = forest_arrays.ForestArrays(
+                tables['forest_nodes'], tables['forest_leaves'], tables['forest_roots'],
+                tables['forest_classes'].tolist(), int(tables['forest_depth']))
+            self.features = tables['forest_features'].tolist()
+            self.crop_codes = {crop: code for code, crop in enumerate(tables['forest_crop_classes'].tolist())}
+
+    def has_data(self):
+        return len(self.table) > 0
+
+    def _fertilizer_counts(self, temp, humid, moisture, nitrogen, phosphorus, potassium, crop):
+        return self.table.fertilizer_counts(temp, moisture, nitrogen, phosphorus, potassium, crop)
+
+    def _predict_fertilizers(self, temp, moist, nitrogen, phosphorus, potassium, crop, top_k=5):
+        if self.model is None:
+            return []
+        moist = moist or 0.0
+        if moist > 1:
+            moist = max(0.0, min(1.0, moist / 100.0))
+        return forest_predictions(self.model, self.features, self.crop_codes, temp, moist,
+                                  nitrogen, phosphorus, potassium, normalize_crop(crop), top_k)
+
+
+def crop_tables(crop_means):
+    """Crop arrays from ``CropDataset.crop_means``."""
+    return {
+        'crop_labels': np.array(list(crop_means), dtype=str),
+        'crop_means': np.array([[avg[f] for f in CROP_FEATURES] for avg in crop_means.values()],
+                               dtype=np.float64).reshape(len(crop_means), len(CROP_FEATURES)),
+    }
+
+
+def fertilizer_tables(df):
+    """Fertilizer arrays from the ``FertilizerDataset`` DataFrame (the step that needs pandas)."""
+    import pandas as pd
+
+    crop_codes, crop_labels = pd.factorize(df['Crop'].astype(str).map(normalize_crop))
+    fert_codes, fert_labels = pd.factorize(df['Fertilizer'].astype(str))
+    # Grouped by crop, dataset order within a crop
+    order = np.argsort(crop_codes, kind='stable')
+    return {
+        'fert_values': df[FERTILIZER_FEATURES].fillna(0).to_numpy(dtype=np.float64)[order],
+        'fert_rows': order.astype(np.int32),
+        'fert_crop_offsets': np.searchsorted(crop_codes[order], np.arange(len(crop_labels) + 1)).astype(np.int64),
+        'fert_crop_labels': np.array(crop_labels, dtype=str),
+        'fert_codes': fert_codes[order].astype(np.int32),
+        'fert_labels': np.array(fert_labels, dtype=str),
+    }
+
+
+def forest_tables(fertilizers):
+    """The forest arrays of a ``FertilizerDataset``'s model; empty if it has no forest."""
+    if fertilizers.model is None:
+        return {}
+    model = fertilizers.model['clf']
+    if not isinstance(model, forest_arrays.ForestArrays):
+        if not hasattr(model, 'estimators_'):
+            print(f"⚠️ {type(model).__name__} is not a forest, the tables have no model predictions")
+            return {}
+        # Unpruned: predicts exactly what the forest does
+        model = forest_arrays.ForestArrays.from_forest(model)
+    crop_classes = sorted(fertilizers.crop_codes, key=fertilizers.crop_codes.get)
+    return {
+        'forest_nodes': np.asarray(model.nodes),
+        'forest_leaves': np.asarray(model.leaves),
+        'forest_roots': np.asarray(model.roots),
+        'forest_classes': np.array(model.classes_, dtype=str),
+        'forest_depth': np.array(model.depth),
+        'forest_features': np.array(fertilizers.model['features'], dtype=str),
+        'forest_crop_classes': np.array(crop_classes, dtype=str),
+    }
+
+
+def load(path=None):
+    """``(CropTable, TableFertilizerModel)`` from the bundle file."""
+    with np.load(path or TABLES_PATH, allow_pickle=False) as tables:
+        tables = {name: tables[name] for name in tables.files}
+    return CropTable(tables), TableFertilizerModel(tables)
+
+
+def build(path=None):
+    """Build the bundle from the dataset CSVs (imports pandas) and write it; returns the path."""
+    import crop_data
+    import fertilizer_data
+
+    crop = crop_data.CropDataset()
+    fertilizers = fertilizer_data.FertilizerDataset()
+    if not crop.crop_means or fertilizers.dataset.empty:
+        raise ValueError('dataset failed to load')
+    tables = dict(crop_tables(crop.crop_means), **fertilizer_tables(fertilizers.dataset), **forest_tables(fertilizers))
+
+    path = path or TABLES_PATH
+    buffer = io.BytesIO()
+    np.savez(buffer, **tables)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(buffer.getvalue())
+    os.replace(tmp, path)
+    return path
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] != ['build']:
+        print("Usage: python recommendation_tables.py build")
+        sys.exit(2)
+    crop, fertilizer = load(build())
+    print(f"Wrote {TABLES_PATH}: {len(crop.labels)} crops, {len(fertilizer.table)} fertilizer rows, "
+          f"{len(fertilizer.table.labels)} fertilizers, "
+          f"{len(fertilizer.model.roots) if fertilizer.model is not None else 'no'} trees")
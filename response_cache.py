@@ -0,0 +1,138 @@
+"""Rendered-response cache for routes whose output does not depend on the session.
+
+    @app.route('/start_growing/<crop_name>')
+    @cached_response(templates=['start_growing.html'])
+    def start_growing(crop_name):
+        ...
+
+Entries are keyed on endpoint, view arguments, query string and the mtimes of
+the listed templates (so editing a template invalidates its pages), and are
+evicted least-recently-used once ``RESPONSE_CACHE_MAX_ENTRIES`` or
+``RESPONSE_CACHE_MAX_BYTES`` is exceeded. Responses carry an ``ETag`` and
+``Cache-Control: public, max-age=...`` so browsers and a CDN can revalidate
+with ``If-None-Match`` and get a 304.
+
+Requests with pending flash messages bypass the cache, since the page would
+render (and consume) them. A route whose template renders session state
+(flash messages) is declared with ``session_dependent=True``: it is only
+``public`` for requests without a session cookie, and ``Vary: Cookie``;
+with a session it is ``private, no-cache``, so the browser revalidates the
+ETag on every visit and a page cached before a logout or a flash is never
+replayed.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request, session
+
+import metrics
+
+MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '256'))
+MAX_BYTES = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', str(16 * 1024 * 1024)))
+
+
+class ResponseCache:
+    """Thread-safe LRU of rendered bodies bounded by entry count and total bytes."""
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (body, status, mimetype, etag)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        size = len(entry[0])
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[0])
+            self._entries[key] = entry
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted[0])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+cache = ResponseCache()
+
+
+def _template_mtimes(names):
+    folder = os.path.join(current_app.root_path, current_app.template_folder)
+    mtimes = []
+    for name in names:
+        try:
+            mtimes.append(os.stat(os.path.join(folder, name)).st_mtime_ns)
+        except OSError:
+            mtimes.append(0)
+    return tuple(mtimes)
+
+
+def _set_cache_control(response, max_age, session_dependent):
+    if session_dependent:
+        response.vary.add('Cookie')
+        if current_app.session_interface.get_cookie_name(current_app) in request.cookies:
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+
+
+def cached_response(templates=(), max_age=300, session_dependent=False):
+    """Cache the rendered response of a GET route whose body is the same for every visitor."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(*args, **kwargs)
+            if session.get('_flashes'):
+                response = current_app.make_response(view(*args, **kwargs))
+                if session_dependent:
+                    _set_cache_control(response, max_age, session_dependent)
+                return response
+
+            key = (request.endpoint,
+                   tuple(sorted(kwargs.items())),
+                   tuple(sorted(request.args.items(multi=True))),
+                   _template_mtimes(templates))
+            entry = cache.get(key)
+            if entry is None:
+                metrics.inc('farming_response_cache_total', (('endpoint', request.endpoint), ('result', 'miss')))
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.direct_passthrough:
+                    return response
+                body = response.get_data()
+                entry = (body, response.status_code, response.mimetype,
+                         hashlib.blake2b(body, digest_size=16).hexdigest())
+                cache.put(key, entry)
+            else:
+                metrics.inc('farming_response_cache_total', (('endpoint', request.endpoint), ('result', 'hit')))
+
+            body, status, mimetype, etag = entry
+            response = current_app.response_class(body, status=status, mimetype=mimetype)
+            response.set_etag(etag)
+            _set_cache_control(response, max_age, session_dependent)
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
@@ -0,0 +1,320 @@
+"""Server-side sessions.
+
+The cookie only carries a signed ``<session id>:<generation>``; the session
+data lives in a backend selected by ``SESSION_BACKEND``:
+
+* ``sqlite`` (default outside Vercel): ``SESSION_DB_PATH``;
+* ``mongo`` (Vercel / production): the ``sessions`` collection, expired by a
+  TTL index on ``expires_at``;
+* ``cookie``: Flask's default signed-cookie session, nothing installed.
+
+A per-process LRU (``SESSION_CACHE_SIZE`` entries) sits in front of the
+backend. Every save bumps the generation and re-issues the cookie, so an
+entry is only served from the LRU while its generation matches the cookie;
+changes made to the session in another worker are therefore seen at once.
+Changes made behind the user's back (``invalidate_user()``) are picked up
+within ``SESSION_CACHE_TTL`` seconds. The backends bump the generation in
+the store itself (``gen = gen + 1`` / ``$inc``), so two writers never hand
+out the same generation for different data.
+
+The session id is rotated whenever the logged-in user changes. Requests to
+``SESSIONLESS_ENDPOINTS`` (default ``static,static_dist,metrics``) get
+Flask's null session and never touch the store.
+"""
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SecureCookieSessionInterface, SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from pymongo import ReturnDocument
+from werkzeug.datastructures import CallbackDict
+from werkzeug.exceptions import HTTPException
+
+from metrics import sqlite_connect
+
+SESSION_BACKEND = os.getenv('SESSION_BACKEND') or ('mongo' if os.environ.get('VERCEL') else 'sqlite')
+SESSION_DB_PATH = os.getenv('SESSION_DB_PATH', os.path.join(os.path.dirname(__file__), 'sessions.db'))
+CACHE_SIZE = int(os.getenv('SESSION_CACHE_SIZE', '4096'))
+CACHE_TTL = float(os.getenv('SESSION_CACHE_TTL', '5'))
+SESSIONLESS_ENDPOINTS = set(filter(None, os.getenv('SESSIONLESS_ENDPOINTS', 'static,static_dist,metrics').split(',')))
+# Drop expired SQLite rows on roughly one save in this many
+PURGE_EVERY = 200
+
+serializer = TaggedJSONSerializer()
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, gen=0, new=False):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.gen = gen
+        self.new = new
+        self.modified = False
+        self.reissue = False
+        self.loaded_user = (initial or {}).get('user_id')
+
+
+# ------------------ Backends ------------------ #
+class SQLiteBackend:
+    def __init__(self, path=SESSION_DB_PATH):
+        self.path = path
+        self._saves = 0
+        conn = sqlite_connect(self.path)
+        conn.execute("""CREATE TABLE IF NOT EXISTS sessions (
+            sid TEXT PRIMARY KEY,
+            user_id TEXT,
+            data TEXT NOT NULL,
+            gen INTEGER NOT NULL,
+            expires_at REAL NOT NULL
+        )""")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions(user_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires_at)")
+        conn.commit()
+        conn.close()
+
+    def load(self, sid):
+        """Return ``(serialized data, gen)`` for a live session, or None."""
+        conn = sqlite_connect(self.path)
+        row = conn.execute("SELECT data, gen FROM sessions WHERE sid = ? AND expires_at > ?",
+                           (sid, time.time())).fetchone()
+        conn.close()
+        return tuple(row) if row else None
+
+    def save(self, sid, user_id, data, expires_at):
+        """Store the session and bump its generation; returns the new generation."""
+        conn = sqlite_connect(self.path)
+        gen, = conn.execute(
+            "INSERT INTO sessions (sid, user_id, data, gen, expires_at) VALUES (?, ?, ?, 1, ?) "
+            "ON CONFLICT(sid) DO UPDATE SET user_id = excluded.user_id, data = excluded.data, "
+            "gen = gen + 1, expires_at = excluded.expires_at RETURNING gen",
+            (sid, user_id, data, expires_at)).fetchone()
+        self._saves += 1
+        if self._saves % PURGE_EVERY == 0:
+            conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),))
+        conn.commit()
+        conn.close()
+        return gen
+
+    def replace_data(self, sid, data, gen):
+        """Replace the data of generation ``gen`` and bump it; False if it was saved since."""
+        conn = sqlite_connect(self.path)
+        cursor = conn.execute("UPDATE sessions SET data = ?, gen = gen + 1 WHERE sid = ? AND gen = ?",
+                              (data, sid, gen))
+        conn.commit()
+        conn.close()
+        return cursor.rowcount == 1
+
+    def delete(self, sid):
+        conn = sqlite_connect(self.path)
+        conn.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+        conn.commit()
+        conn.close()
+
+    def for_user(self, user_id):
+        """``(sid, serialized data, gen, expires_at)`` for every live session of ``user_id``."""
+        conn = sqlite_connect(self.path)
+        rows = conn.execute("SELECT sid, data, gen, expires_at FROM sessions WHERE user_id = ? AND expires_at > ?",
+                            (user_id, time.time())).fetchall()
+        conn.close()
+        return rows
+
+
+class MongoBackend:
+    def __init__(self, db):
+        self.collection = db['sessions']
+        self.collection.create_index('expires_at', expireAfterSeconds=0)
+        self.collection.create_index('user_id')
+
+    def load(self, sid):
+        # The TTL monitor only runs once a minute, so check expiry here as well
+        doc = self.collection.find_one({'_id': sid, 'expires_at': {'$gt': _utc(time.time())}},
+                                       {'data': 1, 'gen': 1})
+        return (doc['data'], doc['gen']) if doc else None
+
+    def save(self, sid, user_id, data, expires_at):
+        doc = self.collection.find_one_and_update({'_id': sid}, {
+            '$set': {'user_id': user_id, 'data': data, 'expires_at': _utc(expires_at)},
+            '$inc': {'gen': 1},
+        }, projection={'gen': 1}, upsert=True, return_document=ReturnDocument.AFTER)
+        return doc['gen']
+
+    def replace_data(self, sid, data, gen):
+        result = self.collection.update_one({'_id': sid, 'gen': gen}, {'$set': {'data': data}, '$inc': {'gen': 1}})
+        return result.modified_count == 1
+
+    def delete(self, sid):
+        self.collection.delete_one({'_id': sid})
+
+    def for_user(self, user_id):
+        docs = self.collection.find({'user_id': user_id, 'expires_at': {'$gt': _utc(time.time())}})
+        return [(d['_id'], d['data'], d['gen'], d['expires_at'].replace(tzinfo=timezone.utc).timestamp()) for d in docs]
+
+
+def _utc(ts):
+    # naive UTC, as pymongo returns it
+    return datetime.fromtimestamp(ts, timezone.utc).replace(tzinfo=None)
+
+
+class SessionLRU:
+    """Thread-safe LRU of ``sid -> (gen, serialized data, cached_at)``.
+
+    Entries are kept serialized so a request mutating nested session values
+    (flash lists, the cached profile) can't leak into another request.
+    """
+
+    def __init__(self, max_entries=CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sid, gen):
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry is None:
+                return None
+            if entry[0] != gen or time.monotonic() - entry[2] > CACHE_TTL:
+                del self._entries[sid]
+                return None
+            self._entries.move_to_end(sid)
+            return entry[1]
+
+    def put(self, sid, gen, data):
+        with self._lock:
+            self._entries[sid] = (gen, data, time.monotonic())
+            self._entries.move_to_end(sid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, sid):
+        with self._lock:
+            self._entries.pop(sid, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# ------------------ Session interface ------------------ #
+class ServerSessionInterface(SessionInterface):
+    salt = 'farming-server-session'
+
+    def __init__(self, backend, cache=None):
+        self.backend = backend
+        self.cache = cache if cache is not None else SessionLRU()
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt=self.salt, key_derivation='hmac')
+
+    def open_session(self, app, request):
+        if not app.secret_key or _sessionless(app, request):
+            return None
+        value = request.cookies.get(self.get_cookie_name(app))
+        if not value:
+            return ServerSession(sid=secrets.token_urlsafe(24), new=True)
+        try:
+            sid, _, gen = self._signer(app).unsign(value).decode('ascii').partition(':')
+            gen = int(gen)
+        except (BadSignature, ValueError):
+            return ServerSession(sid=secrets.token_urlsafe(24), new=True)
+
+        data = self.cache.get(sid, gen)
+        if data is not None:
+            return ServerSession(serializer.loads(data), sid=sid, gen=gen)
+        stored = self.backend.load(sid)
+        if stored is None:
+            return ServerSession(sid=secrets.token_urlsafe(24), new=True)
+        data, stored_gen = stored
+        self.cache.put(sid, stored_gen, data)
+        session = ServerSession(serializer.loads(data), sid=sid, gen=stored_gen)
+        # Changed behind the cookie's back (invalidate_user): hand out the new generation
+        session.reissue = stored_gen != gen
+        return session
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.modified and not session.new:
+                self.backend.delete(session.sid)
+                self.cache.discard(session.sid)
+                response.delete_cookie(name, domain=domain, path=path,
+                                       secure=self.get_cookie_secure(app), samesite=self.get_cookie_samesite(app))
+            return
+
+        if session.modified:
+            response.vary.add('Cookie')
+            user_id = session.get('user_id')
+            if user_id != session.loaded_user and not session.new:
+                # Logged-in user changed: new id, so a pre-login id can't be fixated
+                self.backend.delete(session.sid)
+                self.cache.discard(session.sid)
+                session.sid = secrets.token_urlsafe(24)
+            data = serializer.dumps(dict(session))
+            expires = self.get_expiration_time(app, session)
+            expires_at = expires.timestamp() if expires else time.time() + app.permanent_session_lifetime.total_seconds()
+            session.gen = self.backend.save(session.sid, user_id, data, expires_at)
+            self.cache.put(session.sid, session.gen, data)
+        elif not session.reissue:
+            return
+
+        value = self._signer(app).sign(f"{session.sid}:{session.gen}").decode('ascii')
+        response.set_cookie(name, value, expires=self.get_expiration_time(app, session),
+                            httponly=self.get_cookie_httponly(app), domain=domain, path=path,
+                            secure=self.get_cookie_secure(app), samesite=self.get_cookie_samesite(app))
+
+
+def _sessionless(app, request):
+    """Whether the request is for one of ``SESSIONLESS_ENDPOINTS`` (the URL is not matched yet)."""
+    try:
+        endpoint, _ = app.create_url_adapter(request).match()
+    except HTTPException:
+        return False
+    return endpoint in SESSIONLESS_ENDPOINTS
+
+
+def invalidate_user(app, user_id, keys=('profile',)):
+    """Drop ``keys`` (cached per-user data) from every session of ``user_id``."""
+    interface = app.session_interface
+    if not isinstance(interface, ServerSessionInterface):
+        return 0
+    count = 0
+    for sid, data, gen, _expires_at in interface.backend.for_user(user_id):
+        while True:
+            data = serializer.loads(data)
+            if not any(k in data for k in keys):
+                break
+            for key in keys:
+                data.pop(key, None)
+            if interface.backend.replace_data(sid, serializer.dumps(data), gen):
+                interface.cache.discard(sid)
+                count += 1
+                break
+            # Saved by a request since it was read: start again from the saved version
+            stored = interface.backend.load(sid)
+            if stored is None:
+                break
+            data, gen = stored
+    return count
+
+
+def init_app(app, mongo_db=None, backend=SESSION_BACKEND):
+    """Install the server-side session interface; returns the backend name used."""
+    if backend == 'mongo' and mongo_db is None:
+        print("⚠️ SESSION_BACKEND=mongo but MongoDB is not connected, falling back")
+        backend = 'cookie' if os.environ.get('VERCEL') else 'sqlite'
+    if backend == 'mongo':
+        app.session_interface = ServerSessionInterface(MongoBackend(mongo_db))
+    elif backend == 'sqlite':
+        app.session_interface = ServerSessionInterface(SQLiteBackend())
+    else:
+        app.session_interface = SecureCookieSessionInterface()
+    return backend
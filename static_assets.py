@@ -0,0 +1,230 @@
+"""Fingerprinted, precompressed static assets.
+
+Build step (run at deploy time, see render.yaml / Dockerfile):
+
+    python static_assets.py build
+
+copies ``static/css``, ``static/js`` and ``static/images`` into
+``static/dist`` under content-hashed names, writes ``.br`` (if the ``brotli``
+package is installed) and ``.gz`` siblings for text assets, WebP versions and
+resized WebP variants of images (if Pillow is installed), rewrites
+``url('/static/...')`` references inside CSS, and records everything in
+``static/dist/manifest.json``.
+
+At runtime ``init_app()`` loads the manifest and
+
+* makes ``url_for('static', filename='css/style.css')`` resolve to the hashed
+  file, so templates need no changes;
+* serves ``/static/dist/...`` picking ``br``/``gzip``/WebP from the request's
+  ``Accept-Encoding``/``Accept`` headers with one-year immutable caching;
+* exposes ``static_srcset(filename)`` to templates for responsive images.
+
+Without a manifest (build not run) everything falls back to Flask's default
+static handling.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+import sys
+
+from flask import abort, request, send_file, url_for
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+
+SOURCE_DIRS = ('images', 'css', 'js')  # images first so CSS can reference their hashed names
+TEXT_EXTENSIONS = {'.css', '.js', '.svg', '.json', '.html', '.txt'}
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
+WEBP_WIDTHS = (480, 960)
+WEBP_QUALITY = 80
+ONE_YEAR = 365 * 24 * 3600
+
+_CSS_URL = re.compile(r"""url\((['"]?)/static/([^'")?#]+)\1\)""")
+
+
+# ------------------ Build ------------------ #
+def _encoders():
+    """``(brotli, PIL.Image)``, each None when not installed; imported here so serving never loads them."""
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+    try:
+        from PIL import Image
+    except ImportError:
+        Image = None
+    return brotli, Image
+
+
+def _hashed_name(rel_path, data, suffix=None):
+    stem, ext = os.path.splitext(rel_path)
+    digest = hashlib.sha256(data).hexdigest()[:10]
+    return f"{stem}.{digest}{suffix or ext}"
+
+
+def _write(rel_path, data):
+    path = os.path.join(DIST_DIR, rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def _build_text(rel_path, data, manifest, brotli):
+    if rel_path.endswith('.css'):
+        def rewrite(match):
+            entry = manifest.get(match.group(2))
+            target = f"/static/dist/{entry['file']}" if entry else f"/static/{match.group(2)}"
+            return f"url({match.group(1)}{target}{match.group(1)})"
+        data = _CSS_URL.sub(rewrite, data.decode('utf-8')).encode('utf-8')
+
+    hashed = _hashed_name(rel_path, data)
+    _write(hashed, data)
+    encodings = []
+    if brotli is not None:
+        _write(hashed + '.br', brotli.compress(data, quality=11))
+        encodings.append('br')
+    _write(hashed + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+    encodings.append('gzip')
+    return {'file': hashed, 'encodings': encodings}
+
+
+def _build_image(rel_path, data, Image):
+    hashed = _hashed_name(rel_path, data)
+    _write(hashed, data)
+    entry = {'file': hashed}
+    if Image is None:
+        return entry
+
+    src = os.path.join(STATIC_DIR, rel_path)
+    with Image.open(src) as img:
+        img = img.convert('RGB')
+        stem = os.path.splitext(hashed)[0]
+        entry['webp'] = f"{stem}.webp"
+        img.save(os.path.join(DIST_DIR, entry['webp']), 'WEBP', quality=WEBP_QUALITY, method=6)
+        variants = {}
+        for width in WEBP_WIDTHS:
+            if width >= img.width:
+                continue
+            height = round(img.height * width / img.width)
+            name = f"{stem}.{width}w.webp"
+            img.resize((width, height), Image.LANCZOS).save(
+                os.path.join(DIST_DIR, name), 'WEBP', quality=WEBP_QUALITY, method=6)
+            variants[str(width)] = name
+        variants[str(img.width)] = entry['webp']
+        entry['variants'] = variants
+    return entry
+
+
+def build():
+    """Rebuild ``static/dist`` and its manifest; returns the manifest."""
+    brotli, Image = _encoders()
+    shutil.rmtree(DIST_DIR, ignore_errors=True)
+    os.makedirs(DIST_DIR)
+    manifest = {}
+    for folder in SOURCE_DIRS:
+        root = os.path.join(STATIC_DIR, folder)
+        for dirpath, _, filenames in os.walk(root):
+            for filename in sorted(filenames):
+                rel_path = os.path.relpath(os.path.join(dirpath, filename), STATIC_DIR).replace(os.sep, '/')
+                ext = os.path.splitext(filename)[1].lower()
+                with open(os.path.join(dirpath, filename), 'rb') as f:
+                    data = f.read()
+                if ext in TEXT_EXTENSIONS:
+                    manifest[rel_path] = _build_text(rel_path, data, manifest, brotli)
+                elif ext in IMAGE_EXTENSIONS:
+                    manifest[rel_path] = _build_image(rel_path, data, Image)
+                else:
+                    manifest[rel_path] = {'file': _hashed_name(rel_path, data)}
+                    _write(manifest[rel_path]['file'], data)
+    with open(MANIFEST_PATH, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+# ------------------ Serving ------------------ #
+manifest = {}
+_by_file = {}  # hashed file -> manifest entry
+
+
+def load_manifest():
+    global manifest, _by_file
+    try:
+        with open(MANIFEST_PATH) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    _by_file = {entry['file']: entry for entry in manifest.values()}
+    return manifest
+
+
+def serve_dist(filename):
+    path = os.path.normpath(os.path.join(DIST_DIR, filename))
+    if not path.startswith(DIST_DIR + os.sep) or not os.path.isfile(path):
+        abort(404)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    entry = _by_file.get(filename, {})
+    vary = []
+    encoding = None
+
+    if entry.get('encodings'):
+        vary.append('Accept-Encoding')
+        for enc, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if enc in entry['encodings'] and request.accept_encodings[enc]:
+                path, encoding = path + suffix, enc
+                break
+    elif entry.get('webp'):
+        vary.append('Accept')
+        # explicit only: browsers without WebP still send */*
+        if 'image/webp' in request.accept_mimetypes.values():
+            path, mimetype = os.path.join(DIST_DIR, entry['webp']), 'image/webp'
+
+    response = send_file(path, mimetype=mimetype, max_age=ONE_YEAR, conditional=True)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if vary:
+        response.vary.update(vary)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def _fingerprint_static(endpoint, values):
+    if endpoint == 'static':
+        entry = manifest.get(values.get('filename'))
+        if entry is not None:
+            values['filename'] = f"dist/{entry['file']}"
+
+
+def static_srcset(filename):
+    """``srcset`` value listing the WebP variants of ``filename`` ('' if none)."""
+    entry = manifest.get(filename)
+    if not entry or not entry.get('variants'):
+        return ''
+    return ', '.join(f"{url_for('static', filename='dist/' + name)} {width}w"
+                     for width, name in sorted(entry['variants'].items(), key=lambda kv: int(kv[0])))
+
+
+def init_app(app):
+    load_manifest()
+    app.add_url_rule('/static/dist/<path:filename>', 'static_dist', serve_dist)
+    app.url_defaults(_fingerprint_static)
+    app.jinja_env.globals['static_srcset'] = static_srcset
+    if manifest:
+        print(f"Serving {len(manifest)} fingerprinted static assets")
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] != ['build']:
+        print("Usage: python static_assets.py build")
+        sys.exit(2)
+    built = build()
+    brotli, Image = _encoders()
+    total = sum(os.path.getsize(os.path.join(dp, f)) for dp, _, fs in os.walk(DIST_DIR) for f in fs)
+    print(f"Built {len(built)} assets into {DIST_DIR} ({total / 1024:.0f} KiB incl. variants)"
+          f"{'' if brotli else ' - brotli not installed, .br skipped'}"
+          f"{'' if Image else ' - Pillow not installed, WebP skipped'}")
@@ -0,0 +1,494 @@
+"""Storage for crop progress entries and saved dashboard fertilizers.
+
+``STORAGE_BACKEND`` selects where they live:
+
+* ``sqlite`` (default outside Vercel): ``progress.db`` and
+  ``dashboard_fertilizers.db`` next to app.py (``PROGRESS_DB_PATH`` /
+  ``FERTILIZER_DB_PATH``). One copy per machine, so only for single-node
+  deployments.
+* ``mongo`` (default on Vercel, used on Render): the ``crop_progress`` and
+  ``dashboard_fertilizers`` collections, shared by every node. Documents are
+  keyed by ``(user_id, id)``; every query is per user, so both collections can
+  be sharded on that key (``python storage.py shard``). Ids are generated
+  without a shared counter (millisecond timestamp and random bits, so newer
+  entries sort higher and ids stay below 2**53 for JavaScript). Entries
+  copied from SQLite keep their ids, which are lower than any new one.
+
+Both backends also keep a per-user version (``user_version()``), bumped by
+``bump_user_version()`` on every write to what the dashboard shows;
+template_cache keys the user's cached fragments by it.
+
+Both backends return plain dicts with the SQLite column names; ``task_timeline``
+is always a decoded list. Lists are per user, newest first, and keyset
+paginated (``before_id``, ``limit``); SQLite serves them from
+``(user_id, id DESC)`` indexes, created by ``ensure_schema()`` on existing
+files too. With neither available (Vercel without Mongo)
+``get()`` is None and the features are switched off.
+
+    python storage.py copy-to-mongo [--mongo-uri URI]   # SQLite files -> Mongo, in batches
+    python storage.py shard [--mongo-uri URI]           # shard both collections on (user_id, id)
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from metrics import sqlite_connect
+
+_DEFAULT_BACKEND = 'mongo' if os.environ.get('VERCEL') else 'sqlite'
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND') or _DEFAULT_BACKEND
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+PROGRESS_DB_PATH = os.getenv('PROGRESS_DB_PATH') or os.path.join(_ROOT, 'progress.db')
+FERTILIZER_DB_PATH = os.getenv('FERTILIZER_DB_PATH') or os.path.join(_ROOT, 'dashboard_fertilizers.db')
+BATCH_SIZE = 1000
+DUPLICATE_KEY = 11000
+
+PROGRESS = 'crop_progress'
+FERTILIZERS = 'dashboard_fertilizers'
+USER_VERSIONS = 'user_versions'
+PROGRESS_COLUMNS = ('id', 'user_id', 'crop_name', 'start_date', 'harvest_date', 'task_timeline', 'status',
+                    'recommendation')
+FERTILIZER_COLUMNS = ('id', 'fertilizer_name', 'cost', 'yield_increase', 'application_time', 'date_added',
+                      'status', 'selected_for', 'suitability', 'user_id')
+
+NO_CURSOR = 2 ** 63 - 1
+NO_LIMIT = -1
+
+_store = None
+
+
+def progress_from_row(row):
+    """Progress dict from a crop_progress row (``task_timeline`` decoded)."""
+    entry = dict(zip(PROGRESS_COLUMNS, row)) if isinstance(row, tuple) else dict(row)
+    try:
+        entry['task_timeline'] = json.loads(entry.get('task_timeline') or '[]')
+    except (TypeError, ValueError):
+        entry['task_timeline'] = []
+    return entry
+
+
+# ------------------ SQLite ------------------ #
+INSERT_PROGRESS_SQL = """
+    INSERT INTO crop_progress (user_id, crop_name, start_date, harvest_date, task_timeline, status, recommendation)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+# Lists are keyset-paginated: (user_id, before_id, limit); NO_CURSOR / NO_LIMIT for everything.
+LIST_PROGRESS_SQL = f"""
+    SELECT {', '.join(PROGRESS_COLUMNS)} FROM crop_progress
+    WHERE user_id = ? AND id < ?
+    ORDER BY id DESC
+    LIMIT ?
+"""
+GET_PROGRESS_SQL = f"SELECT {', '.join(PROGRESS_COLUMNS)} FROM crop_progress WHERE user_id = ? AND id = ?"
+UPDATE_PROGRESS_SQL = "UPDATE crop_progress SET task_timeline = ?, status = ? WHERE id = ? AND user_id = ?"
+DELETE_PROGRESS_SQL = "DELETE FROM crop_progress WHERE id = ? AND user_id = ?"
+INSERT_FERTILIZER_SQL = """
+    INSERT INTO dashboard_fertilizers
+    (fertilizer_name, cost, yield_increase, application_time, date_added, status, selected_for, suitability, user_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+LIST_FERTILIZERS_SQL = f"""
+    SELECT {', '.join(FERTILIZER_COLUMNS)} FROM dashboard_fertilizers
+    WHERE user_id = ? AND id < ?
+    ORDER BY id DESC
+    LIMIT ?
+"""
+DELETE_FERTILIZER_SQL = "DELETE FROM dashboard_fertilizers WHERE id = ? AND user_id = ?"
+USER_VERSION_SQL = "SELECT version FROM user_versions WHERE user_id = ?"
+BUMP_USER_VERSION_SQL = """
+    INSERT INTO user_versions (user_id, version) VALUES (?, 1)
+    ON CONFLICT (user_id) DO UPDATE SET version = version + 1
+"""
+
+
+def list_params(user_id, before_id=None, limit=None):
+    """LIST_*_SQL parameters: entries older than ``before_id``, at most ``limit``."""
+    return (user_id, NO_CURSOR if before_id is None else before_id, NO_LIMIT if limit is None else limit)
+
+
+def progress_params(record):
+    """INSERT_PROGRESS_SQL parameters for a progress record."""
+    return (record['user_id'], record['crop_name'], record['start_date'], record['harvest_date'],
+            json.dumps(record.get('task_timeline') or [], default=str), record.get('status'),
+            record.get('recommendation'))
+
+
+def fertilizer_params(record):
+    """INSERT_FERTILIZER_SQL parameters for a fertilizer record."""
+    return (record['fertilizer_name'], record['cost'], record['yield_increase'], record['application_time'],
+            record['date_added'], record['status'], record['selected_for'], record['suitability'], record['user_id'])
+
+
+class SQLiteStorage:
+    def __init__(self, progress_path=PROGRESS_DB_PATH, fertilizer_path=FERTILIZER_DB_PATH):
+        self.progress_path = progress_path
+        self.fertilizer_path = fertilizer_path
+        self._local = threading.local()
+
+    def ensure_schema(self):
+        conn = sqlite_connect(self.progress_path)
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS crop_progress (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id TEXT,
+                    crop_name TEXT,
+                    start_date TEXT,
+                    harvest_date TEXT,
+                    task_timeline TEXT,
+                    status TEXT,
+                    recommendation TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_crop_progress_user_id ON crop_progress (user_id, id DESC)")
+            conn.commit()
+        finally:
+            conn.close()
+
+        conn = sqlite_connect(self.fertilizer_path)
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS dashboard_fertilizers (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    fertilizer_name TEXT,
+                    cost REAL,
+                    yield_increase TEXT,
+                    application_time TEXT,
+                    date_added TEXT,
+                    status TEXT DEFAULT 'Purchased',
+                    selected_for TEXT,
+                    suitability REAL,
+                    user_id TEXT
+                )
+            """)
+            # Older files may predate these columns
+            existing_cols = {row[1] for row in conn.execute("PRAGMA table_info('dashboard_fertilizers')")}
+            for column, kind in (('selected_for', 'TEXT'), ('suitability', 'REAL'), ('user_id', 'TEXT')):
+                if column not in existing_cols:
+                    conn.execute(f"ALTER TABLE dashboard_fertilizers ADD COLUMN {column} {kind}")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_dashboard_fertilizers_user_id "
+                         "ON dashboard_fertilizers (user_id, id DESC)")
+            conn.execute("CREATE TABLE IF NOT EXISTS user_versions (user_id TEXT PRIMARY KEY, version INTEGER NOT NULL) "
+                         "WITHOUT ROWID")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connection(self, path):
+        # One connection per thread and file, so sqlite3's statement cache keeps
+        # the statements above prepared between requests.
+        conns = self._local.__dict__.setdefault('conns', {})
+        conn = conns.get(path)
+        if conn is None:
+            conn = conns[path] = sqlite_connect(path, timeout=5)
+        return conn
+
+    def _execute(self, path, sql, params=(), fetch=False):
+        conn = self._connection(path)
+        try:
+            cur = conn.execute(sql, params)
+            rows = cur.fetchall() if fetch else None
+            conn.commit()
+            return cur, rows
+        except Exception:
+            conn.rollback()
+            raise
+
+    # Progress
+    def add_progress(self, record):
+        cur, _ = self._execute(self.progress_path, INSERT_PROGRESS_SQL, progress_params(record))
+        return cur.lastrowid
+
+    def add_progress_many(self, records):
+        conn = sqlite_connect(self.progress_path)
+        try:
+            conn.executemany(INSERT_PROGRESS_SQL, [progress_params(r) for r in records])
+            conn.commit()
+        finally:
+            conn.close()
+
+    def list_progress(self, user_id, before_id=None, limit=None):
+        _, rows = self._execute(self.progress_path, LIST_PROGRESS_SQL, list_params(user_id, before_id, limit),
+                                fetch=True)
+        return [progress_from_row(r) for r in rows]
+
+    def get_progress(self, user_id, progress_id):
+        _, rows = self._execute(self.progress_path, GET_PROGRESS_SQL, (user_id, progress_id), fetch=True)
+        return progress_from_row(rows[0]) if rows else None
+
+    def update_progress(self, user_id, progress_id, task_timeline, status):
+        cur, _ = self._execute(self.progress_path, UPDATE_PROGRESS_SQL,
+                               (json.dumps(task_timeline, default=str), status, progress_id, user_id))
+        return cur.rowcount > 0
+
+    def delete_progress(self, user_id, progress_id):
+        cur, _ = self._execute(self.progress_path, DELETE_PROGRESS_SQL, (progress_id, user_id))
+        return cur.rowcount > 0
+
+    # Dashboard fertilizers
+    def add_fertilizer(self, record):
+        cur, _ = self._execute(self.fertilizer_path, INSERT_FERTILIZER_SQL, fertilizer_params(record))
+        return cur.lastrowid
+
+    def add_fertilizers_many(self, records):
+        conn = sqlite_connect(self.fertilizer_path)
+        try:
+            conn.executemany(INSERT_FERTILIZER_SQL, [fertilizer_params(r) for r in records])
+            conn.commit()
+        finally:
+            conn.close()
+
+    def list_fertilizers(self, user_id, before_id=None, limit=None):
+        _, rows = self._execute(self.fertilizer_path, LIST_FERTILIZERS_SQL, list_params(user_id, before_id, limit),
+                                fetch=True)
+        return [dict(zip(FERTILIZER_COLUMNS, r)) for r in rows]
+
+    def delete_fertilizer(self, user_id, fertilizer_id):
+        cur, _ = self._execute(self.fertilizer_path, DELETE_FERTILIZER_SQL, (fertilizer_id, user_id))
+        return cur.rowcount > 0
+
+    # Per-user version, for keying cached dashboard fragments
+    def user_version(self, user_id):
+        _, rows = self._execute(self.fertilizer_path, USER_VERSION_SQL, (user_id,), fetch=True)
+        return version_from_rows(rows)
+
+    def bump_user_version(self, user_id):
+        self._execute(self.fertilizer_path, BUMP_USER_VERSION_SQL, (user_id,))
+
+    def query_plans(self):
+        """EXPLAIN QUERY PLAN details for the per-user statements, keyed by name."""
+        statements = {
+            'list_progress': (self.progress_path, LIST_PROGRESS_SQL, ('u', NO_CURSOR, 10)),
+            'get_progress': (self.progress_path, GET_PROGRESS_SQL, ('u', 1)),
+            'delete_progress': (self.progress_path, DELETE_PROGRESS_SQL, (1, 'u')),
+            'list_fertilizers': (self.fertilizer_path, LIST_FERTILIZERS_SQL, ('u', NO_CURSOR, 10)),
+            'delete_fertilizer': (self.fertilizer_path, DELETE_FERTILIZER_SQL, (1, 'u')),
+            'user_version': (self.fertilizer_path, USER_VERSION_SQL, ('u',)),
+        }
+        plans = {}
+        for name, (path, sql, params) in statements.items():
+            conn = sqlite_connect(path)
+            plans[name] = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+            conn.close()
+        return plans
+
+    def dump(self):
+        """Every progress entry and fertilizer, for copy-to-mongo."""
+        conn = sqlite_connect(self.progress_path)
+        progress = [progress_from_row(r) for r in conn.execute(
+            f"SELECT {', '.join(PROGRESS_COLUMNS)} FROM crop_progress ORDER BY id")]
+        conn.close()
+        conn = sqlite_connect(self.fertilizer_path)
+        fertilizers = [dict(zip(FERTILIZER_COLUMNS, r)) for r in conn.execute(
+            f"SELECT {', '.join(FERTILIZER_COLUMNS)} FROM dashboard_fertilizers ORDER BY id")]
+        conn.close()
+        return progress, fertilizers
+
+
+# ------------------ Mongo ------------------ #
+ID_EPOCH = 1735689600  # 2025-01-01 UTC
+_last_id = 0
+_id_lock = threading.Lock()
+
+
+def new_id():
+    """Coordination-free id: milliseconds since ID_EPOCH << 12 | 12 random bits
+    (strictly increasing within a process; below 2**53 until the 2090s)."""
+    global _last_id
+    millis = int((time.time() - ID_EPOCH) * 1000)
+    with _id_lock:
+        _last_id = max((millis << 12) | random.getrandbits(12), _last_id + 1)
+        return _last_id
+
+
+# Queries shared with asgi.py, which runs them through Motor: the cursor and
+# argument builders below work on a pymongo or a Motor collection alike.
+def list_cursor(collection, user_id, before_id=None, limit=None):
+    """Cursor over one page of a per-user collection, newest first."""
+    query = {'user_id': user_id}
+    if before_id is not None:
+        query['id'] = {'$lt': before_id}
+    return collection.find(query, {'_id': 0}).sort('id', DESCENDING).limit(limit or 0)
+
+
+def user_version_query(user_id):
+    return {'_id': user_id}
+
+
+BUMP_USER_VERSION = {'$inc': {'version': 1}}
+
+
+def version_from_doc(doc):
+    return doc['version'] if doc else 0
+
+
+def version_from_rows(rows):
+    """The version from USER_VERSION_SQL's rows."""
+    return rows[0][0] if rows else 0
+
+
+def _doc_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None  # matches nothing, like an unknown SQLite id
+
+
+class MongoStorage:
+    def __init__(self, db):
+        self.progress = db[PROGRESS]
+        self.fertilizers = db[FERTILIZERS]
+        self.user_versions = db[USER_VERSIONS]  # keyed by _id = user_id
+
+    def ensure_schema(self):
+        # Serves the (user_id, id) lookups and the per-user newest-first lists;
+        # also the shard key.
+        for collection in (self.progress, self.fertilizers):
+            collection.create_index([('user_id', ASCENDING), ('id', ASCENDING)], unique=True)
+
+    def _insert(self, collection, doc):
+        for _ in range(3):
+            doc['id'] = new_id()
+            try:
+                collection.insert_one(dict(doc))
+                return doc['id']
+            except DuplicateKeyError:
+                continue
+        raise DuplicateKeyError('could not allocate an id')
+
+    def _insert_many(self, collection, docs, batch_size=BATCH_SIZE):
+        """Unordered batched inserts; docs without an id get one. Returns the count written.
+
+        Documents whose (user_id, id) is already stored are skipped; any other
+        write error is re-raised.
+        """
+        written = 0
+        for start in range(0, len(docs), batch_size):
+            batch = [dict(d, id=d.get('id') or new_id()) for d in docs[start:start + batch_size]]
+            try:
+                written += len(collection.insert_many(batch, ordered=False).inserted_ids)
+            except BulkWriteError as e:
+                # Duplicates (e.g. a re-run copy) are skipped; anything else stops the copy
+                written += e.details.get('nInserted', 0)
+                errors = [err for err in e.details.get('writeErrors', []) if err.get('code') != DUPLICATE_KEY]
+                if errors or e.details.get('writeConcernErrors'):
+                    print(f"❌ {collection.name}: {written} written before "
+                          f"{(errors or e.details['writeConcernErrors'])[0].get('errmsg')}")
+                    raise
+        return written
+
+    def _list(self, collection, user_id, before_id, limit):
+        return list(list_cursor(collection, user_id, before_id, limit))
+
+    # Progress
+    def add_progress(self, record):
+        doc = {c: record.get(c) for c in PROGRESS_COLUMNS if c != 'id'}
+        doc['task_timeline'] = json.loads(json.dumps(doc['task_timeline'] or [], default=str))
+        return self._insert(self.progress, doc)
+
+    def add_progress_many(self, records):
+        return self._insert_many(self.progress, [{c: r.get(c) for c in PROGRESS_COLUMNS} for r in records])
+
+    def list_progress(self, user_id, before_id=None, limit=None):
+        return self._list(self.progress, user_id, before_id, limit)
+
+    def get_progress(self, user_id, progress_id):
+        return self.progress.find_one({'user_id': user_id, 'id': _doc_id(progress_id)}, {'_id': 0})
+
+    def update_progress(self, user_id, progress_id, task_timeline, status):
+        result = self.progress.update_one({'user_id': user_id, 'id': _doc_id(progress_id)},
+                                          {'$set': {'task_timeline': task_timeline, 'status': status}})
+        return result.matched_count > 0
+
+    def delete_progress(self, user_id, progress_id):
+        return self.progress.delete_one({'user_id': user_id, 'id': _doc_id(progress_id)}).deleted_count > 0
+
+    # Dashboard fertilizers
+    def add_fertilizer(self, record):
+        return self._insert(self.fertilizers, {c: record.get(c) for c in FERTILIZER_COLUMNS if c != 'id'})
+
+    def add_fertilizers_many(self, records):
+        return self._insert_many(self.fertilizers, [{c: r.get(c) for c in FERTILIZER_COLUMNS} for r in records])
+
+    def list_fertilizers(self, user_id, before_id=None, limit=None):
+        return self._list(self.fertilizers, user_id, before_id, limit)
+
+    def delete_fertilizer(self, user_id, fertilizer_id):
+        return self.fertilizers.delete_one({'user_id': user_id, 'id': _doc_id(fertilizer_id)}).deleted_count > 0
+
+    # Per-user version, for keying cached dashboard fragments
+    def user_version(self, user_id):
+        return version_from_doc(self.user_versions.find_one(user_version_query(user_id)))
+
+    def bump_user_version(self, user_id):
+        self.user_versions.update_one(user_version_query(user_id), BUMP_USER_VERSION, upsert=True)
+
+
+def shard(client, db_name):
+    """Shard both collections on (user_id, id); needs a mongos."""
+    client.admin.command('enableSharding', db_name)
+    for name in (PROGRESS, FERTILIZERS):
+        client.admin.command('shardCollection', f"{db_name}.{name}", key={'user_id': 1, 'id': 1})
+
+
+# ------------------ Setup ------------------ #
+def init(mongo_db=None, backend=STORAGE_BACKEND, **sqlite_paths):
+    """Create the configured store and its schema; returns it (None if unavailable)."""
+    global _store
+    if backend == 'mongo' and mongo_db is None:
+        print("❌ STORAGE_BACKEND=mongo but MongoDB is not connected")
+        backend = None if os.environ.get('VERCEL') else 'sqlite'
+    if backend == 'sqlite' and os.environ.get('VERCEL'):
+        backend = None  # read-only filesystem
+    store = None
+    try:
+        if backend == 'mongo':
+            store = MongoStorage(mongo_db)
+        elif backend == 'sqlite':
+            store = SQLiteStorage(**sqlite_paths)
+        if store is not None:
+            store.ensure_schema()
+    except Exception as e:
+        print(f"❌ Storage init error: {e}")
+        store = None
+    _store = store
+    return store
+
+
+def get():
+    return _store
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Progress / dashboard fertilizer storage tools')
+    parser.add_argument('command', choices=['copy-to-mongo', 'shard'])
+    parser.add_argument('--mongo-uri', default=None, help='defaults to the app configuration')
+    args = parser.parse_args()
+
+    from pymongo import MongoClient
+    if args.mongo_uri:
+        uri = args.mongo_uri
+    else:
+        from app import get_mongo_uri  # loads .env
+        uri = get_mongo_uri()
+    if not uri:
+        parser.error('no MongoDB configured; pass --mongo-uri')
+    client = MongoClient(uri)
+    mongo_db = client[os.getenv('MONGO_DB', 'farmerdb')]
+
+    if args.command == 'shard':
+        shard(client, mongo_db.name)
+        print(f"Sharded {mongo_db.name}.{PROGRESS} and {mongo_db.name}.{FERTILIZERS} on (user_id, id)")
+    else:
+        source = SQLiteStorage()
+        target = init(mongo_db, 'mongo')
+        progress, fertilizers = source.dump()
+        start = time.perf_counter()
+        copied = (target.add_progress_many(progress), target.add_fertilizers_many(fertilizers))
+        print(f"Copied {copied[0]}/{len(progress)} progress entries and {copied[1]}/{len(fertilizers)} "
+              f"fertilizers in {time.perf_counter() - start:.2f}s")
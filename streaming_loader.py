@@ -0,0 +1,140 @@
+"""Chunked, bounded-memory loaders for large crop and fertilizer datasets.
+
+``CropDataset`` only needs per-crop feature means and global input ranges,
+and ``FertilizerDataset`` only needs a handful of numeric columns plus the
+crop and fertilizer labels to search for similar rows and train its model.
+These loaders read the CSV in ``DATASET_CHUNK_ROWS`` chunks, parse only those
+columns with compact dtypes (float32, categorical labels) and fold each chunk
+into running sums / a per-crop reservoir sample, so memory stays bounded
+however many rows the file has.
+
+Selected with ``DATASET_LOADER=streaming``; ``CROP_DATASET_PATH`` and
+``FERTILIZER_DATASET_PATH`` point the datasets at other (e.g. state-level)
+files.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+DATASET_LOADER = os.getenv('DATASET_LOADER', 'pandas')
+CHUNK_ROWS = int(os.getenv('DATASET_CHUNK_ROWS', '200000'))
+# Rows kept per crop for the fertilizer neighbour search and model; files with
+# fewer rows per crop are kept whole, larger ones are sampled uniformly.
+SAMPLE_PER_CROP = int(os.getenv('DATASET_SAMPLE_PER_CROP', '50000'))
+
+CROP_FEATURES = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
+FERTILIZER_FEATURES = ['Temperature', 'Moisture', 'Nitrogen', 'Phosphorous', 'Potassium', 'PH']
+FERTILIZER_LABELS = ['Crop', 'Fertilizer']
+
+
+def _read_chunks(path, columns, chunksize):
+    dtype = {c: 'category' if c in ('label', 'Crop', 'Fertilizer') else 'float32' for c in columns}
+    # Headers in the fertilizer file may carry stray spaces
+    wanted = {c.strip(): c for c in pd.read_csv(path, nrows=0).columns}
+    missing = [c for c in columns if c not in wanted]
+    if missing:
+        raise ValueError(f"{os.path.basename(path)} is missing columns: {', '.join(missing)}")
+    usecols = [wanted[c] for c in columns]
+    for chunk in pd.read_csv(path, usecols=usecols, chunksize=chunksize,
+                             dtype={wanted[c]: t for c, t in dtype.items()}):
+        chunk.columns = chunk.columns.str.strip()
+        yield chunk
+
+
+def crop_statistics(path, chunksize=CHUNK_ROWS):
+    """Per-crop feature means and global min/mean/max, in one streaming pass.
+
+    Returns ``(means, ranges, rows)`` where ``means`` maps crop label (in order
+    of first appearance) to ``{feature: mean}`` and ``ranges`` maps feature to
+    ``{'min', 'max', 'mean'}``.
+    """
+    sums, counts = {}, {}
+    total = np.zeros(len(CROP_FEATURES))
+    lo = np.full(len(CROP_FEATURES), np.inf)
+    hi = np.full(len(CROP_FEATURES), -np.inf)
+    rows = 0
+    for chunk in _read_chunks(path, CROP_FEATURES + ['label'], chunksize):
+        values = chunk[CROP_FEATURES].to_numpy(dtype=np.float64)
+        codes, labels = pd.factorize(chunk['label'], sort=False)
+        labelled = codes >= 0
+        codes, labelled_values = codes[labelled], values[labelled]
+        per_label = np.column_stack([np.bincount(codes, weights=labelled_values[:, j], minlength=len(labels))
+                                     for j in range(len(CROP_FEATURES))])
+        label_counts = np.bincount(codes, minlength=len(labels))
+        for i, label in enumerate(labels):
+            if label in sums:
+                sums[label] += per_label[i]
+                counts[label] += label_counts[i]
+            else:
+                sums[label], counts[label] = per_label[i], label_counts[i]
+        total += values.sum(axis=0)
+        lo = np.minimum(lo, values.min(axis=0))
+        hi = np.maximum(hi, values.max(axis=0))
+        rows += len(chunk)
+
+    means = {label: dict(zip(CROP_FEATURES, (sums[label] / counts[label]).tolist())) for label in sums}
+    ranges = {f: {'min': float(lo[i]), 'max': float(hi[i]), 'mean': float(total[i] / rows)}
+              for i, f in enumerate(CROP_FEATURES)} if rows else {}
+    return means, ranges, rows
+
+
+class _Reservoir:
+    """Uniform sample of at most ``capacity`` rows (Algorithm R, chunk at a time)."""
+
+    def __init__(self, capacity, width, rng):
+        self.capacity = capacity
+        self.values = np.empty((0, width), dtype=np.float32)
+        self.labels = np.empty(0, dtype=object)
+        self.seen = 0
+        self.rng = rng
+
+    def add(self, values, labels):
+        n = len(values)
+        free = self.capacity - len(self.values)
+        if free > 0:
+            take = min(free, n)
+            self.values = np.concatenate([self.values, values[:take]])
+            self.labels = np.concatenate([self.labels, labels[:take]])
+            values, labels = values[take:], labels[take:]
+            self.seen += take
+            n -= take
+        if n:
+            # row j of this batch is the (seen + j + 1)-th row overall
+            slots = (self.rng.random(n) * (self.seen + np.arange(1, n + 1))).astype(np.int64)
+            keep = slots < self.capacity
+            self.values[slots[keep]] = values[keep]
+            self.labels[slots[keep]] = labels[keep]
+            self.seen += n
+
+
+def fertilizer_sample(path, per_crop=SAMPLE_PER_CROP, chunksize=CHUNK_ROWS, seed=42):
+    """Compact DataFrame of the columns FertilizerDataset uses, at most
+    ``per_crop`` rows per crop. Returns ``(df, rows_read)``."""
+    rng = np.random.default_rng(seed)
+    reservoirs = {}
+    rows = 0
+    for chunk in _read_chunks(path, FERTILIZER_FEATURES + FERTILIZER_LABELS, chunksize):
+        values = chunk[FERTILIZER_FEATURES].to_numpy(dtype=np.float32)
+        fertilizers = chunk['Fertilizer'].to_numpy(dtype=object)
+        for crop, idx in chunk.groupby('Crop', sort=False, observed=True).indices.items():
+            reservoir = reservoirs.get(crop)
+            if reservoir is None:
+                reservoir = reservoirs[crop] = _Reservoir(per_crop, len(FERTILIZER_FEATURES), rng)
+            reservoir.add(values[idx], fertilizers[idx])
+        rows += len(chunk)
+
+    if not reservoirs:
+        return pd.DataFrame(columns=FERTILIZER_FEATURES + FERTILIZER_LABELS), rows
+    frames = []
+    for crop, r in reservoirs.items():
+        frame = pd.DataFrame(r.values, columns=FERTILIZER_FEATURES)
+        frame['Crop'] = crop
+        frame['Fertilizer'] = r.labels
+        frames.append(frame)
+    df = pd.concat(frames, ignore_index=True)
+    df['Crop'] = df['Crop'].astype('category')
+    # Kept as object (value_counts on a categorical would list unseen labels too),
+    # but going through a categorical makes every row share one string per label.
+    df['Fertilizer'] = df['Fertilizer'].astype('category').astype(object)
+    return df, rows
@@ -0,0 +1,119 @@
+"""Compiled-template cache on disk and pre-rendered dashboard fragments.
+
+Every worker compiles each template on first use. With the bytecode cache
+(``JINJA_CACHE_DIR``; ``.jinja_cache`` next to app.py, or under /tmp on
+Vercel) compiled templates are written once and loaded by later workers.
+``python template_cache.py compile`` fills it at build time.
+
+The dashboard's per-user sections (saved fertilizers, saved crops) live in
+``templates/fragments/`` and are cached rendered, keyed by
+``(fragment, user_id, version)``. ``version`` is the user's counter in
+``storage``; the routes that change a user's fertilizers or crops call
+``invalidate()``, which bumps it, so the next visit re-renders on every
+node. A hit costs one primary-key read of the version instead of the
+fragment's database read and render. Without storage nothing is cached.
+``FRAGMENT_CACHE_TTL`` (seconds; 0 disables the cache) and
+``FRAGMENT_CACHE_SIZE`` bound how long and how many fragments are kept.
+"""
+import os
+import sys
+import tempfile
+
+from flask import render_template
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
+
+import metrics
+import storage
+from ttl_cache import TTLCache
+
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+JINJA_CACHE_DIR = os.getenv('JINJA_CACHE_DIR') or (
+    os.path.join(tempfile.gettempdir(), 'farming-jinja') if os.environ.get('VERCEL')
+    else os.path.join(_ROOT, '.jinja_cache'))
+FRAGMENT_CACHE_TTL = float(os.getenv('FRAGMENT_CACHE_TTL', '60'))
+FRAGMENT_CACHE_SIZE = int(os.getenv('FRAGMENT_CACHE_SIZE', '4096'))
+
+FRAGMENTS = {
+    'fertilizers': 'fragments/dashboard_fertilizers.html',
+    'crops': 'fragments/dashboard_crops.html',
+}
+
+_cache = TTLCache(FRAGMENT_CACHE_TTL, FRAGMENT_CACHE_SIZE)
+
+
+def version(scope):
+    """Current version of ``scope`` (a user id) from storage; None if it cannot be read (nothing is cached)."""
+    store = storage.get()
+    if store is None or FRAGMENT_CACHE_TTL <= 0:
+        return None
+    try:
+        return store.user_version(scope)
+    except Exception as e:
+        print(f"⚠️ Fragment version read failed: {e}")
+        return None
+
+
+def get(name, scope, version):
+    """Cached HTML of fragment ``name`` for ``scope`` at ``version`` (from ``version()``), or None."""
+    if version is None:
+        return None
+    hit, html = _cache.get((name, scope, version))
+    metrics.inc('farming_fragment_cache_total', (('fragment', name), ('result', 'hit' if hit else 'miss')))
+    return html
+
+
+def render(name, scope, version, context, cache=True):
+    """Render fragment ``name`` for ``scope`` with ``context`` and (unless ``cache`` is false) cache it.
+
+    ``version`` must be read before the fragment's data, so a write racing
+    the render leaves it cached under the version that write replaced.
+    """
+    html = Markup(render_template(FRAGMENTS[name], **context))
+    if cache and version is not None:
+        _cache.put((name, scope, version), html)
+    return html
+
+
+def invalidate(scope):
+    """Bump ``scope``'s version after a write, so no node serves its cached fragments again."""
+    store = storage.get()
+    if store is None:
+        return
+    try:
+        store.bump_user_version(scope)
+    except Exception as e:
+        print(f"⚠️ Fragment version bump failed: {e}")
+
+
+def _bytecode_cache():
+    try:
+        os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+        return FileSystemBytecodeCache(JINJA_CACHE_DIR)
+    except OSError as e:
+        print(f"⚠️ Jinja bytecode cache disabled: {e}")
+        return None
+
+
+def compile_all(env):
+    """Compile every template into ``env``'s bytecode cache; returns how many."""
+    names = env.list_templates(extensions=['html'])
+    for name in names:
+        env.get_template(name)
+    return len(names)
+
+
+def init_app(app):
+    app.jinja_env.bytecode_cache = _bytecode_cache()
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] != ['compile']:
+        print("Usage: python template_cache.py compile")
+        sys.exit(2)
+    from flask import Flask
+    # Compiled code does not depend on the app's globals or filters, so a bare
+    # app with the same templates writes the same cache entries.
+    app = Flask('app', root_path=_ROOT)
+    init_app(app)
+    print(f"Compiled {compile_all(app.jinja_env)} templates into {JINJA_CACHE_DIR}")
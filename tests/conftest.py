@@ -0,0 +1,42 @@
+import hashlib
+import os
+
+import pytest
+
+from benchmarks.harness import ROOT, boot_app, isolate, seed_users
+
+# Before the test modules import anything: storage and session_store read their paths on import
+DATA_DIR = isolate()
+
+PASSWORD = 'testpass'
+TRACKED_FILES = ('progress.db', 'dashboard_fertilizers.db')
+
+
+def _digest(name):
+    with open(os.path.join(ROOT, name), 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+@pytest.fixture(scope='session', autouse=True)
+def tracked_files_unchanged():
+    """The checked-in databases are never written by the suite."""
+    before = {name: _digest(name) for name in TRACKED_FILES}
+    yield
+    assert {name: _digest(name) for name in TRACKED_FILES} == before
+
+
+@pytest.fixture(scope='session')
+def app_module():
+    """``app`` on mongomock and temp SQLite files, with one seeded user."""
+    app_module, _ = boot_app(data_dir=DATA_DIR)
+    app_module.app.config['TESTING'] = True
+    seed_users(app_module, 1, PASSWORD, rounds=4)
+    return app_module
+
+
+@pytest.fixture
+def client(app_module):
+    """A test client logged in as the seeded user."""
+    client = app_module.app.test_client()
+    client.post('/login', data={'email': 'farmer0@bench.local', 'password': PASSWORD})
+    return client
@@ -0,0 +1,34 @@
+import storage
+
+
+def add_fertilizer(user_id, name):
+    storage.get().add_fertilizer({'fertilizer_name': name, 'cost': 500, 'yield_increase': '12',
+                                  'application_time': 'Morning', 'date_added': '2025-06-01T00:00:00',
+                                  'status': 'Purchased', 'selected_for': 'Rice', 'suitability': 80,
+                                  'user_id': user_id})
+
+
+def user_id(app_module):
+    return str(app_module.users_collection.find_one({'email': 'farmer0@bench.local'})['_id'])
+
+
+def test_write_on_another_node_re_renders(app_module, client):
+    uid = user_id(app_module)
+    add_fertilizer(uid, 'Urea')
+    storage.get().bump_user_version(uid)
+    assert b'Urea' in client.get('/dashboard').data
+
+    # Another node writes: same storage, but this process's fragment cache is not told
+    add_fertilizer(uid, 'Potash')
+    assert b'Potash' not in client.get('/dashboard').data, 'served from the fragment cache'
+    storage.get().bump_user_version(uid)
+    assert b'Potash' in client.get('/dashboard').data
+
+
+def test_local_write_re_renders(app_module, client):
+    uid = user_id(app_module)
+    client.get('/dashboard')
+    response = client.post('/add_dashboard_fertilizer', json={'name': 'Gypsum', 'cost': 300})
+    assert response.status_code == 200, response.get_json()
+    assert b'Gypsum' in client.get('/dashboard').data
+    assert storage.get().user_version(uid) > 0
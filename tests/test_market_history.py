@@ -0,0 +1,17 @@
+import pytest
+
+import market_history
+
+
+@pytest.mark.parametrize('limit', ['0', '-5', str(market_history.MAX_POINTS + 1), 'ten'])
+def test_history_rejects_limit_out_of_range(app_module, limit):
+    response = app_module.app.test_client().get(f"/api/market-prices/history?crop=rice&limit={limit}")
+    assert response.status_code == 400
+    assert response.get_json()['status'] == 'error'
+
+
+@pytest.mark.parametrize('limit', ['1', str(market_history.MAX_POINTS)])
+def test_history_accepts_limit_in_range(app_module, limit):
+    response = app_module.app.test_client().get(f"/api/market-prices/history?crop=rice&limit={limit}")
+    assert response.status_code == 200
+    assert response.get_json()['points'] == []
@@ -0,0 +1,52 @@
+import json
+import os
+import subprocess
+import sys
+
+from flask import Flask
+
+import metrics
+
+
+def dead_pid():
+    proc = subprocess.Popen([sys.executable, '-c', 'pass'])
+    proc.wait()
+    return proc.pid
+
+
+def snapshot(pid, requests, in_flight):
+    return {'pid': pid,
+            'counters': [['farming_http_requests_total', [['endpoint', 'home']], requests]],
+            'gauges': [['farming_http_requests_in_flight', [['endpoint', 'home']], in_flight]],
+            'histograms': []}
+
+
+def test_dead_worker_snapshots_are_retired(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, 'METRICS_DIR', str(tmp_path))
+    metrics.reset()
+    for i, requests in enumerate((3, 4)):
+        (tmp_path / f"{dead_pid()}-{i}.json").write_text(json.dumps(snapshot(dead_pid(), requests, 1)))
+
+    counters, gauges, _ = metrics._merged()
+    assert counters[('farming_http_requests_total', (('endpoint', 'home'),))] == 7
+    assert ('farming_http_requests_in_flight', (('endpoint', 'home'),)) not in gauges
+    assert sorted(os.listdir(tmp_path)) == ['.lock', f"{metrics._process_key}.json", metrics.RETIRED]
+
+    # Totals stay monotonic once the files are gone
+    counters, _, _ = metrics._merged()
+    assert counters[('farming_http_requests_total', (('endpoint', 'home'),))] == 7
+
+
+def test_flushed_snapshot_has_no_finished_requests_in_flight(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, 'METRICS_DIR', str(tmp_path))
+    monkeypatch.setattr(metrics, 'FLUSH_INTERVAL', 0)
+    metrics.reset()
+    app = Flask(__name__)
+    metrics.init_app(app)
+    app.add_url_rule('/ping', 'ping', lambda: 'pong')
+
+    assert app.test_client().get('/ping').status_code == 200
+    snap = json.loads((tmp_path / f"{metrics._process_key}.json").read_text())
+    assert snap['gauges'] == [['farming_http_requests_in_flight', [['endpoint', 'ping']], 0]]
+    assert ['farming_http_requests_total', [['endpoint', 'ping'], ['method', 'GET'], ['status', '200']], 1] \
+        in snap['counters']
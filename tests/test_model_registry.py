@@ -0,0 +1,24 @@
+import metrics
+import recommendation_executor
+
+
+def model_version_gauges():
+    return {labels[0][1]: value for (name, labels), value in metrics._gauges.items()
+            if name == 'farming_model_version' and value}
+
+
+def test_pooled_process_reports_the_pool_version(app_module, monkeypatch):
+    monkeypatch.setattr(recommendation_executor, 'RECOMMENDER_PROCESSES', 1)
+    monkeypatch.setattr(recommendation_executor, '_pool_version', None)
+    metrics.reset()
+    client = app_module.app.test_client()
+
+    with recommendation_executor._pool_lock:
+        recommendation_executor._set_pool_version('v1')
+    assert client.get('/login').headers['X-Model-Version'] == 'v1'
+    assert model_version_gauges() == {'v1': 1}
+
+    with recommendation_executor._pool_lock:
+        recommendation_executor._set_pool_version('v2')
+    assert client.get('/login').headers['X-Model-Version'] == 'v2'
+    assert model_version_gauges() == {'v2': 1}
@@ -0,0 +1,43 @@
+import pstats
+
+import pytest
+from flask import Flask, jsonify
+
+import profiling
+import recommendation_executor
+
+SOIL = {'nitrogen': '37', 'phosphorus': '0', 'potassium': '0', 'crop': 'maize',
+        'temperature': '26', 'humidity': '52', 'moisture': '38'}
+
+
+@pytest.fixture
+def profiled_app(tmp_path, monkeypatch):
+    """An app that profiles every ``advice`` request, with recommendations on a one-process pool."""
+    monkeypatch.setattr(profiling, 'PROFILING_ENABLED', True)
+    monkeypatch.setattr(profiling, 'PROFILE_DIR', str(tmp_path))
+    monkeypatch.setattr(profiling, 'PROFILE_SAMPLE_RATE', 1.0)
+    monkeypatch.setattr(profiling, 'PROFILE_ENDPOINTS', {'advice'})
+    monkeypatch.setattr(recommendation_executor, 'RECOMMENDER_PROCESSES', 1)
+    monkeypatch.setattr(recommendation_executor, '_pool', None)
+    app = Flask(__name__)
+    profiling.init_app(app)
+    app.add_url_rule('/advice', 'advice',
+                     lambda: jsonify(recommendation_executor.run('fertilizer', **SOIL)))
+    yield app
+    recommendation_executor.shutdown()
+
+
+@pytest.mark.parametrize('mode, suffix', [('cprofile', '.prof'), ('sample', '.collapsed')])
+def test_pooled_recommendation_is_in_the_profile(profiled_app, tmp_path, monkeypatch, mode, suffix):
+    monkeypatch.setattr(profiling, 'PROFILE_MODE', mode)
+    monkeypatch.setattr(profiling, 'PROFILE_INTERVAL_MS', 0.2)
+
+    response = profiled_app.test_client().get('/advice')
+    assert response.status_code == 200 and response.get_json()
+    path = tmp_path / f"{response.headers['X-Profile-Id']}{suffix}"
+
+    if mode == 'cprofile':
+        files = {filename for filename, _, _ in pstats.Stats(str(path)).stats}
+        assert any(filename.endswith('fertilizer_data.py') for filename in files)
+    else:
+        assert 'fertilizer_data:' in path.read_text()
@@ -0,0 +1,84 @@
+"""The response shapes of the URLs start_growing.html and progress.js have always used."""
+
+TASKS = [{'name': 'Sow', 'date': '2024-06-01'}, {'name': 'Weed', 'date': '2024-07-01'}]
+
+
+def save(client, **fields):
+    payload = dict(crop_name='Rice', start_date='2024-06-01', harvest_date='2024-10-01',
+                   task_timeline=TASKS, status='monitoring', recommendation='')
+    payload.update(fields)
+    return client.post('/save_progress', json=payload)
+
+
+def test_save_progress(client):
+    response = save(client)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert set(body) == {'status', 'id'}
+    assert body['status'] == 'success'
+    assert isinstance(body['id'], int)
+
+
+def test_save_progress_missing_fields(client):
+    response = save(client, harvest_date='')
+    assert response.status_code == 400
+    assert response.get_json() == {'status': 'error', 'error': 'Missing required fields'}
+
+
+def test_save_progress_non_string_field(client):
+    response = save(client, crop_name=['Rice'])
+    assert response.status_code == 400
+    assert response.get_json()['status'] == 'error'
+
+
+def test_save_progress_not_authenticated(app_module):
+    response = app_module.app.test_client().post('/save_progress', json={})
+    assert response.status_code == 401
+    assert response.get_json() == {'status': 'error', 'error': 'Not authenticated'}
+
+
+def test_get_progress(client):
+    progress_id = save(client, crop_name='Wheat').get_json()['id']
+    response = client.get('/get_progress')
+    assert response.status_code == 200
+    entries = response.get_json()
+    assert isinstance(entries, list)
+    assert entries[0]['id'] == progress_id  # newest first
+    entry = entries[0]
+    assert set(entry) == {'id', 'crop_name', 'start_date', 'harvest_date', 'tasks', 'status',
+                          'recommendation', 'next_task', 'progress_percent'}
+    assert entry['crop_name'] == 'Wheat'
+    assert entry['tasks'] == [dict(t, done=False) for t in TASKS]
+    assert entry['status'] == 'monitoring'
+    assert entry['progress_percent'] == 0
+
+
+def test_get_progress_not_authenticated(app_module):
+    response = app_module.app.test_client().get('/get_progress')
+    assert response.status_code == 200
+    assert response.get_json() == []
+
+
+def test_mark_task_done(client):
+    progress_id = save(client).get_json()['id']
+    response = client.post('/mark_task_done', json={'progress_id': progress_id, 'task_index': 0})
+    assert response.status_code == 200
+    assert response.get_json() == {'status': 'success', 'new_status': 'monitoring'}
+    response = client.post('/mark_task_done', json={'progress_id': progress_id, 'task_index': 1})
+    assert response.get_json() == {'status': 'success', 'new_status': 'completed'}
+    entry = next(e for e in client.get('/get_progress').get_json() if e['id'] == progress_id)
+    assert entry['status'] == 'completed'
+    assert entry['progress_percent'] == 100
+
+
+def test_mark_task_done_errors(client):
+    progress_id = save(client).get_json()['id']
+    response = client.post('/mark_task_done', json={'progress_id': progress_id})
+    assert response.status_code == 400
+    assert response.get_json() == {'status': 'error', 'error': 'Missing fields'}
+    response = client.post('/mark_task_done', json={'progress_id': progress_id, 'task_index': 5})
+    assert response.status_code == 400
+    assert response.get_json() == {'status': 'error', 'error': 'Invalid index'}
+    response = client.post('/mark_task_done', json={'progress_id': 10**9, 'task_index': 0})
+    assert response.status_code == 404
+    assert response.get_json() == {'status': 'error', 'error': 'Not found'}
@@ -0,0 +1,33 @@
+import itertools
+
+import numpy as np
+import pytest
+
+import fertilizer_data
+import recommendation_tables
+
+CROPS = ['rice', 'maize', 'Kidney Beans', 'cotton', 'unknowncrop']
+GRID = [dict(crop=crop, nitrogen=str(n), phosphorus=str(p), potassium=str(k), temperature=str(t),
+             humidity='60', moisture=str(m))
+        for crop, n, p, k, t, m in itertools.product(CROPS, (0, 40, 120), (5, 60), (10, 150), (12, 30), (25, 70))]
+
+
+@pytest.fixture(scope='module')
+def bundle(tmp_path_factory):
+    """The tables built from the served ``FertilizerDataset``, through a bundle file."""
+    dataset = fertilizer_data.fertilizer_dataset
+    tables = dict(recommendation_tables.crop_tables({}), **recommendation_tables.fertilizer_tables(dataset.dataset),
+                  **recommendation_tables.forest_tables(dataset))
+    path = tmp_path_factory.mktemp('tables') / 'recommendation_tables.npz'
+    np.savez(path, **tables)
+    return recommendation_tables.load(str(path))[1]
+
+
+def test_bundle_has_the_forest(bundle):
+    assert bundle.model is not None
+
+
+def test_tables_match_the_dataset_recommender(bundle):
+    dataset = fertilizer_data.fertilizer_dataset
+    assert [kw for kw in GRID
+            if bundle.get_fertilizer_recommendations(**kw) != dataset.get_fertilizer_recommendations(**kw)] == []
@@ -0,0 +1,37 @@
+import pytest
+
+
+@pytest.fixture
+def client(client):
+    """The logged-in client, with the login flash already shown."""
+    client.get('/login')
+    return client
+
+
+def test_anonymous_index_is_public(app_module):
+    response = app_module.app.test_client().get('/')
+    assert response.status_code == 200
+    assert response.cache_control.public and response.cache_control.max_age == 300
+    assert 'Cookie' in response.vary
+
+
+def test_index_with_a_session_is_private_and_revalidated(client):
+    response = client.get('/')
+    assert response.cache_control.private and response.cache_control.no_cache
+    assert not response.cache_control.public
+    etag = response.get_etag()[0]
+    assert client.get('/', headers={'If-None-Match': f'"{etag}"'}).status_code == 304
+
+
+def test_flash_page_is_not_public(client):
+    with client.session_transaction() as session:
+        session['_flashes'] = [('success', 'Logged out')]
+    response = client.get('/')
+    assert b'Logged out' in response.data
+    assert response.cache_control.private and response.cache_control.no_cache
+
+
+def test_session_independent_page_stays_public(client):
+    response = client.get('/start_growing/rice')
+    assert response.status_code == 200
+    assert response.cache_control.public and response.cache_control.max_age == 300
@@ -0,0 +1,67 @@
+"""Session backends (temp-file SQLite and mongomock) and the interface's store access."""
+import time
+
+import mongomock
+import pytest
+from flask import Flask
+
+import session_store
+
+USER = 'farmer'
+
+
+@pytest.fixture(params=['sqlite', 'mongo'])
+def backend(request, tmp_path):
+    if request.param == 'sqlite':
+        return session_store.SQLiteBackend(str(tmp_path / 'sessions.db'))
+    return session_store.MongoBackend(mongomock.MongoClient()['farmerdb_test'])
+
+
+@pytest.fixture
+def app(backend):
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.session_interface = session_store.ServerSessionInterface(backend)
+    return app
+
+
+def save(backend, sid, data):
+    return backend.save(sid, USER, session_store.serializer.dumps(data), time.time() + 3600)
+
+
+def stored(backend, sid):
+    data, gen = backend.load(sid)
+    return session_store.serializer.loads(data), gen
+
+
+def test_save_bumps_the_generation(backend):
+    assert save(backend, 'a', {'user_id': USER}) == 1
+    assert save(backend, 'a', {'user_id': USER, 'n': 1}) == 2
+    assert stored(backend, 'a') == ({'user_id': USER, 'n': 1}, 2)
+    assert not backend.replace_data('a', session_store.serializer.dumps({}), 1)
+    assert backend.replace_data('a', session_store.serializer.dumps({}), 2)
+    assert stored(backend, 'a') == ({}, 3)
+
+
+def test_invalidate_user_keeps_a_concurrent_save(app, backend, monkeypatch):
+    save(backend, 'a', {'user_id': USER, 'profile': 'old'})
+    snapshot = backend.for_user(USER)
+    # A request saves the session between the read and the write
+    save(backend, 'a', {'user_id': USER, 'profile': 'old', 'flash': 'saved'})
+    monkeypatch.setattr(backend, 'for_user', lambda user_id: snapshot)
+
+    assert session_store.invalidate_user(app, USER) == 1
+    assert stored(backend, 'a') == ({'user_id': USER, 'flash': 'saved'}, 3)
+
+
+def test_static_and_metrics_requests_skip_the_store(client, app_module, monkeypatch):
+    interface = app_module.app.session_interface
+    lookups = []
+    monkeypatch.setattr(interface.cache, 'get', lambda sid, gen: lookups.append(sid))
+    monkeypatch.setattr(interface.backend, 'load', lambda sid: lookups.append(sid))
+
+    for path in ('/static/css/style.css', '/metrics'):
+        client.get(path)
+    assert lookups == []
+    client.get('/login')
+    assert lookups
@@ -0,0 +1,142 @@
+"""The storage contract, run against both backends: a temp-file SQLiteStorage and a mongomock MongoStorage."""
+import mongomock
+import pytest
+
+import storage
+
+USER = 'farmer'
+OTHER = 'farmer:other'
+
+
+@pytest.fixture(params=['sqlite', 'mongo'])
+def store(request, tmp_path):
+    if request.param == 'sqlite':
+        store = storage.SQLiteStorage(str(tmp_path / 'progress.db'), str(tmp_path / 'dashboard_fertilizers.db'))
+    else:
+        store = storage.MongoStorage(mongomock.MongoClient()['farmerdb_test'])
+    store.ensure_schema()
+    return store
+
+
+def tasks():
+    return [{'name': 'Sow', 'date': '2025-06-01', 'done': False}, {'name': 'Weed', 'date': '2025-06-20'}]
+
+
+def add_progress(store, crop_name='Rice', task_timeline=None, user_id=USER):
+    return store.add_progress({'user_id': user_id, 'crop_name': crop_name, 'start_date': '2025-06-01',
+                               'harvest_date': '2025-10-01', 'task_timeline': task_timeline or [],
+                               'status': 'monitoring', 'recommendation': ''})
+
+
+def add_fertilizer(store, user_id=USER):
+    return store.add_fertilizer({'fertilizer_name': 'Urea', 'cost': 540, 'yield_increase': '12%',
+                                 'application_time': 'Morning', 'date_added': '2025-06-01T00:00:00',
+                                 'status': 'Purchased', 'selected_for': 'Rice', 'suitability': 80,
+                                 'user_id': user_id})
+
+
+def test_progress_list(store):
+    first = add_progress(store, task_timeline=tasks())
+    second = add_progress(store, 'Wheat')
+    assert second > first, 'newer entries must get higher ids'
+    entries = store.list_progress(USER)
+    assert [e['id'] for e in entries] == [second, first], 'list is newest first'
+    assert set(entries[0]) == set(storage.PROGRESS_COLUMNS)
+    assert entries[1]['task_timeline'] == tasks(), 'task_timeline round-trips as a list'
+    assert store.list_progress(OTHER) == [], 'lists are per user'
+
+
+def test_progress_pages(store):
+    first = add_progress(store)
+    second = add_progress(store, 'Wheat')
+    page = store.list_progress(USER, limit=1)
+    assert [e['id'] for e in page] == [second]
+    assert [e['id'] for e in store.list_progress(USER, before_id=page[-1]['id'], limit=1)] == [first]
+    assert store.list_progress(USER, before_id=first) == []
+
+
+def test_progress_update(store):
+    progress_id = add_progress(store, task_timeline=tasks())
+    assert store.get_progress(OTHER, progress_id) is None, 'entries are per user'
+    done = tasks()
+    done[0]['done'] = True
+    assert store.update_progress(USER, progress_id, done, 'completed')
+    assert not store.update_progress(OTHER, progress_id, done, 'completed')
+    entry = store.get_progress(USER, progress_id)
+    assert entry['status'] == 'completed'
+    assert entry['task_timeline'][0]['done'] is True
+
+
+def test_progress_delete(store):
+    progress_id = add_progress(store)
+    assert not store.delete_progress(OTHER, progress_id)
+    assert store.delete_progress(USER, progress_id)
+    assert store.list_progress(USER) == []
+    assert not store.delete_progress(USER, progress_id), 'deleting twice reports not found'
+
+
+def test_fertilizers(store):
+    fertilizer_id = add_fertilizer(store)
+    fertilizers = store.list_fertilizers(USER)
+    assert [f['id'] for f in fertilizers] == [fertilizer_id]
+    assert set(fertilizers[0]) == set(storage.FERTILIZER_COLUMNS)
+    assert fertilizers[0]['fertilizer_name'] == 'Urea'
+    assert fertilizers[0]['cost'] == 540
+    assert store.list_fertilizers(USER, before_id=fertilizer_id) == []
+    assert store.list_fertilizers(OTHER) == []
+    assert not store.delete_fertilizer(OTHER, fertilizer_id)
+    assert store.delete_fertilizer(USER, fertilizer_id)
+    assert store.list_fertilizers(USER) == []
+
+
+def test_sqlite_query_plans(tmp_path):
+    """Every per-user statement searches an index or the primary key; none scans or sorts."""
+    store = storage.SQLiteStorage(str(tmp_path / 'progress.db'), str(tmp_path / 'dashboard_fertilizers.db'))
+    store.ensure_schema()
+    for name, plan in store.query_plans().items():
+        detail = ' '.join(plan)
+        assert 'USING INDEX idx_' in detail or 'PRIMARY KEY' in detail, (name, plan)
+        assert 'SCAN' not in detail and 'TEMP B-TREE' not in detail, (name, plan)
+
+
+def test_sqlite_indexes_existing_files(tmp_path):
+    """ensure_schema() adds the user_id indexes to files created before them."""
+    import sqlite3
+    progress_path, fertilizer_path = str(tmp_path / 'progress.db'), str(tmp_path / 'dashboard_fertilizers.db')
+    conn = sqlite3.connect(progress_path)
+    conn.execute("CREATE TABLE crop_progress (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT, crop_name TEXT, "
+                 "start_date TEXT, harvest_date TEXT, task_timeline TEXT, status TEXT, recommendation TEXT)")
+    conn.close()
+    conn = sqlite3.connect(fertilizer_path)
+    conn.execute("CREATE TABLE dashboard_fertilizers (id INTEGER PRIMARY KEY AUTOINCREMENT, fertilizer_name TEXT, "
+                 "cost REAL, yield_increase TEXT, application_time TEXT, date_added TEXT, status TEXT)")
+    conn.close()
+    store = storage.SQLiteStorage(progress_path, fertilizer_path)
+    store.ensure_schema()
+    assert store.list_fertilizers(USER) == []
+    for name, plan in store.query_plans().items():
+        assert 'SCAN' not in ' '.join(plan), (name, plan)
+
+
+def test_mongo_insert_many_skips_duplicates():
+    store = storage.MongoStorage(mongomock.MongoClient()['farmerdb_test'])
+    store.ensure_schema()
+    records = [{'id': i, 'user_id': USER, 'crop_name': 'Rice', 'task_timeline': []} for i in (1, 2)]
+    assert store.add_progress_many(records) == 2
+    assert store.add_progress_many(records + [dict(records[0], id=3)]) == 1  # a re-run copy
+    assert [e['id'] for e in store.list_progress(USER)] == [3, 2, 1]
+
+
+def test_mongo_insert_many_raises_other_errors():
+    from pymongo.errors import BulkWriteError
+
+    class Rejecting:
+        name = storage.PROGRESS
+
+        def insert_many(self, docs, ordered):
+            raise BulkWriteError({'nInserted': 1, 'writeErrors': [
+                {'index': 1, 'code': 121, 'errmsg': 'Document failed validation'}]})
+
+    store = storage.MongoStorage(mongomock.MongoClient()['farmerdb_test'])
+    with pytest.raises(BulkWriteError):
+        store._insert_many(Rejecting(), [{'user_id': USER}, {'user_id': USER}])
@@ -0,0 +1,57 @@
+import mongomock
+import pytest
+
+import admin_auth
+import user_import
+
+CSV = b'name,email,password\nAsha,asha@example.com,secret1\nRavi,ravi@example.com,123\nAsha,asha@example.com,secret2\n'
+
+
+@pytest.fixture
+def users(app_module, monkeypatch):
+    monkeypatch.setattr(admin_auth, 'ADMIN_TOKEN', 'token')
+    monkeypatch.setattr(user_import, 'ENDPOINT_PROCESSES', 0)
+    users = mongomock.MongoClient()['farmerdb_test']['users']
+    monkeypatch.setattr(user_import, '_users_collection', users)
+    return users
+
+
+def post(app_module, body=CSV):
+    return app_module.app.test_client().post('/admin/users/import', data=body, content_type='text/csv',
+                                             headers={'X-Admin-Token': 'token'})
+
+
+def test_import_streams_results(app_module, users):
+    response = post(app_module)
+    assert response.status_code == 200
+    lines = response.get_data(as_text=True).splitlines()
+    assert [line for line in lines if '"status"' in line] == [
+        '{"row": 3, "email": "ravi@example.com", "status": "invalid", '
+        '"error": "password must be at least 6 characters long"}',
+        '{"row": 2, "email": "asha@example.com", "status": "created"}',
+        '{"row": 4, "email": "asha@example.com", "status": "duplicate"}',
+    ]
+    assert users.count_documents({}) == 1
+    assert post(app_module).status_code == 409, 'one import at a time'
+    response.close()  # as the WSGI server does once the body is sent
+    with post(app_module) as response:
+        assert response.status_code == 200, 'the lock is released once the stream is closed'
+
+
+def test_one_import_at_a_time(app_module, users):
+    assert user_import._endpoint_lock.acquire(blocking=False)
+    try:
+        response = post(app_module)
+    finally:
+        user_import._endpoint_lock.release()
+    assert response.status_code == 409
+    assert users.count_documents({}) == 0
+
+
+def test_index_failure_answers_before_streaming(app_module, users):
+    users.insert_many([{'name': 'A', 'email': 'same@example.com'}, {'name': 'B', 'email': 'same@example.com'}])
+    response = post(app_module)
+    assert response.status_code == 409
+    assert response.get_json()['status'] == 'error'
+    assert user_import._endpoint_lock.acquire(blocking=False)
+    user_import._endpoint_lock.release()
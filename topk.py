@@ -0,0 +1,39 @@
+"""Top-k selection for the recommenders.
+
+``top_indices`` picks the k best entries of a NumPy array with a partial
+partition and sorts only those; ``nlargest`` does the same for a Python
+sequence with ``heapq``. Both return exactly what a full stable sort would,
+cut to k: equal scores keep their original order (or ``tiebreak`` order), so
+replacing a ``sorted(...)[:k]`` with either never changes a result.
+"""
+import heapq
+
+import numpy as np
+
+
+def top_indices(scores, k, largest=True, tiebreak=None):
+    """Indices of the ``k`` largest (or smallest) ``scores``, best first.
+
+    Ties go to the lower index, or to the lower ``tiebreak`` value when given.
+    ``k=None`` ranks every entry.
+    """
+    scores = np.asarray(scores)
+    key = -scores if largest else scores
+    n = len(key)
+    if k is None or k >= n:
+        candidates = np.arange(n)
+    elif k <= 0:
+        return np.empty(0, dtype=np.intp)
+    else:
+        kth = np.partition(key, k - 1)[k - 1]
+        # Everything tied with the k-th value competes on the tie-break
+        candidates = np.arange(n) if np.isnan(kth) else np.flatnonzero(key <= kth)
+    second = candidates if tiebreak is None else np.asarray(tiebreak)[candidates]
+    return candidates[np.lexsort((second, key[candidates]))][:k]
+
+
+def nlargest(k, items, key):
+    """``sorted(items, key=key, reverse=True)[:k]`` without sorting everything; ``k=None`` sorts all."""
+    if k is None:
+        return sorted(items, key=key, reverse=True)
+    return heapq.nlargest(k, items, key=key)
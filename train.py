@@ -0,0 +1,328 @@
+"""Offline training: cross-validate candidate models in parallel, keep the best.
+
+    python train.py [--task fertilizer|crop|all] [--folds 5] [--jobs N] [--candidate NAME ...]
+                    [--max-latency-ms MS] [--tolerance 0.005] [--no-write]
+
+For each task every candidate in ``CANDIDATES`` is scored with stratified
+k-fold cross-validation. The (candidate, fold) fits run on a pool of ``--jobs``
+processes (default: one per core), each fit single-threaded so the folds do
+not fight over cores. Per candidate the report has the mean and spread of
+accuracy, fit time, batch predict time per row, single-row ``predict_proba``
+latency (what a request pays) and pickled size.
+
+The chosen candidate is the fastest single-row one whose accuracy is within
+``--tolerance`` of the best, among those under ``--max-latency-ms``. It is
+refit on the whole dataset and written to ``models/<task>_model.pkl`` (the
+``arrays-*`` candidates, pruned forest_arrays exports, to ``models/<task>_forest/``)
+with the report in ``models/<task>_report.json``.
+
+* ``fertilizer``: the ``FertilizerDataset`` features (``training_data()``).
+  ``FertilizerDataset`` loads ``models/fertilizer_forest/`` or
+  ``models/fertilizer_model.pkl`` instead of training its default forest at
+  start-up (``FERTILIZER_FOREST_PATH`` / ``FERTILIZER_MODEL_PATH``), and
+  ``model_registry`` picks a new artifact up like any other model file.
+* ``crop``: ``Crop_recommendation.csv``. ``centroid`` is the means scorer
+  ``CropDataset`` serves with; the forests are the model described in
+  ``models/model_metadata.json``. The artifact is written for comparison,
+  serving still ranks crops by the means.
+
+The sklearn candidates are skipped when sklearn is not installed.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import pickle
+import shutil
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+SEED = 42
+LATENCY_CALLS = 50
+
+
+class CentroidClassifier:
+    """Nearest class mean; ``scales`` gives the scaled L1 distance ``CropDataset`` scores with, else L2.
+
+    Only the first ``columns`` features are used (the fertilizer centroids
+    ignore pH and the crop code).
+    """
+
+    def __init__(self, scales=None, columns=None):
+        self.scales = scales
+        self.columns = columns
+
+    def fit(self, X, y):
+        X = np.asarray(X, dtype=np.float64)[:, :self.columns]
+        self.classes_, codes = np.unique(y, return_inverse=True)
+        self.centroids_ = np.array([X[codes == c].mean(axis=0) for c in range(len(self.classes_))])
+        return self
+
+    def _distances(self, X):
+        diff = np.asarray(X, dtype=np.float64)[:, None, :self.columns] - self.centroids_[None]
+        if self.scales is None:
+            return np.linalg.norm(diff, axis=2)
+        return (np.abs(diff) / self.scales).sum(axis=2)
+
+    def predict_proba(self, X):
+        scores = 1.0 / (1.0 + self._distances(X))
+        return scores / scores.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        return self.classes_[self._distances(X).argmin(axis=1)]
+
+
+def _forest(n_estimators, max_depth=None):
+    from sklearn.ensemble import RandomForestClassifier
+    return RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth, random_state=SEED, n_jobs=1)
+
+
+def _gradient_boosting():
+    from sklearn.ensemble import HistGradientBoostingClassifier
+    return HistGradientBoostingClassifier(max_iter=100, random_state=SEED)
+
+
+def _arrays(n_estimators, max_depth=None, min_samples=None):
+    from forest_arrays import PrunedForest
+    return PrunedForest(n_estimators, max_depth, min_samples, random_state=SEED)
+
+
+def _centroid(task):
+    if task == 'crop':
+        from recommendation_tables import CROP_SCALES
+        return CentroidClassifier(scales=CROP_SCALES)
+    return CentroidClassifier(columns=5)
+
+
+# name -> (needs sklearn, factory(task)); forest-100 is what FertilizerDataset trains by default
+CANDIDATES = {
+    'centroid': (False, _centroid),
+    'forest-100': (True, lambda task: _forest(100)),
+    'forest-50': (True, lambda task: _forest(50)),
+    'forest-100-depth12': (True, lambda task: _forest(100, 12)),
+    'forest-50-depth8': (True, lambda task: _forest(50, 8)),
+    'gradient-boosting': (True, lambda task: _gradient_boosting()),
+    # forest_arrays exports of a forest-100, pruned by depth or by samples per leaf
+    'arrays-100': (True, lambda task: _arrays(100)),
+    'arrays-100-depth12': (True, lambda task: _arrays(100, 12)),
+    'arrays-100-depth8': (True, lambda task: _arrays(100, 8)),
+    'arrays-100-min5': (True, lambda task: _arrays(100, min_samples=5)),
+}
+
+
+def has_sklearn():
+    try:
+        import sklearn  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def load_task(task):
+    """``(X, y, features, crop_classes)`` for ``task``."""
+    import pandas as pd
+
+    if task == 'crop':
+        import crop_data
+        from recommendation_tables import CROP_FEATURES
+        df = pd.read_csv(crop_data.CROP_DATASET_PATH)
+        return df[CROP_FEATURES].to_numpy(dtype=np.float64), df['label'].to_numpy(dtype=str), CROP_FEATURES, None
+    import fertilizer_data
+    dataset = fertilizer_data.load_dataset()
+    if dataset.empty:
+        raise ValueError(f"no fertilizer data in {fertilizer_data.FERTILIZER_DATASET_PATH}")
+    X, y, crop_classes = fertilizer_data.training_data(dataset)
+    return X, y, fertilizer_data.MODEL_FEATURES, crop_classes
+
+
+def stratified_folds(y, folds, seed=SEED):
+    """Fold index of every row: each class's rows are shuffled and dealt round-robin."""
+    rng = np.random.default_rng(seed)
+    assignment = np.empty(len(y), dtype=np.int64)
+    for label in np.unique(y):
+        rows = rng.permutation(np.flatnonzero(y == label))
+        assignment[rows] = (np.arange(len(rows)) + rng.integers(folds)) % folds
+    return assignment
+
+
+def _single_row_ms(model, X):
+    """Median ``predict_proba`` time for one row, as a request makes it."""
+    times = []
+    for i in range(min(LATENCY_CALLS, len(X))):
+        start = time.perf_counter()
+        model.predict_proba(X[i:i + 1])
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1e3
+
+
+def run_fold(task, name, fold, X, y, assignment):
+    """Fit ``name`` on every fold but ``fold`` and score it on ``fold`` (runs in a worker process)."""
+    train, test = assignment != fold, assignment == fold
+    model = CANDIDATES[name][1](task)
+    start = time.perf_counter()
+    model.fit(X[train], y[train])
+    fit_s = time.perf_counter() - start
+    start = time.perf_counter()
+    predicted = model.predict(X[test])
+    batch_s = time.perf_counter() - start
+    return {
+        'candidate': name,
+        'fold': fold,
+        'accuracy': float(np.mean(predicted == y[test])),
+        'fit_s': fit_s,
+        'batch_us_per_row': batch_s / max(1, int(test.sum())) * 1e6,
+        'single_row_ms': _single_row_ms(model, X[test]),
+        'size_kb': len(pickle.dumps(model)) / 1024 if fold == 0 else None,
+    }
+
+
+def summarize(rows):
+    """Per-candidate means (and accuracy spread) of the fold results."""
+    summary = {}
+    for name in dict.fromkeys(r['candidate'] for r in rows):
+        mine = [r for r in rows if r['candidate'] == name]
+        accuracy = [r['accuracy'] for r in mine]
+        summary[name] = {
+            'accuracy': statistics.mean(accuracy),
+            'accuracy_std': statistics.pstdev(accuracy),
+            'fit_s': statistics.mean(r['fit_s'] for r in mine),
+            'batch_us_per_row': statistics.mean(r['batch_us_per_row'] for r in mine),
+            'single_row_ms': statistics.median(r['single_row_ms'] for r in mine),
+            'size_kb': next(r['size_kb'] for r in mine if r['size_kb'] is not None),
+        }
+    return summary
+
+
+def choose(summary, tolerance, max_latency_ms=None):
+    """Fastest candidate (single row) within ``tolerance`` of the best accuracy and under the latency budget."""
+    eligible = {name: s for name, s in summary.items()
+                if max_latency_ms is None or s['single_row_ms'] <= max_latency_ms}
+    if not eligible:
+        raise ValueError(f"no candidate predicts a row within {max_latency_ms} ms")
+    best = max(s['accuracy'] for s in eligible.values())
+    close = [name for name, s in eligible.items() if s['accuracy'] >= best - tolerance]
+    return min(close, key=lambda name: eligible[name]['single_row_ms'])
+
+
+def cross_validate(task, names, folds, jobs):
+    """``(X, y, features, crop_classes, summary, cv_seconds)`` with every (candidate, fold) fit run on the pool."""
+    X, y, features, crop_classes = load_task(task)
+    assignment = stratified_folds(y, folds)
+    start = time.perf_counter()
+    jobs_list = [(task, name, fold, X, y, assignment) for name in names for fold in range(folds)]
+    if jobs > 1:
+        # spawn, as the recommender pool does: no forked copies of a half-initialized parent
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context('spawn')) as pool:
+            rows = list(pool.map(run_fold, *zip(*jobs_list)))
+    else:
+        rows = [run_fold(*job) for job in jobs_list]
+    return X, y, features, crop_classes, summarize(rows), time.perf_counter() - start
+
+
+def train(task, names, folds=5, jobs=None, tolerance=0.005, max_latency_ms=None, write=True):
+    """Cross-validate ``names`` on ``task``, refit the chosen one on all rows and write it; returns the report."""
+    jobs = jobs or os.cpu_count() or 1
+    X, y, features, crop_classes, summary, cv_s = cross_validate(task, names, folds, jobs)
+    chosen = choose(summary, tolerance, max_latency_ms)
+    model = CANDIDATES[chosen][1](task).fit(X, y)
+
+    report = {
+        'task': task,
+        'trained_date': datetime.now().isoformat(),
+        'rows': int(len(y)),
+        'classes': int(len(np.unique(y))),
+        'features': list(features),
+        'folds': folds,
+        'jobs': jobs,
+        'cross_validation_s': cv_s,
+        'tolerance': tolerance,
+        'max_latency_ms': max_latency_ms,
+        'chosen': chosen,
+        'candidates': summary,
+    }
+    if write:
+        path = write_artifact(task, model, chosen, features, crop_classes, report['trained_date'])
+        report['artifact'] = os.path.relpath(path, os.path.dirname(MODELS_DIR))
+        _write(os.path.join(MODELS_DIR, f"{task}_report.json"), json.dumps(report, indent=2).encode())
+    return report
+
+
+def write_artifact(task, model, candidate, features, crop_classes, trained_date):
+    """``models/<task>_forest/`` for a ``PrunedForest``, else ``models/<task>_model.pkl``; removes the other."""
+    from forest_arrays import PrunedForest
+
+    pickled, arrays = os.path.join(MODELS_DIR, f"{task}_model.pkl"), os.path.join(MODELS_DIR, f"{task}_forest")
+    if isinstance(model, PrunedForest):
+        model.arrays_.meta = {'features': list(features), 'crop_classes': crop_classes,
+                              'candidate': candidate, 'trained_date': trained_date}
+        model.arrays_.save(arrays)
+        if os.path.exists(pickled):
+            os.remove(pickled)
+        return arrays
+    artifact = {'model': model, 'features': list(features), 'crop_classes': crop_classes,
+                'candidate': candidate, 'trained_date': trained_date}
+    if CANDIDATES[candidate][0]:
+        import sklearn
+        artifact['sklearn_version'] = sklearn.__version__
+    _write(pickled, pickle.dumps(artifact))
+    shutil.rmtree(arrays, ignore_errors=True)
+    return pickled
+
+
+def _write(path, data):
+    """Write atomically, so a hot reload never sees half a file."""
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def print_report(report):
+    print(f"{report['task']}: {report['rows']} rows, {report['classes']} classes, "
+          f"{report['folds']}-fold CV on {report['jobs']} processes in {report['cross_validation_s']:.1f} s")
+    print(f"  {'candidate':20s} {'accuracy':>16s} {'fit s':>8s} {'batch us/row':>13s} {'1-row ms':>9s} {'size KB':>9s}")
+    for name, s in report['candidates'].items():
+        mark = '*' if name == report['chosen'] else ' '
+        print(f"{mark} {name:20s} {s['accuracy']:9.4f} ±{s['accuracy_std']:.4f} {s['fit_s']:8.2f} "
+              f"{s['batch_us_per_row']:13.1f} {s['single_row_ms']:9.3f} {s['size_kb']:9.0f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Cross-validate candidate models and write the best to models/.')
+    parser.add_argument('--task', choices=['fertilizer', 'crop', 'all'], default='all')
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes (default: one per core)')
+    parser.add_argument('--candidate', action='append', choices=list(CANDIDATES), dest='candidates',
+                        help='candidate to evaluate (repeatable; default: all)')
+    parser.add_argument('--max-latency-ms', type=float, default=None, help='single-row latency budget')
+    parser.add_argument('--tolerance', type=float, default=0.005, help='accuracy given up for speed')
+    parser.add_argument('--no-write', action='store_true', help='report only, write nothing to models/')
+    args = parser.parse_args(argv)
+
+    names = args.candidates or list(CANDIDATES)
+    if not has_sklearn():
+        skipped = [name for name in names if CANDIDATES[name][0]]
+        if skipped:
+            print(f"sklearn is not installed, skipping {', '.join(skipped)}")
+        names = [name for name in names if not CANDIDATES[name][0]]
+    if not names:
+        print("No candidates to evaluate")
+        sys.exit(2)
+
+    for task in (['fertilizer', 'crop'] if args.task == 'all' else [args.task]):
+        report = train(task, names, args.folds, args.jobs, args.tolerance, args.max_latency_ms, not args.no_write)
+        print_report(report)
+        if not args.no_write:
+            print(f"  wrote {report['artifact']} ({report['chosen']}) and models/{task}_report.json")
+
+
+if __name__ == '__main__':
+    # Through the module, so the pickled CentroidClassifier is train.CentroidClassifier, not __main__'s
+    import train
+    train.main()
@@ -0,0 +1,210 @@
+"""Bulk user provisioning from a CSV, for onboarding a whole cooperative at once.
+
+The CSV has a header row with ``name``, ``email`` and ``password`` columns
+(others are ignored). Rows are checked as ``register()`` checks a form post,
+then handled ``USER_IMPORT_CHUNK`` rows at a time (default 500): the chunk's
+passwords are bcrypt-hashed in parallel on a pool of
+``USER_IMPORT_PROCESSES`` processes (default one per core; 0 or 1 hashes in
+the calling process, 0 is the default on Vercel) and the users are written with one
+unordered ``insert_many``. There is no per-row existence check: the unique
+``email`` index (created before the first row) rejects an address that is
+already registered or repeated in the file, and only that row is reported as
+a duplicate.
+
+The endpoint shares its server with live traffic: it runs one import at a
+time (409 while another is running) on ``USER_IMPORT_ENDPOINT_PROCESSES``
+processes (default 2; 0 on Vercel).
+
+One JSON result per CSV row is streamed as it is known, then a summary::
+
+    {"row": 2, "email": "a@example.com", "status": "created"}
+    {"row": 3, "email": "b@example.com", "status": "duplicate"}
+    {"row": 4, "email": "", "status": "invalid", "error": "missing email"}
+    {"summary": {"rows": 3, "created": 1, "duplicate": 1, "invalid": 1, "error": 0,
+                 "seconds": 0.61, "users_per_second": 1.6}}
+
+``row`` is the line number in the file (the header is line 1).
+
+    POST /admin/users/import   (X-Admin-Token; the CSV as the body or a ``file`` upload)
+                               -> application/x-ndjson
+    python user_import.py users.csv [--mongo-uri URI] [--processes N] [--chunk N]
+"""
+import argparse
+import csv
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from flask import Response, jsonify, request, stream_with_context
+from pymongo.errors import BulkWriteError, OperationFailure
+
+from admin_auth import admin_required
+
+_DEFAULT_PROCESSES = '0' if os.environ.get('VERCEL') else str(os.cpu_count() or 1)
+PROCESSES = int(os.getenv('USER_IMPORT_PROCESSES', _DEFAULT_PROCESSES))
+ENDPOINT_PROCESSES = int(os.getenv('USER_IMPORT_ENDPOINT_PROCESSES', '0' if os.environ.get('VERCEL') else '2'))
+CHUNK_SIZE = int(os.getenv('USER_IMPORT_CHUNK', '500'))
+DUPLICATE_KEY = 11000
+STATUSES = ('created', 'duplicate', 'invalid', 'error')
+
+_users_collection = None
+_endpoint_lock = threading.Lock()  # held while an endpoint import streams
+
+
+def hash_password(password):
+    """Same hash as ``app.hash_password``; runs in the pool's worker processes."""
+    import bcrypt
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+
+
+def validate(row):
+    """Error message for a CSV row, or None; the checks ``register()`` makes."""
+    for field in ('name', 'email', 'password'):
+        if not row.get(field):
+            return f"missing {field}"
+    if len(row['password']) < 6:
+        return 'password must be at least 6 characters long'
+    return None
+
+
+def _clean(row):
+    return {'name': (row.get('name') or '').strip(), 'email': (row.get('email') or '').strip(),
+            'password': row.get('password') or ''}
+
+
+def _pool(processes):
+    if processes <= 1:
+        return None
+    # spawn, as the recommender pool does: no forked copies of the app's connections
+    return ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'))
+
+
+def _insert(collection, lines, docs):
+    """``insert_many`` one chunk; yields a result per document."""
+    failed = {}
+    try:
+        collection.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        failed = {err['index']: err for err in e.details.get('writeErrors', [])}
+    for i, (line, doc) in enumerate(zip(lines, docs)):
+        err = failed.get(i)
+        if err is None:
+            yield {'row': line, 'email': doc['email'], 'status': 'created'}
+        elif err.get('code') == DUPLICATE_KEY:
+            yield {'row': line, 'email': doc['email'], 'status': 'duplicate'}
+        else:
+            yield {'row': line, 'email': doc['email'], 'status': 'error', 'error': err.get('errmsg', 'write failed')}
+
+
+def ensure_index(collection):
+    """The unique ``email`` index ``import_users`` relies on for its duplicate check."""
+    collection.create_index('email', unique=True)
+
+
+def import_users(rows, collection, processes=PROCESSES, chunk_size=CHUNK_SIZE):
+    """Create a user per CSV row dict; yields a result per row, then ``{'summary': ...}``.
+
+    Call ``ensure_index(collection)`` first.
+    """
+    totals = dict.fromkeys(STATUSES, 0)
+    start = time.perf_counter()
+    pool = _pool(processes)
+    try:
+        numbered = enumerate(rows, start=2)
+        while True:
+            chunk = list(itertools.islice(numbered, chunk_size))
+            if not chunk:
+                break
+            lines, users = [], []
+            for line, row in chunk:
+                row = _clean(row)
+                error = validate(row)
+                if error:
+                    totals['invalid'] += 1
+                    yield {'row': line, 'email': row['email'], 'status': 'invalid', 'error': error}
+                else:
+                    lines.append(line)
+                    users.append(row)
+            passwords = [user['password'] for user in users]
+            if pool is None:
+                hashes = map(hash_password, passwords)
+            else:
+                hashes = pool.map(hash_password, passwords, chunksize=max(1, len(passwords) // (processes * 4)))
+            now = datetime.utcnow()
+            docs = [{"name": user['name'], "email": user['email'], "password": hashed, "created_at": now}
+                    for user, hashed in zip(users, hashes)]
+            if docs:
+                for result in _insert(collection, lines, docs):
+                    totals[result['status']] += 1
+                    yield result
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    seconds = time.perf_counter() - start
+    yield {'summary': dict(rows=sum(totals.values()), **totals, seconds=round(seconds, 3),
+                           users_per_second=round(totals['created'] / seconds, 1) if seconds else 0.0)}
+
+
+# ------------------ Endpoint ------------------ #
+@admin_required
+def import_view():
+    if _users_collection is None:
+        return jsonify({'status': 'error', 'error': 'Database not available'}), 503
+    upload = request.files.get('file')
+    # Read whole (a few hundred KB for thousands of members); the results are what streams
+    body = upload.read() if upload is not None else request.get_data()
+    rows = csv.DictReader(io.StringIO(body.decode('utf-8-sig'), newline=''))
+    if not {'name', 'email', 'password'} <= set(rows.fieldnames or ()):
+        return jsonify({'status': 'error', 'error': 'CSV needs name, email and password columns'}), 400
+    if not _endpoint_lock.acquire(blocking=False):
+        return jsonify({'status': 'error', 'error': 'Another import is running'}), 409
+    try:
+        ensure_index(_users_collection)
+    except Exception as e:
+        _endpoint_lock.release()
+        # 11000: existing users already share an email, so the index cannot be built
+        status = 409 if isinstance(e, OperationFailure) and e.code == DUPLICATE_KEY else 500
+        return jsonify({'status': 'error', 'error': f"Cannot create the unique email index: {e}"}), status
+    results = import_users(rows, _users_collection, ENDPOINT_PROCESSES)
+    response = Response(stream_with_context(json.dumps(r) + '\n' for r in results),
+                        mimetype='application/x-ndjson')
+    # On close rather than in the generator, which never runs if the client leaves first
+    response.call_on_close(_endpoint_lock.release)
+    return response
+
+
+def init_app(app, db):
+    global _users_collection
+    _users_collection = db['users'] if db is not None else None
+    app.add_url_rule('/admin/users/import', 'admin_users_import', import_view, methods=['POST'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Create users in bulk from a CSV (name,email,password)')
+    parser.add_argument('csv', help='path to the CSV, - for stdin')
+    parser.add_argument('--mongo-uri', default=None, help='defaults to the app configuration')
+    parser.add_argument('--processes', type=int, default=PROCESSES)
+    parser.add_argument('--chunk', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    from pymongo import MongoClient
+    if args.mongo_uri:
+        uri = args.mongo_uri
+    else:
+        from app import get_mongo_uri  # loads .env
+        uri = get_mongo_uri()
+    if not uri:
+        parser.error('no MongoDB configured; pass --mongo-uri')
+    users = MongoClient(uri)[os.getenv('MONGO_DB', 'farmerdb')]['users']
+
+    ensure_index(users)
+    with (sys.stdin if args.csv == '-' else open(args.csv, newline='', encoding='utf-8-sig')) as f:
+        for result in import_users(csv.DictReader(f), users, args.processes, args.chunk):
+            print(json.dumps(result), flush=True)
@@ -0,0 +1,210 @@
+"""Per-location weather snapshots.
+
+Documents in the ``weather`` collection are keyed by ``location`` (a district
+name or id) and carry a ``geohash`` and a GeoJSON ``loc`` point, indexed
+unique / compound / 2dsphere respectively, so a reading can be looked up by
+name or by nearest coordinates.
+
+Reads go through a per-process TTL cache (``WEATHER_CACHE_TTL`` seconds,
+``WEATHER_CACHE_SIZE`` locations), so repeated dashboard views from one
+district cost no DB call within the TTL; writes made by this process update
+the cache in place.
+
+Bulk refresh from a feed (JSON lines of ``location, lat, lon, temperature,
+humidity, rain_chance``) in one batch:
+
+    python weather_store.py ingest feed.jsonl
+    python weather_store.py sample-feed --locations 5000 > feed.jsonl
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+from pymongo import ASCENDING, GEOSPHERE, UpdateOne
+
+from ttl_cache import TTLCache
+
+CACHE_TTL = float(os.getenv('WEATHER_CACHE_TTL', '300'))
+CACHE_SIZE = int(os.getenv('WEATHER_CACHE_SIZE', '10000'))
+DEFAULT_LOCATION = 'default'
+GEOHASH_PRECISION = 5  # ~5 km cells
+FIELDS = ('temperature', 'humidity', 'rain_chance')
+
+weather_collection = None
+_GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def geohash(lat, lon, precision=GEOHASH_PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, ch, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        ch <<= 1
+        if value >= mid:
+            ch |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_GEOHASH_BASE32[ch])
+            bits, ch = 0, 0
+    return ''.join(chars)
+
+
+cache = TTLCache(CACHE_TTL, CACHE_SIZE)
+
+
+def init(db):
+    """Point the store at ``db.weather`` and make sure its indexes exist."""
+    global weather_collection
+    weather_collection = db['weather']
+    # One at a time, so a failed index does not stop the others being created
+    for keys, options in (('location', {'unique': True}),
+                          ([('geohash', ASCENDING), ('updated_at', ASCENDING)], {}),
+                          ([('loc', GEOSPHERE)], {})):
+        try:
+            weather_collection.create_index(keys, **options)
+        except Exception as e:
+            print(f"❌ Weather index error ({keys}): {e}")
+
+
+def snapshot(location, reading, lat=None, lon=None):
+    """Weather document for ``location`` from a reading with FIELDS."""
+    doc = {field: reading[field] for field in FIELDS}
+    doc['location'] = location
+    doc['updated_at'] = reading.get('updated_at') or datetime.utcnow()
+    if lat is not None and lon is not None:
+        doc['loc'] = {'type': 'Point', 'coordinates': [lon, lat]}
+        doc['geohash'] = geohash(lat, lon)
+    return doc
+
+
+def get(location):
+    """Latest reading for ``location`` (None if unknown), cached per location."""
+    hit, doc = cache.get(location)
+    if hit:
+        return doc
+    doc = weather_collection.find_one({'location': location}, {'_id': 0})
+    cache.put(location, doc)
+    return doc
+
+
+def put(doc):
+    """Upsert one location's reading and refresh this process's cache."""
+    weather_collection.update_one({'location': doc['location']}, {'$set': doc}, upsert=True)
+    cache.put(doc['location'], doc)
+
+
+def nearest_query(lat, lon, max_distance_m=50000):
+    """``find_one`` arguments (filter, projection) for the closest known location; shared with asgi.py."""
+    return {'loc': {'$near': {
+        '$geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+        '$maxDistance': max_distance_m,
+    }}}, {'location': 1}
+
+
+def nearest(lat, lon, max_distance_m=50000):
+    """Name of the closest known location within ``max_distance_m`` metres, or None."""
+    doc = weather_collection.find_one(*nearest_query(lat, lon, max_distance_m))
+    return doc['location'] if doc else None
+
+
+def coordinates(q):
+    """``(lat, lon)`` if a ``?q=`` value is ``"lat,lon"``, else None (a location name)."""
+    parts = q.split(',')
+    if len(parts) != 2:
+        return None
+    try:
+        return float(parts[0]), float(parts[1])
+    except ValueError:
+        return None
+
+
+def resolve(q):
+    """Location name for a ``?q=`` value: ``"lat,lon"`` maps to the nearest
+    known location, anything else is taken as a location name."""
+    coords = coordinates(q)
+    return q.strip() if coords is None else nearest(*coords)
+
+
+def ingest(records, batch_size=1000):
+    """Upsert feed records (dicts with location, lat, lon and FIELDS) in batches.
+
+    Returns the number of records written. The cache is cleared so the new
+    readings show up immediately in this process.
+    """
+    total, ops = 0, []
+    for record in records:
+        doc = snapshot(record['location'], record, record.get('lat'), record.get('lon'))
+        ops.append(UpdateOne({'location': doc['location']}, {'$set': doc}, upsert=True))
+        if len(ops) >= batch_size:
+            weather_collection.bulk_write(ops, ordered=False)
+            total += len(ops)
+            ops = []
+    if ops:
+        weather_collection.bulk_write(ops, ordered=False)
+        total += len(ops)
+    cache.clear()
+    return total
+
+
+def read_feed(path):
+    """Yield records from a JSON-lines feed file ('-' for stdin)."""
+    f = sys.stdin if path == '-' else open(path)
+    try:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def sample_feed(count, seed=42):
+    """Stand-in for a district weather feed: ``count`` random locations across India."""
+    rng = random.Random(seed)
+    for i in range(count):
+        yield {
+            'location': f"district-{i:05d}",
+            'lat': round(rng.uniform(8.0, 34.0), 4),
+            'lon': round(rng.uniform(68.0, 97.0), 4),
+            'temperature': rng.randint(15, 42),
+            'humidity': rng.randint(20, 95),
+            'rain_chance': rng.randint(0, 90),
+        }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Weather store tools')
+    sub = parser.add_subparsers(dest='command', required=True)
+    ingest_cmd = sub.add_parser('ingest', help='bulk upsert a JSON-lines feed')
+    ingest_cmd.add_argument('path', help="feed file, or '-' for stdin")
+    ingest_cmd.add_argument('--mongo-uri', default=None, help='defaults to the app configuration')
+    feed_cmd = sub.add_parser('sample-feed', help='print a synthetic feed')
+    feed_cmd.add_argument('--locations', type=int, default=1000)
+    args = parser.parse_args()
+
+    if args.command == 'sample-feed':
+        for record in sample_feed(args.locations):
+            print(json.dumps(record))
+        sys.exit(0)
+
+    from pymongo import MongoClient
+    if args.mongo_uri:
+        uri = args.mongo_uri
+    else:
+        from app import get_mongo_uri  # loads .env
+        uri = get_mongo_uri()
+    if not uri:
+        parser.error('no MongoDB configured; pass --mongo-uri')
+    init(MongoClient(uri)[os.getenv('MONGO_DB', 'farmerdb')])
+    start = time.perf_counter()
+    count = ingest(read_feed(args.path))
+    print(f"Ingested {count} locations in {time.perf_counter() - start:.2f}s")